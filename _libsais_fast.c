@@ -0,0 +1,320 @@
+/*
+ * -----------------------------------------------------------------------------
+ * _libsais_fast.c
+ *
+ * Optional compiled binding for libsais_wrapper.py. Every libsais entry point
+ * used by the wrapper is exposed under its C name and takes the thread count
+ * followed by the C arguments, with buffer-protocol objects (or None) in place
+ * of pointers. Buffers are pinned, type- and size-checked, and the serial or
+ * _omp function is called with the GIL released, all without the per-argument
+ * conversions of ctypes. Build it with "make fast"; libsais_wrapper.py picks
+ * it up automatically when it can be imported.
+ * -----------------------------------------------------------------------------
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+#if defined(__GNUC__) || defined(__clang__)
+#define OPTIONAL __attribute__((weak))
+#else
+#define OPTIONAL
+#endif
+
+/* Serial entry points of libsais 2.7 */
+int32_t libsais(const uint8_t *T, int32_t *SA, int32_t n, int32_t fs, int32_t *freq);
+int32_t libsais_bwt(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, int32_t fs, int32_t *freq);
+int32_t libsais_bwt_aux(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, int32_t fs, int32_t *freq, int32_t r, int32_t *I);
+int32_t libsais_unbwt(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, const int32_t *freq, int32_t i);
+int32_t libsais_unbwt_aux(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, const int32_t *freq, int32_t r, const int32_t *I);
+int32_t libsais_plcp(const uint8_t *T, const int32_t *SA, int32_t *PLCP, int32_t n);
+int32_t libsais_lcp(const int32_t *PLCP, const int32_t *SA, int32_t *LCP, int32_t n);
+int64_t libsais64(const uint8_t *T, int64_t *SA, int64_t n, int64_t fs, int64_t *freq);
+int64_t libsais64_bwt(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, int64_t fs, int64_t *freq);
+int64_t libsais64_bwt_aux(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, int64_t fs, int64_t *freq, int64_t r, int64_t *I);
+int64_t libsais64_unbwt(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, const int64_t *freq, int64_t i);
+int64_t libsais64_unbwt_aux(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, const int64_t *freq, int64_t r, const int64_t *I);
+int64_t libsais64_plcp(const uint8_t *T, const int64_t *SA, int64_t *PLCP, int64_t n);
+int64_t libsais64_lcp(const int64_t *PLCP, const int64_t *SA, int64_t *LCP, int64_t n);
+int32_t libsais16(const uint16_t *T, int32_t *SA, int32_t n, int32_t fs, int32_t *freq);
+int32_t libsais16_plcp(const uint16_t *T, const int32_t *SA, int32_t *PLCP, int32_t n);
+int32_t libsais_int(int32_t *T, int32_t *SA, int32_t n, int32_t k, int32_t fs);
+
+/* Entry points added in libsais 2.8; the declarations are weak, so they are NULL if the library does not provide them */
+OPTIONAL int32_t libsais_plcp_int(const int32_t *T, const int32_t *SA, int32_t *PLCP, int32_t n);
+OPTIONAL int64_t libsais64_long(int64_t *T, int64_t *SA, int64_t n, int64_t k, int64_t fs);
+OPTIONAL int64_t libsais64_plcp_long(const int64_t *T, const int64_t *SA, int64_t *PLCP, int64_t n);
+
+/* OpenMP entry points, only present if libsais is compiled with OpenMP */
+OPTIONAL int32_t libsais_omp(const uint8_t *T, int32_t *SA, int32_t n, int32_t fs, int32_t *freq, int32_t threads);
+OPTIONAL int32_t libsais_bwt_omp(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, int32_t fs, int32_t *freq, int32_t threads);
+OPTIONAL int32_t libsais_bwt_aux_omp(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, int32_t fs, int32_t *freq, int32_t r, int32_t *I, int32_t threads);
+OPTIONAL int32_t libsais_unbwt_omp(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, const int32_t *freq, int32_t i, int32_t threads);
+OPTIONAL int32_t libsais_unbwt_aux_omp(const uint8_t *T, uint8_t *U, int32_t *A, int32_t n, const int32_t *freq, int32_t r, const int32_t *I, int32_t threads);
+OPTIONAL int32_t libsais_plcp_omp(const uint8_t *T, const int32_t *SA, int32_t *PLCP, int32_t n, int32_t threads);
+OPTIONAL int32_t libsais_lcp_omp(const int32_t *PLCP, const int32_t *SA, int32_t *LCP, int32_t n, int32_t threads);
+OPTIONAL int64_t libsais64_omp(const uint8_t *T, int64_t *SA, int64_t n, int64_t fs, int64_t *freq, int32_t threads);
+OPTIONAL int64_t libsais64_bwt_omp(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, int64_t fs, int64_t *freq, int32_t threads);
+OPTIONAL int64_t libsais64_bwt_aux_omp(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, int64_t fs, int64_t *freq, int64_t r, int64_t *I, int32_t threads);
+OPTIONAL int64_t libsais64_unbwt_omp(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, const int64_t *freq, int64_t i, int32_t threads);
+OPTIONAL int64_t libsais64_unbwt_aux_omp(const uint8_t *T, uint8_t *U, int64_t *A, int64_t n, const int64_t *freq, int64_t r, const int64_t *I, int32_t threads);
+OPTIONAL int64_t libsais64_plcp_omp(const uint8_t *T, const int64_t *SA, int64_t *PLCP, int64_t n, int32_t threads);
+OPTIONAL int64_t libsais64_lcp_omp(const int64_t *PLCP, const int64_t *SA, int64_t *LCP, int64_t n, int32_t threads);
+OPTIONAL int32_t libsais16_omp(const uint16_t *T, int32_t *SA, int32_t n, int32_t fs, int32_t *freq, int32_t threads);
+OPTIONAL int32_t libsais16_plcp_omp(const uint16_t *T, const int32_t *SA, int32_t *PLCP, int32_t n, int32_t threads);
+OPTIONAL int32_t libsais_int_omp(int32_t *T, int32_t *SA, int32_t n, int32_t k, int32_t fs, int32_t threads);
+OPTIONAL int32_t libsais_plcp_int_omp(const int32_t *T, const int32_t *SA, int32_t *PLCP, int32_t n, int32_t threads);
+OPTIONAL int64_t libsais64_long_omp(int64_t *T, int64_t *SA, int64_t n, int64_t k, int64_t fs, int32_t threads);
+OPTIONAL int64_t libsais64_plcp_long_omp(const int64_t *T, const int64_t *SA, int64_t *PLCP, int64_t n, int32_t threads);
+
+/*
+ * Argument descriptors. A pointer argument has an element type (b: uint8, h: uint16, i: index of the entry's width),
+ * a required element count (n: n, s: n + fs, 1: n + 1, m: (n - 1) / r + 1, a: 256, A: 65536) and a writable flag.
+ * A scalar argument has type 'n' (the length n), 'f' (fs), 'r' (the aux sampling rate) or 'x' (any other integer).
+ */
+typedef struct { const char *name; char type; char count; char writable; } argdesc;
+
+#define MAX_ARGS 8
+
+typedef int64_t (*trampoline)(void **p, const int64_t *s, int32_t threads);
+
+typedef struct {
+    const char *name;
+    int width;
+    trampoline call;
+    int (*available)(void);
+    int (*omp)(void);
+    argdesc args[MAX_ARGS];
+} entry;
+
+/* One trampoline per entry point: cast the pinned pointers and scalars to the C signature and call the serial or _omp function */
+#define TRAMPOLINE(fn, params, omp_params) \
+    static int64_t call_##fn(void **p, const int64_t *s, int32_t threads) \
+    { \
+        if (threads > 1 && fn##_omp != NULL) return fn##_omp omp_params; \
+        return fn params; \
+    } \
+    static int omp_##fn(void) { return fn##_omp != NULL; }
+
+#define REQUIRED(fn) static int available_##fn(void) { return 1; }
+#define OPTIONAL_ENTRY(fn) static int available_##fn(void) { return fn != NULL; }
+
+#define SA_ARGS(idx) ((const uint8_t *)p[0], (idx *)p[1], (idx)s[0], (idx)s[1], (idx *)p[2])
+#define SA_OMP(idx) ((const uint8_t *)p[0], (idx *)p[1], (idx)s[0], (idx)s[1], (idx *)p[2], threads)
+#define BWT_ARGS(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (idx)s[1], (idx *)p[3])
+#define BWT_OMP(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (idx)s[1], (idx *)p[3], threads)
+#define AUX_ARGS(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (idx)s[1], (idx *)p[3], (idx)s[2], (idx *)p[4])
+#define AUX_OMP(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (idx)s[1], (idx *)p[3], (idx)s[2], (idx *)p[4], threads)
+#define UNBWT_ARGS(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (const idx *)p[3], (idx)s[1])
+#define UNBWT_OMP(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (const idx *)p[3], (idx)s[1], threads)
+#define UNAUX_ARGS(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (const idx *)p[3], (idx)s[1], (const idx *)p[4])
+#define UNAUX_OMP(idx) ((const uint8_t *)p[0], (uint8_t *)p[1], (idx *)p[2], (idx)s[0], (const idx *)p[3], (idx)s[1], (const idx *)p[4], threads)
+#define PLCP_ARGS(sym, idx) ((const sym *)p[0], (const idx *)p[1], (idx *)p[2], (idx)s[0])
+#define PLCP_OMP(sym, idx) ((const sym *)p[0], (const idx *)p[1], (idx *)p[2], (idx)s[0], threads)
+#define INT_ARGS(idx) ((idx *)p[0], (idx *)p[1], (idx)s[0], (idx)s[1], (idx)s[2])
+#define INT_OMP(idx) ((idx *)p[0], (idx *)p[1], (idx)s[0], (idx)s[1], (idx)s[2], threads)
+
+TRAMPOLINE(libsais, SA_ARGS(int32_t), SA_OMP(int32_t))
+TRAMPOLINE(libsais_bwt, BWT_ARGS(int32_t), BWT_OMP(int32_t))
+TRAMPOLINE(libsais_bwt_aux, AUX_ARGS(int32_t), AUX_OMP(int32_t))
+TRAMPOLINE(libsais_unbwt, UNBWT_ARGS(int32_t), UNBWT_OMP(int32_t))
+TRAMPOLINE(libsais_unbwt_aux, UNAUX_ARGS(int32_t), UNAUX_OMP(int32_t))
+TRAMPOLINE(libsais_plcp, PLCP_ARGS(uint8_t, int32_t), PLCP_OMP(uint8_t, int32_t))
+TRAMPOLINE(libsais_lcp, PLCP_ARGS(int32_t, int32_t), PLCP_OMP(int32_t, int32_t))
+TRAMPOLINE(libsais64, SA_ARGS(int64_t), SA_OMP(int64_t))
+TRAMPOLINE(libsais64_bwt, BWT_ARGS(int64_t), BWT_OMP(int64_t))
+TRAMPOLINE(libsais64_bwt_aux, AUX_ARGS(int64_t), AUX_OMP(int64_t))
+TRAMPOLINE(libsais64_unbwt, UNBWT_ARGS(int64_t), UNBWT_OMP(int64_t))
+TRAMPOLINE(libsais64_unbwt_aux, UNAUX_ARGS(int64_t), UNAUX_OMP(int64_t))
+TRAMPOLINE(libsais64_plcp, PLCP_ARGS(uint8_t, int64_t), PLCP_OMP(uint8_t, int64_t))
+TRAMPOLINE(libsais64_lcp, PLCP_ARGS(int64_t, int64_t), PLCP_OMP(int64_t, int64_t))
+TRAMPOLINE(libsais16, ((const uint16_t *)p[0], (int32_t *)p[1], (int32_t)s[0], (int32_t)s[1], (int32_t *)p[2]),
+                      ((const uint16_t *)p[0], (int32_t *)p[1], (int32_t)s[0], (int32_t)s[1], (int32_t *)p[2], threads))
+TRAMPOLINE(libsais16_plcp, PLCP_ARGS(uint16_t, int32_t), PLCP_OMP(uint16_t, int32_t))
+TRAMPOLINE(libsais_int, INT_ARGS(int32_t), INT_OMP(int32_t))
+TRAMPOLINE(libsais_plcp_int, PLCP_ARGS(int32_t, int32_t), PLCP_OMP(int32_t, int32_t))
+TRAMPOLINE(libsais64_long, INT_ARGS(int64_t), INT_OMP(int64_t))
+TRAMPOLINE(libsais64_plcp_long, PLCP_ARGS(int64_t, int64_t), PLCP_OMP(int64_t, int64_t))
+
+REQUIRED(libsais)
+REQUIRED(libsais_bwt)
+REQUIRED(libsais_bwt_aux)
+REQUIRED(libsais_unbwt)
+REQUIRED(libsais_unbwt_aux)
+REQUIRED(libsais_plcp)
+REQUIRED(libsais_lcp)
+REQUIRED(libsais64)
+REQUIRED(libsais64_bwt)
+REQUIRED(libsais64_bwt_aux)
+REQUIRED(libsais64_unbwt)
+REQUIRED(libsais64_unbwt_aux)
+REQUIRED(libsais64_plcp)
+REQUIRED(libsais64_lcp)
+REQUIRED(libsais16)
+REQUIRED(libsais16_plcp)
+REQUIRED(libsais_int)
+OPTIONAL_ENTRY(libsais_plcp_int)
+OPTIONAL_ENTRY(libsais64_long)
+OPTIONAL_ENTRY(libsais64_plcp_long)
+
+#define ENTRY(fn, width, ...) { #fn, width, call_##fn, available_##fn, omp_##fn, { __VA_ARGS__ } }
+#define ARG(name, type, count, writable) { name, type, count, writable }
+#define T8 ARG("T", 'b', 'n', 0)
+#define U8 ARG("U", 'b', 'n', 1)
+#define SCALAR(type) ARG(NULL, type, 0, 0)
+
+static const entry entries[] = {
+    ENTRY(libsais, 32, T8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1)),
+    ENTRY(libsais_bwt, 32, T8, U8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1)),
+    ENTRY(libsais_bwt_aux, 32, T8, U8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1), SCALAR('r'), ARG("I", 'i', 'm', 1)),
+    ENTRY(libsais_unbwt, 32, T8, U8, ARG("A", 'i', '1', 1), SCALAR('n'), ARG("freq", 'i', 'a', 0), SCALAR('x')),
+    ENTRY(libsais_unbwt_aux, 32, T8, U8, ARG("A", 'i', '1', 1), SCALAR('n'), ARG("freq", 'i', 'a', 0), SCALAR('r'), ARG("I", 'i', 'm', 0)),
+    ENTRY(libsais_plcp, 32, T8, ARG("A", 'i', 'n', 0), ARG("PLCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais_lcp, 32, ARG("PLCP", 'i', 'n', 0), ARG("A", 'i', 'n', 0), ARG("LCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais64, 64, T8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1)),
+    ENTRY(libsais64_bwt, 64, T8, U8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1)),
+    ENTRY(libsais64_bwt_aux, 64, T8, U8, ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'a', 1), SCALAR('r'), ARG("I", 'i', 'm', 1)),
+    ENTRY(libsais64_unbwt, 64, T8, U8, ARG("A", 'i', '1', 1), SCALAR('n'), ARG("freq", 'i', 'a', 0), SCALAR('x')),
+    ENTRY(libsais64_unbwt_aux, 64, T8, U8, ARG("A", 'i', '1', 1), SCALAR('n'), ARG("freq", 'i', 'a', 0), SCALAR('r'), ARG("I", 'i', 'm', 0)),
+    ENTRY(libsais64_plcp, 64, T8, ARG("A", 'i', 'n', 0), ARG("PLCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais64_lcp, 64, ARG("PLCP", 'i', 'n', 0), ARG("A", 'i', 'n', 0), ARG("LCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais16, 32, ARG("T", 'h', 'n', 0), ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('f'), ARG("freq", 'i', 'A', 1)),
+    ENTRY(libsais16_plcp, 32, ARG("T", 'h', 'n', 0), ARG("A", 'i', 'n', 0), ARG("PLCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais_int, 32, ARG("T", 'i', 'n', 1), ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('x'), SCALAR('f')),
+    ENTRY(libsais_plcp_int, 32, ARG("T", 'i', 'n', 0), ARG("A", 'i', 'n', 0), ARG("PLCP", 'i', 'n', 1), SCALAR('n')),
+    ENTRY(libsais64_long, 64, ARG("T", 'i', 'n', 1), ARG("A", 'i', 's', 1), SCALAR('n'), SCALAR('x'), SCALAR('f')),
+    ENTRY(libsais64_plcp_long, 64, ARG("T", 'i', 'n', 0), ARG("A", 'i', 'n', 0), ARG("PLCP", 'i', 'n', 1), SCALAR('n')),
+};
+
+#define NUM_ENTRIES ((int)(sizeof(entries) / sizeof(entries[0])))
+
+static int arg_count(const entry *e)
+{
+    int k = 0;
+    while (k < MAX_ARGS && e->args[k].type) k++;
+    return k;
+}
+
+/*
+ * Whether a buffer with the struct format code (NULL meaning "B") and items of itemsize bytes holds elements of an argument
+ * of the given type: 1-byte codes for symbols, 16-bit codes for 16-bit symbols, signed codes of the same size for the index
+ * arrays. The item size is checked separately, as 'l' has 4 or 8 bytes.
+ */
+static int format_matches(const char *format, Py_ssize_t itemsize, char type, Py_ssize_t size)
+{
+    const uint16_t one = 1;
+    const char native = *(const uint8_t *)&one ? '<' : '>';
+    const char *code = format != NULL ? format : "B";
+    if (*code == '@' || *code == '=' || *code == native || (*code == '!' && native == '>')) code++;
+    if (code[0] == '\0' || code[1] != '\0' || itemsize != size) return 0;
+    return strchr(type == 'b' ? "Bbc" : type == 'h' ? "hH" : size == 4 ? "il" : "lqn", code[0]) != NULL;
+}
+
+/* fast_call(threads, *args): self is the index of the entry point */
+static PyObject *fast_call(PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    const entry *e = &entries[PyLong_AsLong(self)];
+    int count = arg_count(e);
+    if (nargs != count + 1) {
+        PyErr_Format(PyExc_TypeError, "%s expects %d arguments, got %zd", e->name, count + 1, nargs);
+        return NULL;
+    }
+    long threads = PyLong_AsLong(args[0]);
+    if (threads == -1 && PyErr_Occurred()) return NULL;
+
+    /* Scalars first: the required buffer sizes depend on n, fs and r */
+    int64_t s[MAX_ARGS], n = 0, fs = 0, r = 1;
+    int ns = 0;
+    for (int k = 0; k < count; k++) {
+        const argdesc *a = &e->args[k];
+        if (a->name != NULL) continue;
+        long long v = PyLong_AsLongLong(args[k + 1]);
+        if (v == -1 && PyErr_Occurred()) return NULL;
+        if (a->type == 'n') n = v;
+        else if (a->type == 'f') fs = v;
+        else if (a->type == 'r') r = v > 0 ? v : 1;
+        s[ns++] = v;
+    }
+
+    Py_buffer views[MAX_ARGS];
+    void *p[MAX_ARGS];
+    int np = 0, pinned = 0;
+    PyObject *result = NULL;
+    for (int k = 0; k < count; k++) {
+        const argdesc *a = &e->args[k];
+        if (a->name == NULL) continue;
+        PyObject *obj = args[k + 1];
+        if (obj == Py_None) {
+            p[np++] = NULL;
+            continue;
+        }
+        Py_ssize_t size = a->type == 'b' ? 1 : a->type == 'h' ? 2 : e->width / 8;
+        int64_t required = a->count == 'n' ? n : a->count == 's' ? n + fs : a->count == '1' ? n + 1
+                         : a->count == 'm' ? (n > 0 ? (n - 1) / r + 1 : 0) : a->count == 'a' ? 256 : 65536;
+        int flags = PyBUF_C_CONTIGUOUS | PyBUF_FORMAT | (a->writable ? PyBUF_WRITABLE : 0);
+        if (PyObject_GetBuffer(obj, &views[pinned], flags) != 0) {
+            PyObject *type, *value, *tb;
+            PyErr_Fetch(&type, &value, &tb);
+            PyErr_NormalizeException(&type, &value, &tb);
+            PyErr_Format(PyExc_TypeError, "%s must be a C-contiguous%s buffer: %S", a->name, a->writable ? " writable" : "", value ? value : Py_None);
+            Py_XDECREF(type); Py_XDECREF(value); Py_XDECREF(tb);
+            goto done;
+        }
+        Py_buffer *view = &views[pinned++];
+        if (!format_matches(view->format, view->itemsize, a->type, size)) {
+            const char *kind = a->type == 'b' ? "bytes" : a->type == 'h' ? "16-bit integers" : e->width == 32 ? "signed 32-bit integers" : "signed 64-bit integers";
+            PyErr_Format(PyExc_TypeError, "%s must be a buffer of %s, got format '%s' with %zd-byte items", a->name, kind, view->format != NULL ? view->format : "B", view->itemsize);
+            goto done;
+        }
+        if (view->len < required * size) {
+            PyErr_Format(PyExc_ValueError, "%s must hold at least %lld items of %zd bytes, got %zd bytes", a->name, (long long)required, size, view->len);
+            goto done;
+        }
+        p[np++] = view->buf;
+    }
+
+    int64_t value;
+    Py_BEGIN_ALLOW_THREADS
+    value = e->call(p, s, (int32_t)threads);
+    Py_END_ALLOW_THREADS
+    result = PyLong_FromLongLong(value);
+
+done:
+    while (pinned > 0) PyBuffer_Release(&views[--pinned]);
+    return result;
+}
+
+static PyMethodDef fast_call_def = {"call", (PyCFunction)(void (*)(void))fast_call, METH_FASTCALL, NULL};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_libsais_fast",
+    "Compiled calls of the libsais entry points for libsais_wrapper.py.", -1, NULL, NULL, NULL, NULL, NULL
+};
+
+PyMODINIT_FUNC PyInit__libsais_fast(void)
+{
+    PyObject *m = PyModule_Create(&module);
+    if (m == NULL) return NULL;
+    PyObject *omp = PyDict_New();
+    if (omp == NULL || PyModule_AddObject(m, "OPENMP", omp) != 0) {
+        Py_XDECREF(omp);
+        Py_DECREF(m);
+        return NULL;
+    }
+    /* Only entry points that the linked libsais provides are exported; OPENMP maps each to whether its _omp variant exists */
+    for (int i = 0; i < NUM_ENTRIES; i++) {
+        if (!entries[i].available()) continue;
+        PyObject *index = PyLong_FromLong(i);
+        PyObject *fn = index ? PyCFunction_NewEx(&fast_call_def, index, NULL) : NULL;
+        Py_XDECREF(index);
+        if (fn == NULL || PyDict_SetItemString(omp, entries[i].name, entries[i].omp() ? Py_True : Py_False) != 0
+            || PyModule_AddObject(m, entries[i].name, fn) != 0) {
+            Py_XDECREF(fn);
+            Py_DECREF(m);
+            return NULL;
+        }
+    }
+    return m;
+}
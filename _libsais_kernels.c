@@ -0,0 +1,182 @@
+/*
+ * -----------------------------------------------------------------------------
+ * _libsais_kernels.c
+ *
+ * Optional compiled loops for the NumPy-level modules, independent of libsais
+ * and of the binding used by libsais_wrapper.py: the move-to-front coder of
+ * libsais_compress.py, mtf_encode and mtf_decode, the LCP-interval traversal
+ * of libsais_analytics.py, lcp_sweep, and the scan of libsais_external.py
+ * that merges a sorted block into the suffixes after it, gap_scan. Build it
+ * with "make kernels"; every module falls back to its Python or NumPy loops
+ * when it cannot be imported.
+ * -----------------------------------------------------------------------------
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <string.h>
+
+/* Move-to-front coding of a byte buffer over a table initialized to 0, 1, ..., 255; returns the ranks (encode) or the symbols (decode) as bytes */
+static PyObject *mtf(PyObject *arg, int decode)
+{
+    Py_buffer view;
+    if (PyObject_GetBuffer(arg, &view, PyBUF_C_CONTIGUOUS) != 0) return NULL;
+    PyObject *out = PyBytes_FromStringAndSize(NULL, view.len);
+    if (out != NULL) {
+        const uint8_t *in = (const uint8_t *)view.buf;
+        uint8_t *o = (uint8_t *)PyBytes_AS_STRING(out);
+        Py_ssize_t len = view.len;
+        Py_BEGIN_ALLOW_THREADS
+        uint8_t table[256];
+        for (int c = 0; c < 256; c++) table[c] = (uint8_t)c;
+        for (Py_ssize_t k = 0; k < len; k++) {
+            uint8_t c, i;
+            if (decode) {
+                i = in[k];
+                c = table[i];
+                o[k] = c;
+            } else {
+                c = in[k];
+                i = (uint8_t)((const uint8_t *)memchr(table, c, 256) - table);
+                o[k] = i;
+            }
+            memmove(table + 1, table, i);
+            table[0] = c;
+        }
+        Py_END_ALLOW_THREADS
+    }
+    PyBuffer_Release(&view);
+    return out;
+}
+
+static PyObject *mtf_encode(PyObject *self, PyObject *arg) { return mtf(arg, 0); }
+static PyObject *mtf_decode(PyObject *self, PyObject *arg) { return mtf(arg, 1); }
+
+/*
+ * lcp_sweep(values, rows, stack_lcp, stack_lb, depth, prev_row, out_lcp, out_lb, out_rb): one chunk of the stack-based LCP-interval
+ * traversal. values holds the LCP values of the chunk's rows (-1 after the last row), rows their row numbers, and prev_row the row
+ * before the chunk; the stack of open intervals (depth entries) is updated in place. Every closed interval is written to the outputs,
+ * which must hold depth + len(values) entries, as must the stack. All buffers hold int64. Returns (depth, number of closed intervals).
+ */
+static PyObject *lcp_sweep(PyObject *self, PyObject *args)
+{
+    Py_buffer values, rows, stack_lcp, stack_lb, out_lcp, out_lb, out_rb;
+    Py_ssize_t depth, prev_row, count = 0;
+    if (!PyArg_ParseTuple(args, "y*y*w*w*nnw*w*w*", &values, &rows, &stack_lcp, &stack_lb, &depth, &prev_row, &out_lcp, &out_lb, &out_rb)) return NULL;
+    Py_ssize_t m = values.len / 8, need = (depth + m) * 8;
+    PyObject *result = NULL;
+    if (depth < 1 || rows.len < m * 8 || stack_lcp.len < need || stack_lb.len < need || out_lcp.len < need || out_lb.len < need || out_rb.len < need) {
+        PyErr_SetString(PyExc_ValueError, "lcp_sweep buffers are too small");
+        goto done;
+    }
+    const int64_t *v = (const int64_t *)values.buf, *r = (const int64_t *)rows.buf;
+    int64_t *sl = (int64_t *)stack_lcp.buf, *sb = (int64_t *)stack_lb.buf;
+    int64_t *ol = (int64_t *)out_lcp.buf, *ob = (int64_t *)out_lb.buf, *orb = (int64_t *)out_rb.buf;
+    Py_BEGIN_ALLOW_THREADS
+    int64_t prev = prev_row;
+    for (Py_ssize_t k = 0; k < m; k++) {
+        int64_t value = v[k], lb = prev;
+        while (depth > 1 && value < sl[depth - 1]) {
+            depth--;
+            lb = sb[depth];
+            ol[count] = sl[depth];
+            ob[count] = lb;
+            orb[count++] = r[k] - 1;
+        }
+        if (value > sl[depth - 1]) {
+            sl[depth] = value;
+            sb[depth++] = lb;
+        }
+        prev = r[k];
+    }
+    Py_END_ALLOW_THREADS
+    result = Py_BuildValue("nn", depth, count);
+done:
+    PyBuffer_Release(&values); PyBuffer_Release(&rows); PyBuffer_Release(&stack_lcp); PyBuffer_Release(&stack_lb);
+    PyBuffer_Release(&out_lcp); PyBuffer_Release(&out_lb); PyBuffer_Release(&out_rb);
+    return result;
+}
+
+/*
+ * gap_scan(text, ranks, bwt, checkpoints, counts, primary, tail, tail_rank, next_rank, next_gap, gaps): one chunk of the right-to-left
+ * scan ranking the suffixes after a sorted block among the suffixes of the block, by backward search over its BWT. text holds the
+ * chunk's symbols, ranks their ranks among the suffixes after the block, which are increased in place by the number of smaller
+ * suffixes of the block; gaps counts, for every number, the suffixes that have it. bwt holds the symbol preceding every sorted suffix
+ * of the block (0 at row primary, whose suffix starts the block), padded to whole blocks of 256 rows; checkpoints (int32) the symbol
+ * counts before every 256th row, and counts (int64) the number of block suffixes starting with a smaller symbol, per symbol. tail is
+ * the last symbol of the block and tail_rank the rank of the suffix after it; next_rank and next_gap are the previous rank and number
+ * of the suffix after the chunk (-1 and 0 past the end of the input). ranks and gaps hold int64. Returns them for the chunk's first.
+ */
+static PyObject *gap_scan(PyObject *self, PyObject *args)
+{
+    Py_buffer text, ranks, bwt, checkpoints, counts, gaps;
+    Py_ssize_t primary;
+    int tail;
+    long long tail_rank, next_rank, next_gap;
+    if (!PyArg_ParseTuple(args, "y*w*y*y*y*niLLLw*", &text, &ranks, &bwt, &checkpoints, &counts, &primary, &tail, &tail_rank,
+                          &next_rank, &next_gap, &gaps)) return NULL;
+    Py_ssize_t m = text.len, rows = bwt.len, size = gaps.len / 8;
+    PyObject *result = NULL;
+    if (ranks.len < m * 8 || rows % 256 != 0 || checkpoints.len < (rows / 256 + 1) * 256 * 4 || counts.len < 256 * 8) {
+        PyErr_SetString(PyExc_ValueError, "gap_scan buffers are too small");
+        goto done;
+    }
+    if (next_gap < 0 || next_gap > rows || next_gap >= size) {
+        PyErr_SetString(PyExc_ValueError, "gap_scan rank out of range");
+        goto done;
+    }
+    const uint8_t *t = (const uint8_t *)text.buf, *b = (const uint8_t *)bwt.buf;
+    const int32_t *cp = (const int32_t *)checkpoints.buf;
+    const int64_t *c0 = (const int64_t *)counts.buf;
+    int64_t *r = (int64_t *)ranks.buf, *g = (int64_t *)gaps.buf;
+    int64_t rank = next_rank, gap = next_gap;
+    int bad = 0;
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t k = m - 1; k >= 0; k--) {
+        uint8_t c = t[k];
+        /* Occurrences of c before row gap, counted from the nearest checkpoint */
+        Py_ssize_t q = (Py_ssize_t)((gap + 128) >> 8) << 8;
+        int64_t occ = cp[q + c];
+        if (q > gap) {
+            for (Py_ssize_t i = (Py_ssize_t)gap; i < q; i++) occ -= b[i] == c;
+        } else {
+            for (Py_ssize_t i = q; i < (Py_ssize_t)gap; i++) occ += b[i] == c;
+        }
+        if (c == 0 && primary < gap) occ--;
+        int64_t next = c0[c] + occ + (c == tail && tail_rank < rank);
+        if (next < 0 || next > rows || next >= size) {
+            bad = 1;
+            break;
+        }
+        rank = r[k];
+        gap = next;
+        r[k] = rank + gap;
+        g[gap]++;
+    }
+    Py_END_ALLOW_THREADS
+    if (bad) PyErr_SetString(PyExc_ValueError, "gap_scan rank out of range");
+    else result = Py_BuildValue("LL", (long long)rank, (long long)gap);
+done:
+    PyBuffer_Release(&text); PyBuffer_Release(&ranks); PyBuffer_Release(&bwt); PyBuffer_Release(&checkpoints);
+    PyBuffer_Release(&counts); PyBuffer_Release(&gaps);
+    return result;
+}
+
+static PyMethodDef methods[] = {
+    {"mtf_encode", mtf_encode, METH_O, "Move-to-front encode a bytes-like object, returning the ranks as bytes."},
+    {"mtf_decode", mtf_decode, METH_O, "Decode move-to-front ranks from a bytes-like object, returning the symbols as bytes."},
+    {"lcp_sweep", lcp_sweep, METH_VARARGS, "Run one chunk of the stack-based LCP-interval traversal over int64 buffers."},
+    {"gap_scan", gap_scan, METH_VARARGS, "Run one chunk of the scan merging a sorted block into the suffixes after it."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_libsais_kernels",
+    "Compiled loops of the libsais_wrapper companion modules.", -1, methods, NULL, NULL, NULL, NULL
+};
+
+PyMODINIT_FUNC PyInit__libsais_kernels(void)
+{
+    return PyModule_Create(&module);
+}
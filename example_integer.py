@@ -27,46 +27,46 @@ print("Example 1 - libsais64: Suffix Array:", SA)
 # Example 2: libsais64_bwt
 # Calculate the Burrows-Wheeler Transform for the input T
 U = [0] * len(T)
-A = SA
-result, U, A, _ = lw.libsais64_bwt(T, U, A, n, fs, threads=threads)
-print("Example 2 - libsais64_bwt: Burrows-Wheeler Transform:", U)
+A = [0] * len(T)
+primary, U, A, _ = lw.libsais64_bwt(T, U, A, n, fs, threads=threads)
+print("Example 2 - libsais64_bwt: Burrows-Wheeler Transform:", U, "primary index:", primary)
 
 # Example 3: libsais64_bwt_aux
-# Calculate the auxiliary Burrows-Wheeler Transform for the input T
-U = [0] * len(T)
-A = SA
-result, U, A, _ = lw.libsais64_bwt_aux(T, U, A, n, fs, threads=threads)
-print("Example 3 - libsais64_bwt_aux: Auxiliary Burrows-Wheeler Transform:", U)
-
-# Example 4: libsais64_unbwt
-# Calculate the inverse Burrows-Wheeler Transform for the input T
-result, T, _ = lw.libsais64_unbwt(T, U, A, n, fs, threads=threads)
-print("Example 4 - libsais64_unbwt: Inverse Burrows-Wheeler Transform:", T)
-
-# Example 5: libsais64_unbwt_aux
-# Calculate the auxiliary inverse Burrows-Wheeler Transform for the input T
+# Calculate the Burrows-Wheeler Transform for the input T with auxiliary indexes
 
 # Define the r sampling rate for auxiliary indexes (must be a power of 2)
 r = 4
 
-# Calculate the length of the input auxiliary indexes
-I_length = (n - 1) // r
+result, U_aux, _, I, _ = lw.libsais64_bwt_aux(T, None, None, n, r, None, fs, threads=threads)
+print("Example 3 - libsais64_bwt_aux: Burrows-Wheeler Transform:", U_aux, "auxiliary indexes:", I)
 
-# Create a sample input auxiliary indexes list
-I = [i for i in range(I_length)]
-
-# Call the libsais64_unbwt_aux function
-result, U, _ = lw.libsais64_unbwt_aux(T, U, A, n, r, I, fs, threads=threads)
+# Example 4: libsais64_unbwt
+# Calculate the inverse Burrows-Wheeler Transform from the BWT and the primary index
+result, T_restored, _ = lw.libsais64_unbwt(U, None, None, n, primary, threads=threads)
+print("Example 4 - libsais64_unbwt: Inverse Burrows-Wheeler Transform:", T_restored)
 
-print("Example 5 - libsais64_unbwt_aux: Auxiliary Inverse Burrows-Wheeler Transform:", U)
+# Example 5: libsais64_unbwt_aux
+# Calculate the inverse Burrows-Wheeler Transform from the BWT and the auxiliary indexes
+result, T_restored, _ = lw.libsais64_unbwt_aux(U_aux, None, None, n, r, I, threads=threads)
+print("Example 5 - libsais64_unbwt_aux: Inverse Burrows-Wheeler Transform:", T_restored)
 
 # Example 6: libsais64_plcp
-# Calculate the permuted LCP array for the input T
-LCP = [0] * len(T)
-result, LCP = lw.libsais64_plcp(T, A, LCP, n, threads=threads)
-print("Example 6 - libsais64_plcp: Permuted LCP Array:", LCP)
+# Calculate the permuted LCP array for the input T and its suffix array
+PLCP = [0] * len(T)
+result, PLCP = lw.libsais64_plcp(T, SA, PLCP, n, threads=threads)
+print("Example 6 - libsais64_plcp: Permuted LCP Array:", PLCP)
 
 # Example 7: libsais64_lcp
-# Calculate the LCP array for the input T
-result, LCP = lw.libsais64_lcp(T, A, LCP, n)
+# Calculate the LCP array from the permuted LCP array and the suffix array
+LCP = [0] * len(T)
+result, LCP = lw.libsais64_lcp(PLCP, SA, LCP, n)
 print("Example 7 - libsais64_lcp: LCP Array:", LCP)
+
+# Example 8: buffers instead of lists
+# Any buffer-protocol object (bytes, bytearray, array.array, mmap, NumPy arrays) is passed
+# to the C library without copying; output buffers are filled in place and returned as-is.
+import array
+T_buf = bytes(T)
+SA_buf = array.array('q', [0]) * n
+result, SA_buf, _ = lw.libsais64(T_buf, SA_buf, n, threads=threads)
+print("Example 8 - libsais64 with buffers: Suffix Array:", SA_buf)
@@ -19,6 +19,9 @@ def string_to_ascii_list(s):
 def unicode_to_int64_list(u):
     return [c for c in u.encode('utf-32-le')]
 
+def unicode_to_utf16_list(u):
+    return list(memoryview(u.encode('utf-16-le')).cast('H'))
+
 # ASCII string input
 ascii_str = 'abbrashwabbrakadabbra'
 T_ascii = string_to_ascii_list(ascii_str)
@@ -42,3 +45,20 @@ print("ASCII Example - libsais64: Suffix Array:", A_ascii)
 # Unicode example
 result, A_unicode, _ = lw.libsais64(T_unicode, A_unicode, n_unicode, fs, threads=threads)
 print("Unicode Example - libsais64: Suffix Array:", A_unicode)
+
+# Unicode example with one suffix per character:
+# libsais16 sorts 16-bit symbols, so text in the Basic Multilingual Plane can be passed as UTF-16 code units
+bmp_str = 'Größenwahn und Größe'
+T_utf16 = unicode_to_utf16_list(bmp_str)
+result, A_utf16, _ = lw.suffix_array16(T_utf16, threads=threads)
+print("Unicode Example - suffix_array16: Suffix Array:", A_utf16)
+
+# Code points outside the BMP (the emoji above) are remapped to a dense alphabet [0, k) and
+# sorted with the integer alphabet construction (compact_alphabet requires NumPy)
+try:
+    D, symbols = lw.compact_alphabet(unicode_str)
+except ImportError:
+    pass
+else:
+    result, A_chars = lw.suffix_array_int(D, k=len(symbols), threads=threads)
+    print("Unicode Example - suffix_array_int: Suffix Array:", list(A_chars))
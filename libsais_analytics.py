@@ -0,0 +1,521 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_analytics.py
+#
+# Text analytics over the suffix and LCP arrays built by libsais_wrapper.py:
+# distinct substring counts, longest repeated substrings, k-mer spectra and
+# counts, LCP-interval enumeration and maximal repeats. The arrays may be
+# NumPy arrays, array.array or other buffers, or files written by build_files
+# or libsais_packed, which are mapped and never read as a whole. Every function streams over the
+# arrays in chunks of _CHUNK rows, so memory stays bounded by the chunk size
+# and the size of the result, and the chunks can be spread over several cores
+# with workers > 1. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import collections
+import concurrent.futures
+import itertools
+import multiprocessing
+
+import numpy as np
+
+import libsais_packed
+import libsais_wrapper as lw
+
+try:
+    import _libsais_kernels as _kernels
+except ImportError:
+    _kernels = None
+
+__all__ = [
+    "distinct_substrings",
+    "longest_repeats",
+    "kmer_spectrum",
+    "kmer_counts",
+    "lcp_intervals",
+    "maximal_repeats"
+]
+
+# Number of rows processed at a time
+_CHUNK = 1 << 22
+# Least number of rows with a small LCP value at which the LCP-interval traversal is split per worker
+_SPLITS_PER_WORKER = 16
+
+def _array(obj):
+    """
+    Return an SA or LCP array as a NumPy array without copying buffers. A str is a file written by build_files, mapped read-only,
+    or a packed file written by libsais_packed, opened as a PackedArray, which supports the indexing used here.
+    """
+    if isinstance(obj, str):
+        with open(obj, "rb") as f:
+            packed = f.read(len(libsais_packed._MAGIC)) == libsais_packed._MAGIC
+        return libsais_packed.open_packed(obj) if packed else np.asarray(lw.open_index_file(obj)[2])
+    if isinstance(obj, (np.ndarray, libsais_packed.PackedArray)):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return np.asarray(obj, dtype=np.int64)
+    return np.asarray(memoryview(obj))
+
+def _text(T):
+    """Return the text T as a uint8 NumPy array without copying. A str is the path of the text file, mapped read-only."""
+    if isinstance(T, str):
+        return np.memmap(T, dtype=np.uint8, mode="r")
+    if isinstance(T, (list, tuple)):
+        return np.asarray(T, dtype=np.uint8)
+    return np.frombuffer(T, dtype=np.uint8)
+
+def _workers(workers):
+    return lw.usable_cpus() if workers is None else max(1, workers)
+
+def _map(fn, n, workers):
+    """Yield fn(start, end) for the consecutive chunks of n rows in order, computing up to 2 * workers chunks at a time in threads."""
+    ranges = ((start, min(start + _CHUNK, n)) for start in range(0, n, _CHUNK))
+    if workers <= 1:
+        for start, end in ranges:
+            yield fn(start, end)
+        return
+    # NumPy releases the GIL in the arithmetic, comparisons and reductions that make up the chunk passes
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = collections.deque()
+        for start, end in ranges:
+            pending.append(pool.submit(fn, start, end))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def distinct_substrings(LCP, n=None, workers=1):
+    """
+    Description:
+        The distinct_substrings function counts the distinct non-empty substrings of a text from its LCP array: n(n + 1)/2 - sum(LCP).
+
+    Arguments:
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        n (int, optional, default=None): The length of the text. If None, the length of LCP is used.
+        workers (int, optional, default=1): The number of threads summing chunks. If None, usable_cpus() is used.
+
+    Returns:
+        count (int): The number of distinct non-empty substrings.
+    """
+    LCP = _array(LCP)
+    n = len(LCP) if n is None else n
+    total = n * (n + 1) // 2
+    for s in _map(lambda start, end: int(LCP[start:end].sum(dtype=np.int64)), n, _workers(workers)):
+        total -= s
+    return total
+
+def longest_repeats(SA, LCP, n=None, workers=1):
+    """
+    Description:
+        The longest_repeats function finds the longest substrings occurring at least twice in the text, with two chunked passes over LCP:
+        one for the largest LCP value, one for the rows holding it. Runs of consecutive such rows share one substring.
+
+    Arguments:
+        SA (buffer, numpy.ndarray or str): The suffix array of the text, or an SA file written by build_files or libsais_packed.
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        n (int, optional, default=None): The length of the text. If None, the length of LCP is used.
+        workers (int, optional, default=1): The number of threads processing chunks. If None, usable_cpus() is used.
+
+    Returns:
+        length (int): The length of the longest repeated substrings, 0 if no symbol repeats.
+        occurrences (list of numpy.ndarray): For every distinct longest repeated substring, the sorted start positions of its occurrences.
+    """
+    SA, LCP = _array(SA), _array(LCP)
+    n = len(LCP) if n is None else n
+    workers = _workers(workers)
+    length = max(_map(lambda start, end: int(LCP[start:end].max()), n, workers), default=0)
+    if length == 0:
+        return 0, []
+    rows = np.concatenate(list(_map(lambda start, end: np.flatnonzero(LCP[start:end] == length) + start, n, workers)))
+    groups = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+    return length, [np.sort(SA[g[0] - 1:g[-1] + 1].astype(np.int64)) for g in groups]
+
+def _kmer_chunk(SA, LCP, n, k, start, end):
+    """
+    Return the k-mer groups starting in rows start..end-1: their first rows, the number of their rows up to end,
+    and the number of rows at the start of the chunk continuing the group of an earlier chunk.
+    """
+    # Suffixes shorter than k hold no k-mer, and their LCP with the neighbours is below k, so they also end the groups around them
+    valid = np.flatnonzero(SA[start:end] <= n - k)
+    heads = np.flatnonzero(LCP[start:end][valid] < k)
+    lead = int(heads[0]) if heads.size else valid.size
+    return valid[heads] + start, np.diff(heads, append=valid.size), lead
+
+def _kmer_groups(SA, LCP, n, k, workers):
+    """Yield (rows, counts) arrays of the complete k-mer groups in SA order: the first row of every distinct k-mer and its number of occurrences."""
+    if k <= 0:
+        raise ValueError(f"k must be positive, got {k}")
+    open_row, open_count = -1, 0
+    for heads, counts, lead in _map(lambda start, end: _kmer_chunk(SA, LCP, n, k, start, end), n, workers):
+        open_count += lead
+        if heads.size == 0:
+            continue
+        if open_row >= 0:
+            heads = np.concatenate(([open_row], heads))
+            counts = np.concatenate(([open_count], counts))
+        open_row, open_count = int(heads[-1]), int(counts[-1])
+        yield heads[:-1], counts[:-1]
+    if open_row >= 0:
+        yield np.array([open_row]), np.array([open_count])
+
+def kmer_spectrum(SA, LCP, k, n=None, workers=1):
+    """
+    Description:
+        The kmer_spectrum function computes the k-mer frequency spectrum of a text: how many distinct k-mers occur once, twice, and so on.
+        The occurrences of a k-mer are consecutive rows of the suffix array, separated by LCP values below k, so the spectrum is found in one chunked pass.
+
+    Arguments:
+        SA (buffer, numpy.ndarray or str): The suffix array of the text, or an SA file written by build_files or libsais_packed.
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        k (int): The k-mer length.
+        n (int, optional, default=None): The length of the text. If None, the length of LCP is used.
+        workers (int, optional, default=1): The number of threads processing chunks. If None, usable_cpus() is used.
+
+    Returns:
+        frequencies (numpy.ndarray of int64): The distinct occurrence counts, in increasing order.
+        counts (numpy.ndarray of int64): counts[i] is the number of distinct k-mers occurring frequencies[i] times.
+    """
+    SA, LCP = _array(SA), _array(LCP)
+    n = len(LCP) if n is None else n
+    spectrum = collections.Counter()
+    for _, counts in _kmer_groups(SA, LCP, n, k, _workers(workers)):
+        values, occurrences = np.unique(counts, return_counts=True)
+        spectrum.update(dict(zip(values.tolist(), occurrences.tolist())))
+    frequencies = np.array(sorted(spectrum), dtype=np.int64)
+    return frequencies, np.array([spectrum[f] for f in frequencies.tolist()], dtype=np.int64)
+
+def kmer_counts(SA, LCP, k, min_count=1, n=None, workers=1):
+    """
+    Description:
+        The kmer_counts function counts the occurrences of every distinct k-mer of a text occurring at least min_count times, in one chunked pass.
+
+    Arguments:
+        SA (buffer, numpy.ndarray or str): The suffix array of the text, or an SA file written by build_files or libsais_packed.
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        k (int): The k-mer length.
+        min_count (int, optional, default=1): The least number of occurrences of a reported k-mer.
+        n (int, optional, default=None): The length of the text. If None, the length of LCP is used.
+        workers (int, optional, default=1): The number of threads processing chunks. If None, usable_cpus() is used.
+
+    Returns:
+        positions (numpy.ndarray of int64): The start position of one occurrence of every reported k-mer, T[p:p + k], in lexicographic order of the k-mers.
+        counts (numpy.ndarray of int64): The number of occurrences of every reported k-mer.
+    """
+    SA, LCP = _array(SA), _array(LCP)
+    n = len(LCP) if n is None else n
+    positions, counts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for rows, c in _kmer_groups(SA, LCP, n, k, _workers(workers)):
+        keep = c >= min_count
+        positions.append(SA[rows[keep]].astype(np.int64))
+        counts.append(c[keep].astype(np.int64))
+    return np.concatenate(positions), np.concatenate(counts)
+
+# -----------------------------------------------------------------------------
+# LCP intervals
+#
+# An LCP interval l-[lb..rb] is a maximal range of suffix array rows sharing a
+# prefix of length l, i.e. an internal node of the suffix tree. The intervals
+# are enumerated bottom-up (children before parents), in the order of the
+# stack-based traversal of Abouelhoda, Kurtz and Ohlebusch over the LCP array,
+# but without a per-row loop: every row i whose LCP value l is the first of
+# its interval opens the interval l-[psv(i)..nsv(i) - 1], psv and nsv being
+# the previous and next rows with a smaller LCP value. Within a chunk of
+# _SWEEP_CHUNK rows, they are found with vectorized binary searches over a
+# sparse table of range minima; the intervals left open at the end of a chunk
+# are carried to the next one as a stack (the spine), which also answers the
+# searches running past the start of a chunk. When the compiled loops of
+# _libsais_kernels are available, they run the stack-based traversal itself
+# over each chunk instead, which is several times faster. The traversal is sequential, so
+# with several workers the array is cut at the rows whose LCP value is below
+# a small threshold s: the intervals with an lcp value of at least s never
+# span such a row, so the segments between them are traversed in parallel
+# processes, and the few intervals with an lcp value below s are found by a
+# final traversal of the cut rows.
+# -----------------------------------------------------------------------------
+
+# Number of rows per chunk of the interval traversal, which holds a sparse table of log2(_SWEEP_CHUNK) levels per chunk
+_SWEEP_CHUNK = 1 << 16
+
+def _gallop(levels, m, p, target, forward):
+    """
+    Move the bounds p, rows of a chunk of m values with the sparse table levels, past the runs of rows with values > target (forward: >= target):
+    galloping up the levels while the next block is skipped, then binary searching down within the first block that is not. Returns p, then
+    the row after the previous row with a value <= target (0 if there is none), or the next row with a value < target (m if there is none).
+    """
+    skip = np.greater_equal if forward else np.greater
+    level = np.zeros(p.size, dtype=np.int64)
+    active = np.arange(p.size)
+    k = 0
+    while active.size and k < len(levels):
+        step = 1 << k
+        q = p[active]
+        fits = q + step <= m if forward else q >= step
+        level[active[~fits]] = k
+        active, q = active[fits], q[fits]
+        good = skip(levels[k][q if forward else q - step], target[active])
+        level[active[~good]] = k
+        active = active[good]
+        p[active] += step if forward else -step
+        k += 1
+    level[active] = k
+    order = np.argsort(level, kind="stable")
+    ranked = level[order]
+    for k in range(k - 1, -1, -1):
+        step = 1 << k
+        active = order[np.searchsorted(ranked, k, side="right"):]
+        q = p[active]
+        fits = q + step <= m if forward else q >= step
+        active, q = active[fits], q[fits]
+        active = active[skip(levels[k][q if forward else q - step], target[active])]
+        p[active] += step if forward else -step
+    return p
+
+class _Spine:
+    """
+    The open intervals of a traversal over a sequence of rows: their lcp values, increasing from the bottom, and their left bounds.
+    The bottom holds a guard and the root interval, with lcp value 0, opened at row x.
+    """
+
+    def __init__(self, x):
+        self.lcp = np.zeros(64, dtype=np.int64)
+        self.lb = np.full(64, x, dtype=np.int64)
+        self.lcp[0] = -2
+        self.depth = 2
+        self.row = x
+
+    def _reserve(self, depth):
+        if depth > self.lcp.size:
+            size = max(depth, 2 * self.lcp.size)
+            self.lcp = np.concatenate((self.lcp[:self.depth], np.zeros(size - self.depth, dtype=np.int64)))
+            self.lb = np.concatenate((self.lb[:self.depth], np.zeros(size - self.depth, dtype=np.int64)))
+
+    def _push(self, lcp, lb):
+        depth = self.depth + lcp.size
+        self._reserve(depth)
+        self.lcp[self.depth:depth] = lcp
+        self.lb[self.depth:depth] = lb
+        self.depth = depth
+
+    def advance(self, rows, values):
+        """
+        Consume the next rows of the sequence and their LCP values (-1 after the last row), and return the (lcp, lb, rb) arrays
+        of the intervals they close, in the order of the stack-based traversal: by right bound, and deeper intervals first.
+        """
+        v = np.ascontiguousarray(values, dtype=np.int64)
+        m = v.size
+        if _kernels is not None:
+            size = self.depth + m
+            self._reserve(size)
+            out_lcp, out_lb, out_rb = (np.empty(size, dtype=np.int64) for _ in range(3))
+            self.depth, count = _kernels.lcp_sweep(v, np.ascontiguousarray(rows, dtype=np.int64), self.lcp, self.lb, self.depth, self.row,
+                                                   out_lcp, out_lb, out_rb)
+            self.row = int(rows[-1])
+            return out_lcp[:count], out_lb[:count], out_rb[:count]
+        lcp, lb = self.lcp[:self.depth], self.lb[:self.depth]
+        # Sparse table: levels[k][p] is the least value of v[p:p + 2^k]
+        levels = [v]
+        while 2 << (len(levels) - 1) <= m:
+            half = 1 << (len(levels) - 1)
+            levels.append(np.minimum(levels[-1][:-half], levels[-1][half:]))
+        # A row opens an interval if the previous row with a value <= its own has a smaller one; the last row of the spine has the top value
+        before = np.empty(m, dtype=np.int64)
+        before[0] = lcp[-1]
+        before[1:] = v[:-1]
+        opens = np.flatnonzero(v > before)
+        left = np.concatenate(([self.row], rows[:-1]))[opens]
+        search = np.flatnonzero(v < before)
+        if search.size:
+            # The previous row with a value <= v[i]
+            target = v[search]
+            p = _gallop(levels, m, search.copy(), target, False)
+            inside = p > 0
+            j = p[inside] - 1
+            strict = v[j] < target[inside]
+            local = search[inside][strict]
+            # Without such a row in the chunk, the first spine interval with an lcp value >= v[i] starts there, unless its value is equal
+            outside = search[~inside]
+            k = np.searchsorted(lcp, v[outside])
+            top = k < lcp.size
+            fresh = ~top
+            fresh[top] = lcp[k[top]] != v[outside[top]]
+            spine_lb = np.where(top, lb[np.minimum(k, lcp.size - 1)], self.row)[fresh]
+            opens = np.concatenate((opens, local, outside[fresh]))
+            left = np.concatenate((left, rows[j[strict]], spine_lb))
+        # The next row with a smaller value
+        target = v[opens]
+        p = _gallop(levels, m, opens + 1, target, True)
+        closed = p < m
+        # Spine intervals close at the first row with a smaller value: the running minimum is decreasing
+        low = np.minimum.accumulate(v)
+        first = np.searchsorted(lcp, low[-1], side="right")
+        at = np.searchsorted(-low, -lcp[first:], side="right")
+        out_lcp = np.concatenate((lcp[first:], target[closed]))
+        out_lb = np.concatenate((lb[first:], left[closed]))
+        out_rb = np.concatenate((rows[at], rows[p[closed]])) - 1
+        # The intervals left open are pushed in row order, which is also the order of their values
+        order = np.argsort(opens[~closed], kind="stable")
+        self.depth = first
+        self._push(target[~closed][order], left[~closed][order])
+        self.row = int(rows[-1])
+        order = np.lexsort((-out_lcp, out_rb))
+        return out_lcp[order], out_lb[order], out_rb[order]
+
+def _left_changes(T, SA, start, end):
+    """Return for rows start..end-1 whether the symbol preceding the suffix differs from the one of the row above; the suffix at 0 differs from all."""
+    S = SA[max(start - 1, 0):end].astype(np.int64)
+    left = T[S - 1].astype(np.int16)
+    left[S == 0] = -1
+    change = (left[1:] != left[:-1]) | (left[1:] < 0) | (left[:-1] < 0)
+    return change if start > 0 else np.concatenate(([False], change))
+
+def _traverse(LCP, x, y, floor, T=None, SA=None):
+    """
+    Yield (lcp, lb, rb) arrays of the LCP intervals within rows x..y-1 with an lcp value of at least floor, children before parents.
+    Row x opens and row y closes the traversal, so an interval reaching either end is only complete if its lcp value exceeds the LCP value there.
+    If T and SA are given, only the left-maximal intervals are yielded: those whose suffixes are not all preceded by the same symbol.
+    """
+    spine = _Spine(x)
+    # Last row <= the current row, and > x, where the preceding symbol changes
+    last_change = -1
+    for start in range(x + 1, y + 1, _SWEEP_CHUNK):
+        end = min(start + _SWEEP_CHUNK, y + 1)
+        values = np.asarray(LCP[start:min(end, y)], dtype=np.int64)
+        if end == y + 1:
+            values = np.append(values, -1)
+        out_lcp, out_lb, out_rb = spine.advance(np.arange(start, end), values)
+        keep = out_lcp >= floor
+        out_lcp, out_lb, out_rb = out_lcp[keep], out_lb[keep], out_rb[keep]
+        if T is not None:
+            # rb lies in start - 1 .. min(end, y) - 1
+            rows = np.arange(start, min(end, y))
+            lc = np.where(_left_changes(T, SA, start, min(end, y)), rows, -1) if rows.size else rows
+            lc = np.maximum.accumulate(np.concatenate(([last_change], lc)))
+            last_change = int(lc[-1])
+            keep = lc[out_rb - (start - 1)] > out_lb
+            out_lcp, out_lb, out_rb = out_lcp[keep], out_lb[keep], out_rb[keep]
+        if out_lcp.size:
+            yield out_lcp, out_lb, out_rb
+
+# The arrays of the running parallel traversals, inherited by the forked worker processes
+_shared = {}
+_shared_ids = itertools.count()
+
+def _segment(key, x, y, floor):
+    LCP, T, SA = _shared[key]
+    batches = list(_traverse(LCP, x, y, floor, T, SA))
+    if not batches:
+        return None
+    return tuple(np.concatenate(column) for column in zip(*batches))
+
+def _split_rows(LCP, n, workers):
+    """Return the threshold s and the rows with an LCP value below s, s being the least value giving enough rows to split the work."""
+    histogram = np.zeros(256, dtype=np.int64)
+    for h in _map(lambda start, end: np.bincount(np.minimum(LCP[start:end], 255), minlength=256), n, workers):
+        histogram += h
+    s = min(int(np.searchsorted(np.cumsum(histogram), _SPLITS_PER_WORKER * workers)) + 1, 256)
+    rows = np.concatenate(list(_map(lambda start, end: np.flatnonzero(LCP[start:end] < s) + start, n, workers)))
+    return s, rows
+
+def _change_counts(T, SA, n, rows, workers):
+    """Return for every row in the sorted array rows the number of rows j in 1..row where the preceding symbol changes."""
+    def chunk(start, end):
+        total = np.cumsum(_left_changes(T, SA, start, end))
+        inside = rows[np.searchsorted(rows, start):np.searchsorted(rows, end)]
+        return total[inside - start], int(total[-1])
+    counts, carry = [], 0
+    for sampled, total in _map(chunk, n, workers):
+        counts.append(sampled + carry)
+        carry += total
+    return np.concatenate(counts)
+
+def _coarse(LCP, rows, n, s, floor, changes=None):
+    """Traverse the rows with an LCP value below s, yielding the intervals with an lcp value below s; the rows in between only hold deeper intervals."""
+    spine = _Spine(0)
+    for start in range(1, rows.size + 1, _SWEEP_CHUNK):
+        end = min(start + _SWEEP_CHUNK, rows.size + 1)
+        cut = rows[start:end].astype(np.int64)
+        values = np.asarray(LCP[cut], dtype=np.int64) if cut.size else np.zeros(0, dtype=np.int64)
+        if end == rows.size + 1:
+            cut, values = np.append(cut, n), np.append(values, -1)
+        out_lcp, out_lb, out_rb = spine.advance(cut, values)
+        keep = (out_lcp >= floor) & (out_lcp < s)
+        out_lcp, out_lb, out_rb = out_lcp[keep], out_lb[keep], out_rb[keep]
+        if changes is not None:
+            queries, counts = changes
+            keep = counts[np.searchsorted(queries, out_rb)] > counts[np.searchsorted(queries, out_lb)]
+            out_lcp, out_lb, out_rb = out_lcp[keep], out_lb[keep], out_rb[keep]
+        if out_lcp.size:
+            yield out_lcp, out_lb, out_rb
+
+def _intervals(LCP, floor, workers, T=None, SA=None):
+    n = len(LCP)
+    if n == 0:
+        return
+    if workers <= 1 or n <= _CHUNK or "fork" not in multiprocessing.get_all_start_methods():
+        yield from _traverse(LCP, 0, n, floor, T, SA)
+        return
+    s, rows = _split_rows(LCP, n, workers)
+    if rows.size < 2:
+        yield from _traverse(LCP, 0, n, floor, T, SA)
+        return
+    changes = None
+    if T is not None and s > floor:
+        queries = np.unique(np.concatenate((rows, rows[1:] - 1, [n - 1])))
+        changes = queries, _change_counts(T, SA, n, queries, workers)
+    # Segments of about n / (4 * workers) rows, cut at rows with an LCP value below s
+    cuts = np.unique(rows[np.minimum(np.searchsorted(rows, np.linspace(0, n, 4 * workers + 1)[1:-1]), rows.size - 1)])
+    bounds = np.concatenate(([0], cuts[cuts > 0], [n])).tolist()
+    key = next(_shared_ids)
+    _shared[key] = (LCP, T, SA)
+    try:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(_segment, key, x, y, max(s, floor)) for x, y in zip(bounds[:-1], bounds[1:])]
+            for future in futures:
+                result = future.result()
+                if result is not None:
+                    yield result
+    finally:
+        del _shared[key]
+    if s > floor:
+        yield from _coarse(LCP, rows, n, s, floor, changes)
+
+def lcp_intervals(LCP, min_lcp=1, workers=1):
+    """
+    Description:
+        The lcp_intervals function enumerates the LCP intervals of a suffix array, i.e. the internal nodes of its suffix tree, bottom-up:
+        every interval is yielded before the intervals containing it. An interval l-[lb..rb] holds the rows lb..rb, whose suffixes share a
+        prefix of length l, which is the longest prefix they all share and which no other suffix starts with. The traversal keeps only a
+        stack of open intervals, whose depth is bounded by the distinct LCP values on a root-to-leaf path, besides one chunk of LCP.
+
+    Arguments:
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        min_lcp (int, optional, default=1): The least lcp value of a yielded interval. 0 also yields the root interval 0-[0..n-1].
+        workers (int, optional, default=1): The number of processes traversing segments of the array. If None, usable_cpus() is used.
+            Parallel traversal forks the worker processes, so it is only used where fork is available.
+
+    Returns:
+        intervals (generator of tuples of numpy.ndarray of int64): Batches of intervals as three arrays (lcp, lb, rb).
+    """
+    yield from _intervals(_array(LCP), min_lcp, _workers(workers))
+
+def maximal_repeats(T, SA, LCP, min_length=1, workers=1):
+    """
+    Description:
+        The maximal_repeats function enumerates the maximal repeats of a text: the substrings occurring at least twice that cannot be extended
+        to the left or right without losing an occurrence. They are the LCP intervals (right-maximal) whose suffixes are not all preceded by the
+        same symbol (left-maximal), see lcp_intervals. Results come bottom-up, in batches.
+
+    Arguments:
+        T (bytes, buffer or str): The text, or the path of the text file, mapped read-only.
+        SA (buffer, numpy.ndarray or str): The suffix array of the text, or an SA file written by build_files or libsais_packed.
+        LCP (buffer, numpy.ndarray or str): The LCP array of the text, or an LCP file written by build_files or libsais_packed.
+        min_length (int, optional, default=1): The least length of a yielded repeat.
+        workers (int, optional, default=1): The number of processes traversing segments of the array, see lcp_intervals.
+
+    Returns:
+        repeats (generator of tuples of numpy.ndarray of int64): Batches of repeats as three arrays (length, position, count):
+            the repeat is T[position:position + length] and occurs count times.
+    """
+    SA = _array(SA)
+    for lcp, lb, rb in _intervals(_array(LCP), max(min_length, 1), _workers(workers), _text(T), SA):
+        yield lcp, SA[lb].astype(np.int64), rb - lb + 1
@@ -0,0 +1,348 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_async.py
+#
+# asyncio counterparts of the wrappers in libsais_wrapper.py. Every coroutine
+# takes the same arguments and returns the same results as the function of the
+# same name, but runs the C call in a dedicated thread pool, so the event loop
+# keeps serving other requests while a large construction runs. The number of
+# constructions in flight is limited both by the pool size and by a memory
+# budget, charged with the estimated working set of every call (from n, fs and
+# the index width). Calls with a working set below _INLINE_BYTES run directly
+# on the loop, where they take less time than a trip to the pool.
+#
+# A cancelled coroutine does not stop the C call: the call keeps its
+# arguments referenced and pinned, and its share of the memory budget, until
+# the C function returns. Buffers passed as outputs may therefore still be
+# written after the cancellation; await drain() before reusing them.
+# -----------------------------------------------------------------------------
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import inspect
+import os
+import threading
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "libsais64",
+    "libsais64_bwt",
+    "libsais64_bwt_aux",
+    "libsais64_unbwt",
+    "libsais64_unbwt_aux",
+    "libsais64_plcp",
+    "libsais64_lcp",
+    "suffix_array",
+    "bwt",
+    "bwt_aux",
+    "unbwt",
+    "unbwt_aux",
+    "plcp",
+    "lcp",
+    "suffix_array16",
+    "plcp16",
+    "suffix_array_int",
+    "plcp_int",
+    "build_index",
+    "build_files",
+    "MemoryBudget",
+    "configure",
+    "estimate_memory",
+    "drain",
+    "shutdown"
+]
+
+# Set the number of worker threads, i.e. of constructions running at once; None uses min(4, usable_cpus())
+_DEFAULT_WORKERS = None
+# Set the memory budget of the constructions in flight in bytes; None uses half of the physical (or cgroup) memory
+_DEFAULT_MEMORY_BUDGET = None
+# Calls with an estimated working set below this many bytes run directly on the event loop
+_INLINE_BYTES = 1 << 16
+# Estimated bytes per item of a result returned as a Python list (the list slot and the int object)
+_LIST_ITEM_BYTES = 40
+# Estimated memory allocated by libsais itself per call (bucket arrays, per-thread state)
+_CALL_OVERHEAD = 1 << 20
+
+class MemoryBudget:
+    """
+    Byte budget shared by the calls in flight, usable from any number of threads and event loops.
+
+    acquire waits until the requested bytes fit in the budget. Waiters are served in arrival order,
+    so a large construction is not starved by a stream of small ones. A request larger than the
+    whole budget is granted once nothing else holds any of it, so it runs alone instead of never.
+    """
+
+    def __init__(self, limit):
+        if limit <= 0:
+            raise ValueError(f"limit must be positive, got {limit}")
+        self.limit = limit
+        self.in_use = 0
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+
+    def __repr__(self):
+        return f"MemoryBudget(limit={self.limit}, in_use={self.in_use}, waiting={len(self._waiters)})"
+
+    def _fits(self, nbytes):
+        return self.in_use == 0 or self.in_use + nbytes <= self.limit
+
+    async def acquire(self, nbytes):
+        """Wait until nbytes are available and reserve them; they must be given back with release."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._fits(nbytes):
+                self.in_use += nbytes
+                return
+            waiter = (nbytes, loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[2]
+        except BaseException:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    queued = True
+                except ValueError:
+                    queued = False
+            if queued:
+                # The waiter may have been the head of the queue, holding back smaller requests
+                self._wake()
+            elif not waiter[2].cancelled():
+                # Granted before the cancellation arrived; a cancelled grant is returned by _grant
+                self.release(nbytes)
+            raise
+
+    def release(self, nbytes):
+        """Give back nbytes reserved with acquire; may be called from any thread."""
+        with self._lock:
+            self.in_use -= nbytes
+        self._wake()
+
+    def _wake(self):
+        granted = []
+        with self._lock:
+            while self._waiters and self._fits(self._waiters[0][0]):
+                waiter = self._waiters.popleft()
+                self.in_use += waiter[0]
+                granted.append(waiter)
+        for nbytes, loop, future in granted:
+            try:
+                loop.call_soon_threadsafe(self._grant, nbytes, future)
+            except RuntimeError:
+                # The loop of the waiter is closed
+                self.release(nbytes)
+
+    def _grant(self, nbytes, future):
+        if future.cancelled():
+            self.release(nbytes)
+        else:
+            future.set_result(None)
+
+def _memory_limit():
+    """Return the physical memory of the machine, or the memory limit of the cgroup if it is lower."""
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        total = 8 << 30
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        if value.isdigit():
+            total = min(total, int(value))
+        break
+    return total
+
+# The executor and memory budget of all coroutines, created on first use or by configure
+_executor = None
+_budget = None
+_resources_lock = threading.Lock()
+# Futures of the C calls that have not returned yet, see drain
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+def configure(max_workers=_DEFAULT_WORKERS, memory_budget=_DEFAULT_MEMORY_BUDGET):
+    """
+    Description:
+        Replace the thread pool and the memory budget used by the coroutines of this module.
+        Calls already submitted finish on the previous pool and give back their memory to the previous budget.
+
+    Arguments:
+        max_workers (int, optional, default=_DEFAULT_WORKERS): The number of worker threads. If None, min(4, usable_cpus()) is used.
+            Every worker runs one C call at a time, which uses the threads passed to the call (or the tuned threads for threads=0).
+        memory_budget (int or MemoryBudget, optional, default=_DEFAULT_MEMORY_BUDGET): The total estimated working set of the calls in flight, in bytes,
+            or a MemoryBudget to share with other code. If None, half of the physical memory (or of the cgroup memory limit) is used.
+
+    Returns:
+        budget (MemoryBudget): The memory budget now in use.
+    """
+    global _executor, _budget
+    if max_workers is None:
+        max_workers = min(4, lw.usable_cpus())
+    if memory_budget is None:
+        memory_budget = _memory_limit() // 2
+    if not isinstance(memory_budget, MemoryBudget):
+        memory_budget = MemoryBudget(memory_budget)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="libsais")
+    with _resources_lock:
+        previous, _executor, _budget = _executor, executor, memory_budget
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return memory_budget
+
+def _resources():
+    if _executor is None:
+        with _resources_lock:
+            if _executor is not None:
+                return _executor, _budget
+        configure()
+    return _executor, _budget
+
+def shutdown(wait=True):
+    """Shut down the thread pool, waiting for the calls in flight if wait is True; the next coroutine call creates a new one."""
+    global _executor
+    with _resources_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+async def drain():
+    """Wait until every C call started by this module has returned, including the calls of cancelled coroutines."""
+    with _in_flight_lock:
+        futures = [asyncio.wrap_future(f) for f in _in_flight]
+    if futures:
+        await asyncio.wait(futures)
+
+# Working set of every wrapper: (formula of n, fs, symbol bytes s and index bytes w, symbol bytes, index bytes)
+# A symbol or index size of None is taken from the index width policy of the call
+_SA = lambda n, fs, s, w: n * s + (n + fs) * w
+_BWT = lambda n, fs, s, w: 2 * n + (n + fs) * w
+_UNBWT = lambda n, fs, s, w: 2 * n + (n + 1) * w
+_PLCP = lambda n, fs, s, w: n * s + 2 * n * w
+_LCP = lambda n, fs, s, w: 3 * n * w
+_INDEX = lambda n, fs, s, w: 2 * n + (n + fs) * w + 2 * n * w
+_WORKING_SETS = {
+    "libsais64": (_SA, 1, 8),
+    "libsais64_bwt": (_BWT, 1, 8),
+    "libsais64_bwt_aux": (_BWT, 1, 8),
+    "libsais64_unbwt": (_UNBWT, 1, 8),
+    "libsais64_unbwt_aux": (_UNBWT, 1, 8),
+    "libsais64_plcp": (_PLCP, 1, 8),
+    "libsais64_lcp": (_LCP, 8, 8),
+    "suffix_array": (_SA, 1, None),
+    "bwt": (_BWT, 1, None),
+    "bwt_aux": (_BWT, 1, None),
+    "unbwt": (_UNBWT, 1, None),
+    "unbwt_aux": (_UNBWT, 1, None),
+    "plcp": (_PLCP, 1, None),
+    "lcp": (_LCP, None, None),
+    "suffix_array16": (_SA, 2, 4),
+    "plcp16": (_PLCP, 2, 4),
+    "suffix_array_int": (_SA, None, None),
+    "plcp_int": (_PLCP, None, None),
+    "build_index": (_INDEX, 1, None),
+    "build_files": (_INDEX, 1, None)
+}
+
+def _estimate(function, arguments):
+    """Return the estimated working set in bytes of a call of function with the bound arguments."""
+    formula, symbol, index = _WORKING_SETS[function]
+    n, fs = arguments.get("n"), arguments.get("fs") or 0
+    try:
+        if function == "build_files":
+            n = os.path.getsize(arguments["input_path"])
+        elif n is None:
+            n = lw._length(next(iter(arguments.values())))
+        if index is None:
+            arrays = [arguments.get(name) for name in ("A", "freq", "I", "PLCP", "LCP")]
+            index = lw._index_width(arguments.get("index_width", "auto"), n + fs, *arrays) // 8
+    except (OSError, TypeError, ValueError):
+        # Invalid arguments, the wrapper raises the error when it is called
+        return 0
+    nbytes = formula(n, fs, index if symbol is None else symbol, index)
+    for name in ("A", "U", "PLCP", "LCP"):
+        if isinstance(arguments.get(name), (list, tuple)):
+            nbytes += n * _LIST_ITEM_BYTES
+    return nbytes
+
+def estimate_memory(function, *args, **kwargs):
+    """
+    Description:
+        Estimate the working set of a call, as charged to the memory budget: the input, output and temporary arrays
+        (from n, fs and the index width), the Python lists returned for list arguments, plus the internal allocations of libsais.
+
+    Arguments:
+        function (str): The name of the wrapper, e.g. "suffix_array" or "libsais64_bwt".
+        *args, **kwargs: The arguments of the call.
+
+    Returns:
+        nbytes (int): The estimated working set in bytes.
+    """
+    if function not in _WORKING_SETS:
+        raise ValueError(f"function must be one of {', '.join(_WORKING_SETS)}, got {function!r}")
+    fn = getattr(lw, function)
+    arguments = inspect.signature(fn).bind(*args, **kwargs).arguments
+    return _estimate(function, arguments) + _CALL_OVERHEAD
+
+def _finished(budget, nbytes, future):
+    with _in_flight_lock:
+        _in_flight.discard(future)
+    budget.release(nbytes)
+
+async def _run(fn, args, kwargs, nbytes):
+    """Run fn(*args, **kwargs) in the thread pool once nbytes of the memory budget are available."""
+    executor, budget = _resources()
+    await budget.acquire(nbytes)
+    try:
+        future = executor.submit(fn, *args, **kwargs)
+    except BaseException:
+        budget.release(nbytes)
+        raise
+    with _in_flight_lock:
+        _in_flight.add(future)
+    # The pool keeps fn and its arguments referenced until the call returns, and only then gives back
+    # the memory, whether or not the awaiting task was cancelled in the meantime
+    future.add_done_callback(functools.partial(_finished, budget, nbytes))
+    return await asyncio.wrap_future(future)
+
+def _coroutine(function):
+    """Return the coroutine counterpart of the wrapper named function."""
+    fn = getattr(lw, function)
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        nbytes = _estimate(function, signature.bind(*args, **kwargs).arguments)
+        if nbytes < _INLINE_BYTES:
+            return fn(*args, **kwargs)
+        return await _run(fn, args, kwargs, nbytes + _CALL_OVERHEAD)
+
+    wrapper.__doc__ = (f"\n    Coroutine version of libsais_wrapper.{function}, run in the thread pool of libsais_async within its memory budget."
+                       f"\n    It takes the same arguments and returns the same results:\n{fn.__doc__}")
+    return wrapper
+
+libsais64 = _coroutine("libsais64")
+libsais64_bwt = _coroutine("libsais64_bwt")
+libsais64_bwt_aux = _coroutine("libsais64_bwt_aux")
+libsais64_unbwt = _coroutine("libsais64_unbwt")
+libsais64_unbwt_aux = _coroutine("libsais64_unbwt_aux")
+libsais64_plcp = _coroutine("libsais64_plcp")
+libsais64_lcp = _coroutine("libsais64_lcp")
+suffix_array = _coroutine("suffix_array")
+bwt = _coroutine("bwt")
+bwt_aux = _coroutine("bwt_aux")
+unbwt = _coroutine("unbwt")
+unbwt_aux = _coroutine("unbwt_aux")
+plcp = _coroutine("plcp")
+lcp = _coroutine("lcp")
+suffix_array16 = _coroutine("suffix_array16")
+plcp16 = _coroutine("plcp16")
+suffix_array_int = _coroutine("suffix_array_int")
+plcp_int = _coroutine("plcp_int")
+build_index = _coroutine("build_index")
+build_files = _coroutine("build_files")
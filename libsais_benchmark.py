@@ -0,0 +1,393 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_benchmark.py
+#
+# Reproducible benchmark suite for the libsais_wrapper.py functions: suffix
+# array, BWT, BWT with auxiliary indexes, inverse BWT (with and without
+# auxiliary indexes), PLCP and LCP construction. Sweeps input sizes, input
+# classes, thread counts, index widths and argument types (preallocated
+# buffers versus Python lists, to separate conversion cost from C time) and
+# reports throughput, latency percentiles, peak RSS and parallel efficiency as
+# JSON. A comparison mode reports regressions between two runs. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+__all__ = [
+    "make_input",
+    "run_case",
+    "run",
+    "compare"
+]
+
+FUNCTIONS = ("sa", "bwt", "bwt_aux", "unbwt", "unbwt_aux", "plcp", "lcp")
+INPUTS = ("random", "dna", "repetitive", "text")
+MODES = ("buffer", "list")
+
+_CHUNK = 1 << 24                                # input symbols generated per step
+_LETTERS = np.frombuffer(b"etaoinshrdlcumwfgypbvkjxqz", dtype=np.uint8)
+_LETTER_WEIGHTS = np.array([12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8, 2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1, 0.1])
+
+def _parse_size(text):
+    """Parse a size such as 4096, 64K, 16M or 2G (powers of 1024)."""
+    text = text.strip().upper().rstrip("B")
+    scale = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}.get(text[-1:], 1)
+    return int(float(text.rstrip("KMGT")) * scale)
+
+def _vocabulary(rng, words=4096):
+    """Random words with English letter frequencies, each followed by a space, and their Zipf probabilities."""
+    lengths = rng.integers(1, 11, words)
+    letters = rng.choice(_LETTERS, size=int(lengths.sum()), p=_LETTER_WEIGHTS / _LETTER_WEIGHTS.sum())
+    starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+    vocab = np.full(int((lengths + 1).sum()), ord(" "), dtype=np.uint8)
+    vocab[np.repeat(starts, lengths) + np.arange(len(letters)) - np.repeat(np.cumsum(lengths) - lengths, lengths)] = letters
+    p = 1.0 / np.arange(1, words + 1) ** 1.1
+    return vocab, starts, lengths + 1, p / p.sum()
+
+def _text(rng, n):
+    """Zipf-distributed words from a random vocabulary, generated with vectorized gathers."""
+    vocab, starts, lengths, p = _vocabulary(rng)
+    count = int(n / float((lengths * p).sum()) * 1.1) + 16
+    ids = rng.choice(len(p), size=count, p=p)
+    lens = lengths[ids]
+    ends = np.cumsum(lens)
+    cut = int(np.searchsorted(ends, n)) + 1
+    lens, ends = lens[:cut], ends[:cut]
+    offsets = np.arange(int(ends[-1])) - np.repeat(ends - lens, lens)
+    return vocab[np.repeat(starts[ids[:cut]], lens) + offsets][:n]
+
+def make_input(kind, n, seed=0):
+    """
+    Description:
+        The make_input function generates a reproducible benchmark input of n bytes, in chunks of 16 Mi so that inputs of several GB need little
+        more memory than the result. kind is one of:
+        "random": uniformly random bytes.
+        "dna": uniformly random A, C, G and T.
+        "repetitive": a 64 KiB block of text repeated, with one random letter changed every 10000 bytes.
+        "text": words drawn from a Zipf distribution over a random vocabulary with English letter frequencies.
+        "file:PATH": the first n bytes of a file, repeated if the file is shorter.
+
+    Arguments:
+        kind (str): The input class.
+        n (int): The input size in bytes.
+        seed (int, optional, default=0): The random seed.
+
+    Returns:
+        T (numpy.ndarray of uint8): The input.
+    """
+    if kind.startswith("file:"):
+        data = np.fromfile(kind[5:], dtype=np.uint8, count=n)
+        return np.resize(data, n) if len(data) else np.zeros(n, dtype=np.uint8)
+    T = np.empty(n, dtype=np.uint8)
+    if kind == "repetitive":
+        rng = np.random.default_rng(seed)
+        T[:] = np.resize(_text(rng, min(n, 1 << 16)), n)
+        positions = rng.integers(0, max(n, 1), n // 10000)
+        T[positions] = rng.choice(_LETTERS, size=len(positions))
+        return T
+    for k, i in enumerate(range(0, n, _CHUNK)):
+        rng = np.random.default_rng([seed, k])
+        m = min(_CHUNK, n - i)
+        if kind == "random":
+            T[i:i + m] = rng.integers(0, 256, m, dtype=np.uint8)
+        elif kind == "dna":
+            T[i:i + m] = np.frombuffer(b"ACGT", dtype=np.uint8)[rng.integers(0, 4, m)]
+        elif kind == "text":
+            T[i:i + m] = _text(rng, m)
+        else:
+            raise ValueError(f"unknown input class {kind!r}, expected one of {', '.join(INPUTS)} or file:PATH")
+    return T
+
+def _rss():
+    """The peak resident set size of this process in bytes, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _aux_rate(n):
+    """A power of two giving about 16 auxiliary indexes."""
+    return 1 << max(1, (max(n // 16, 2)).bit_length() - 1)
+
+def _prepare(function, T, width, threads, mode):
+    """Compute the inputs of function outside the timed region and return a callable running it once."""
+    n = len(T)
+    dtype = np.int32 if width == 32 else np.int64
+    kw = {"threads": threads, "index_width": str(width)}
+    r = _aux_rate(n)
+    if function in ("unbwt", "unbwt_aux", "plcp", "lcp"):
+        if function == "unbwt":
+            primary, U, _, _ = lw.bwt(T, np.empty(n, np.uint8), np.empty(n, dtype), **kw)
+        elif function == "unbwt_aux":
+            _, U, _, I, _ = lw.bwt_aux(T, r, np.empty(n, np.uint8), np.empty(n, dtype), np.empty((n - 1) // r + 1, dtype), **kw)
+        else:
+            _, SA, _ = lw.suffix_array(T, np.empty(n, dtype), **kw)
+            _, PLCP = lw.plcp(T, SA, np.empty(n, dtype), **kw)
+    if mode == "list":
+        # Python lists in, lists out: the same calls including the list conversions
+        L = T.tolist()
+        if function == "sa":
+            return lambda: lw.suffix_array(L, [], **kw)
+        if function == "bwt":
+            return lambda: lw.bwt(L, [], [], **kw)
+        if function == "bwt_aux":
+            return lambda: lw.bwt_aux(L, r, [], [], [], **kw)
+        if function == "unbwt":
+            Ul = U.tolist()
+            return lambda: lw.unbwt(Ul, primary, [], [], **kw)
+        if function == "unbwt_aux":
+            Ul, Il = U.tolist(), I.tolist()
+            return lambda: lw.unbwt_aux(Ul, r, Il, [], [], **kw)
+        SAl = SA.tolist()
+        if function == "plcp":
+            return lambda: lw.plcp(L, SAl, [], **kw)
+        PLCPl = PLCP.tolist()
+        return lambda: lw.lcp(PLCPl, SAl, [], **kw)
+    # Preallocated buffers: no conversion, the time is the C call and the argument checks
+    A = np.empty(n + 1, dtype)
+    out = np.empty(n, np.uint8)
+    if function == "sa":
+        return lambda: lw.suffix_array(T, A[:n], **kw)
+    if function == "bwt":
+        return lambda: lw.bwt(T, out, A[:n], **kw)
+    if function == "bwt_aux":
+        I_out = np.empty((n - 1) // r + 1, dtype)
+        return lambda: lw.bwt_aux(T, r, out, A[:n], I_out, **kw)
+    if function == "unbwt":
+        return lambda: lw.unbwt(U, primary, out, A, **kw)
+    if function == "unbwt_aux":
+        return lambda: lw.unbwt_aux(U, r, I, out, A, **kw)
+    if function == "plcp":
+        return lambda: lw.plcp(T, SA, A[:n], **kw)
+    if function == "lcp":
+        return lambda: lw.lcp(PLCP, SA, A[:n], **kw)
+    raise ValueError(f"unknown function {function!r}, expected one of {', '.join(FUNCTIONS)}")
+
+def _percentile(sorted_times, q):
+    return sorted_times[min(len(sorted_times) - 1, max(0, int(round(q / 100 * len(sorted_times) + 0.5)) - 1))]
+
+def run_case(function, kind, n, threads=1, index_width=32, mode="buffer", repeat=5, max_seconds=10.0, seed=0):
+    """
+    Description:
+        The run_case function times one benchmark case in the current process: one untimed warm-up call, then up to repeat timed calls,
+        stopping early once max_seconds have been spent.
+
+    Arguments:
+        function (str): One of FUNCTIONS.
+        kind (str): The input class, see make_input.
+        n (int): The input size in bytes.
+        threads (int, optional, default=1): The number of threads passed to the wrapper.
+        index_width (int, optional, default=32): 32 or 64.
+        mode (str, optional, default="buffer"): "buffer" (preallocated NumPy buffers) or "list" (Python lists).
+        repeat (int, optional, default=5): The maximum number of timed calls.
+        max_seconds (float, optional, default=10.0): The time budget of the timed calls.
+        seed (int, optional, default=0): The input seed.
+
+    Returns:
+        result (dict): The case parameters, the call times in seconds, their minimum, p50, p90, p99 and maximum, the throughput in MB/s at p50,
+        and the peak RSS of the process before and after the case.
+    """
+    baseline = _rss()
+    T = make_input(kind, n, seed)
+    call = _prepare(function, T, index_width, threads, mode)
+    result = call()
+    if result[0] < 0:
+        raise RuntimeError(f"{function} failed with error code {result[0]}")
+    del result
+    times = []
+    spent = 0.0
+    while len(times) < repeat and (not times or spent < max_seconds):
+        start = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - start)
+        spent += times[-1]
+    ordered = sorted(times)
+    p50 = _percentile(ordered, 50)
+    return {
+        "function": function, "input": kind, "size": n, "threads": threads, "index_width": index_width, "mode": mode,
+        "times": times, "min": ordered[0], "p50": p50, "p90": _percentile(ordered, 90), "p99": _percentile(ordered, 99), "max": ordered[-1],
+        "mbps": n / p50 / 1e6 if p50 > 0 else None,
+        "baseline_rss": baseline, "peak_rss": _rss()
+    }
+
+def _isolated(case):
+    """Run a case in a fresh interpreter so that its peak RSS is its own."""
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--case", json.dumps(case)], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return dict(case, error=(proc.stderr.strip().splitlines() or ["exit code %d" % proc.returncode])[-1])
+    return json.loads(proc.stdout)
+
+def _key(r, *skip):
+    return tuple(r[k] for k in ("function", "input", "size", "threads", "index_width", "mode") if k not in skip)
+
+def _summarize(results):
+    """Add speedup and parallel efficiency against the 1-thread run, and the list conversion share against the buffer run."""
+    ok = [r for r in results if "error" not in r]
+    single = {_key(r, "threads"): r["p50"] for r in ok if r["threads"] == 1}
+    buffers = {_key(r, "mode"): r["p50"] for r in ok if r["mode"] == "buffer"}
+    for r in ok:
+        t1 = single.get(_key(r, "threads"))
+        if t1 is not None and r["p50"] > 0:
+            r["speedup"] = t1 / r["p50"]
+            r["efficiency"] = r["speedup"] / r["threads"]
+        b = buffers.get(_key(r, "mode"))
+        if r["mode"] == "list" and b is not None and r["p50"] > 0:
+            r["conversion_seconds"] = r["p50"] - b
+            r["conversion_share"] = (r["p50"] - b) / r["p50"]
+    return results
+
+def run(functions=FUNCTIONS, inputs=INPUTS, sizes=(1 << 10, 1 << 16, 1 << 20, 1 << 24), threads=(1,), widths=(32, 64), modes=MODES,
+        repeat=5, max_seconds=10.0, list_max=1 << 22, isolate=True, seed=0, label=None, progress=None):
+    """
+    Description:
+        The run function runs the full sweep: every combination of function, input class, size, thread count, index width and mode.
+        Cases that cannot run are skipped: 32-bit indexes for inputs of 2^31 symbols or more, and list mode above list_max symbols.
+        With isolate=True every case runs in a separate interpreter, so peak_rss is the peak of that case alone.
+
+    Arguments:
+        functions, inputs, sizes, threads, widths, modes (iterables): The values to sweep.
+        repeat (int, optional, default=5): The maximum number of timed calls per case.
+        max_seconds (float, optional, default=10.0): The time budget of the timed calls of a case.
+        list_max (int, optional, default=4 Mi): The largest size run in list mode.
+        isolate (bool, optional, default=True): Run every case in a separate process.
+        seed (int, optional, default=0): The input seed.
+        label (str, optional, default=None): A name for this run, e.g. a version or commit, stored in the report.
+        progress (callable, optional, default=None): Called with every result as it completes.
+
+    Returns:
+        report (dict): {"meta": {...}, "results": [...]}, see run_case; results also get speedup and efficiency (against 1 thread), and
+        for list mode conversion_seconds and conversion_share (against buffer mode).
+    """
+    results = []
+    for function in functions:
+        for kind in inputs:
+            for n in sizes:
+                for width in widths:
+                    if width == 32 and n > lw._INT32_MAX:
+                        continue
+                    for mode in modes:
+                        if mode == "list" and n > list_max:
+                            continue
+                        for t in threads:
+                            case = {"function": function, "kind": kind, "n": n, "threads": t, "index_width": width, "mode": mode,
+                                    "repeat": repeat, "max_seconds": max_seconds, "seed": seed}
+                            if isolate:
+                                result = _isolated(case)
+                            else:
+                                try:
+                                    result = run_case(**case)
+                                except (RuntimeError, ValueError, MemoryError) as e:
+                                    result = dict(case, error=str(e))
+                            results.append(result)
+                            if progress is not None:
+                                progress(result)
+    meta = {
+        "label": label, "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "library": lw.library_info(), "omp": lw.omp_available(), "usable_cpus": lw.usable_cpus(),
+        "python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(), "machine": platform.machine(),
+        "isolated": isolate, "seed": seed
+    }
+    return {"meta": meta, "results": _summarize(results)}
+
+def compare(old, new, threshold=0.10):
+    """
+    Description:
+        The compare function matches the results of two reports by case and compares their p50 times.
+
+    Arguments:
+        old (dict): The baseline report.
+        new (dict): The report to check.
+        threshold (float, optional, default=0.10): The relative slowdown (or speedup) reported as a regression (or improvement).
+
+    Returns:
+        comparison (dict): "regressions" and "improvements" (each case with old and new p50 and their ratio), and the number of cases compared.
+    """
+    before = {_key(r): r for r in old["results"] if "error" not in r}
+    regressions, improvements, compared = [], [], 0
+    for r in new["results"]:
+        b = before.get(_key(r)) if "error" not in r else None
+        if b is None or not b["p50"]:
+            continue
+        compared += 1
+        ratio = r["p50"] / b["p50"]
+        entry = dict(zip(("function", "input", "size", "threads", "index_width", "mode"), _key(r)), old_p50=b["p50"], new_p50=r["p50"], ratio=ratio)
+        if ratio > 1 + threshold:
+            regressions.append(entry)
+        elif ratio < 1 / (1 + threshold):
+            improvements.append(entry)
+    return {"old": old["meta"].get("label"), "new": new["meta"].get("label"), "threshold": threshold,
+            "compared": compared, "regressions": regressions, "improvements": improvements}
+
+def _list(text, convert=str):
+    return [convert(v) for v in text.split(",") if v.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the libsais wrapper functions and report JSON.")
+    parser.add_argument("--functions", default=",".join(FUNCTIONS), help="comma-separated functions: " + ", ".join(FUNCTIONS))
+    parser.add_argument("--inputs", default=",".join(INPUTS), help="comma-separated input classes: " + ", ".join(INPUTS) + " or file:PATH")
+    parser.add_argument("--sizes", default="1K,64K,1M,16M", help="comma-separated input sizes, e.g. 1K,1M,1G,4G")
+    parser.add_argument("--threads", default=None, help="comma-separated thread counts (default: 1 and the usable CPUs)")
+    parser.add_argument("--widths", default="32,64", help="comma-separated index widths")
+    parser.add_argument("--modes", default=",".join(MODES), help="comma-separated argument modes: buffer, list")
+    parser.add_argument("--repeat", type=int, default=5, help="maximum timed calls per case")
+    parser.add_argument("--max-seconds", type=float, default=10.0, help="time budget of the timed calls of a case")
+    parser.add_argument("--list-max", default="4M", help="largest size run in list mode")
+    parser.add_argument("--no-isolate", action="store_true", help="run all cases in this process (peak RSS is then cumulative)")
+    parser.add_argument("--seed", type=int, default=0, help="input seed")
+    parser.add_argument("--label", default=None, help="name of this run, e.g. a version")
+    parser.add_argument("-o", "--output", default=None, help="write the report to this file instead of standard output")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT", help="compare against a baseline report: BASELINE (runs the benchmark) or BASELINE NEW")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative p50 change reported by --compare")
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.case:
+        json.dump(run_case(**json.loads(args.case)), sys.stdout)
+        return 0
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+    else:
+        cpus = lw.usable_cpus()
+        threads = _list(args.threads, int) if args.threads else sorted({1, cpus})
+        def progress(r):
+            status = r.get("error") or f"{r['mbps']:.2f} MB/s p50={r['p50'] * 1e3:.3f} ms"
+            print(f"{r['function']:9} {r.get('input', r.get('kind'))} n={r.get('size', r.get('n'))} threads={r['threads']} "
+                  f"width={r['index_width']} {r['mode']}: {status}", file=sys.stderr)
+        new = run(_list(args.functions), _list(args.inputs), _list(args.sizes, _parse_size), threads, _list(args.widths, int), _list(args.modes),
+                  args.repeat, args.max_seconds, _parse_size(args.list_max), not args.no_isolate, args.seed, args.label, progress)
+        old = None
+        if args.compare:
+            with open(args.compare[0]) as f:
+                old = json.load(f)
+
+    report = compare(old, new, args.threshold) if args.compare else new
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if args.compare and report["regressions"] else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,369 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_compress.py
+#
+# Block-parallel BWT compressor built on bwt_aux and unbwt_aux from
+# libsais_wrapper.py. The input stream is cut into blocks that are transformed
+# concurrently, run-length encoded, move-to-front coded and entropy coded, and
+# written to a framed container recording every block's auxiliary indexes and
+# sampling rate. Decompression decodes blocks in parallel with a bounded number
+# of blocks in memory. Works on files and pipes. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import argparse
+import collections
+import concurrent.futures
+import io
+import lzma
+import os
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "compress",
+    "decompress",
+    "compress_bytes",
+    "decompress_bytes"
+]
+
+_MAGIC = b"LIBSAISZ"
+_VERSION = 1
+_HEADER = struct.Struct("<8sBB6xQ")             # magic, version, entropy coder, block size
+_FRAME = struct.Struct("<QQI4xQQ")              # n (0 ends the stream), aux rate r, CRC-32, ranks size, run lengths size
+_BLOCK_SIZE = 8 << 20
+
+def _huffman(data, block_size):
+    coder = zlib.compressobj(9, zlib.DEFLATED, -15, 9, zlib.Z_HUFFMAN_ONLY)
+    return coder.compress(data) + coder.flush()
+
+def _inflate(data, block_size, limit):
+    return zlib.decompressobj(-15).decompress(data, limit + 1)
+
+def _lzma_filters(block_size):
+    """LZMA2 with a dictionary no larger than a block, so small blocks do not pay for the 64 MiB dictionary of preset 9."""
+    return [{"id": lzma.FILTER_LZMA2, "preset": 9, "dict_size": min(max(block_size, 4096), 64 << 20)}]
+
+# Entropy coders for the MTF ranks and run lengths: (id, encode(data, block_size), decode(data, block_size, limit)).
+# Decoders stop after limit + 1 bytes, so that a corrupt stream cannot expand beyond its block.
+_ENTROPY = {
+    "huffman": (1, _huffman, _inflate),
+    "lzma": (2, lambda data, block_size: lzma.compress(data, format=lzma.FORMAT_RAW, filters=_lzma_filters(block_size)),
+             lambda data, block_size, limit: lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=_lzma_filters(block_size)).decompress(data, limit + 1)),
+    "none": (0, lambda data, block_size: bytes(data), lambda data, block_size, limit: bytes(data))
+}
+_ENTROPY_NAMES = {v[0]: k for k, v in _ENTROPY.items()}
+
+def _aux_count(n, r):
+    return (n - 1) // r + 1
+
+def _max_stream_size(n):
+    """
+    Upper bound on the size of an entropy coded stream of a block of n bytes: the MTF ranks and the LEB128 run lengths both take
+    at most n bytes, and the stored blocks of deflate and LZMA2 add a few bytes per 16 and 64 KiB of incompressible data.
+    """
+    return n + (n >> 10) + 64
+
+def _default_aux_rate(block_size):
+    """The largest power of two <= block_size / 16, so every full block has 16 auxiliary indexes for parallel decoding."""
+    return 1 << max(1, (max(block_size // 16, 2)).bit_length() - 1)
+
+def _py_mtf_encode(symbols):
+    table = bytearray(range(256))
+    out = bytearray(len(symbols))
+    for k, c in enumerate(symbols):
+        i = table.index(c)
+        if i:
+            table[1:i + 1] = table[:i]
+            table[0] = c
+        out[k] = i
+    return bytes(out)
+
+def _py_mtf_decode(ranks):
+    table = bytearray(range(256))
+    out = bytearray(len(ranks))
+    for k, i in enumerate(ranks):
+        c = table[i]
+        if i:
+            table[1:i + 1] = table[:i]
+            table[0] = c
+        out[k] = c
+    return bytes(out)
+
+# The compiled loops (see "make kernels") implement the move-to-front coder in C; the loops above are the fallback
+try:
+    import _libsais_kernels as _kernels
+except ImportError:
+    _kernels = None
+_mtf_encode = getattr(_kernels, "mtf_encode", _py_mtf_encode)
+_mtf_decode = getattr(_kernels, "mtf_decode", _py_mtf_decode)
+
+def _varint_encode(values):
+    """LEB128-encode an array of non-negative integers."""
+    values = values.astype(np.uint64)
+    size = np.ones(len(values), dtype=np.int64)
+    for shift in range(7, 64, 7):
+        size += values >= np.uint64(1 << shift)
+    ends = np.cumsum(size)
+    starts = ends - size
+    out = np.zeros(int(ends[-1]) if len(values) else 0, dtype=np.uint8)
+    for j in range(int(size.max()) if len(values) else 0):
+        m = size > j
+        out[starts[m] + j] = ((values[m] >> np.uint64(7 * j)) & np.uint64(127)) | np.where(size[m] > j + 1, 128, 0).astype(np.uint64)
+    return out.tobytes()
+
+def _varint_decode(data):
+    data = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(data < 128)
+    if not len(ends):
+        return np.zeros(0, dtype=np.int64)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shift = (np.arange(len(data)) - np.repeat(starts, ends - starts + 1)) * 7
+    return np.add.reduceat((data & 127).astype(np.uint64) << shift.astype(np.uint64), starts).astype(np.int64)
+
+def _encode_block(data, block_size, r, entropy, threads):
+    """Transform and encode one block, returning its frame."""
+    n = len(data)
+    result, U, _, I, _ = lw.bwt_aux(data, r, threads=threads)
+    if result != 0:
+        raise RuntimeError(f"libsais_bwt_aux failed with error code {result}")
+    U = np.frombuffer(U, dtype=np.uint8)
+    heads = np.flatnonzero(np.concatenate(([True], U[1:] != U[:-1])))
+    lengths = np.diff(np.append(heads, n)) - 1
+    encode = _ENTROPY[entropy][1]
+    ranks = encode(_mtf_encode(U[heads].tobytes()), block_size)
+    runs = encode(_varint_encode(lengths), block_size)
+    aux = np.asarray(I, dtype="<i8").tobytes()
+    return _FRAME.pack(n, r, zlib.crc32(data), len(ranks), len(runs)) + aux + ranks + runs
+
+def _decode_block(payload, block_size, n, r, crc, ranks_size, entropy, threads):
+    """Decode the payload of one frame back to the block."""
+    naux = _aux_count(n, r)
+    I = np.frombuffer(payload, dtype="<i8", count=naux)
+    I = I.astype(np.int32 if n <= lw._INT32_MAX else np.int64)
+    decode = _ENTROPY[entropy][2]
+    ranks = decode(payload[naux * 8:naux * 8 + ranks_size], block_size, n)
+    runs = decode(payload[naux * 8 + ranks_size:], block_size, n)
+    if len(ranks) > n or len(runs) > n:
+        raise ValueError("corrupt block: coded streams are longer than the block")
+    heads = np.frombuffer(_mtf_decode(ranks), dtype=np.uint8)
+    lengths = _varint_decode(runs) + 1
+    if len(heads) != len(lengths) or lengths.sum() != n:
+        raise ValueError("corrupt block: run lengths do not match the block size")
+    result, T, _ = lw.unbwt_aux(np.repeat(heads, lengths), r, I, threads=threads)
+    if result != 0:
+        raise ValueError(f"corrupt block: libsais_unbwt_aux failed with error code {result}")
+    T = bytes(T)
+    if zlib.crc32(T) != crc:
+        raise ValueError("corrupt block: CRC-32 mismatch")
+    return T
+
+def _read(f, size):
+    """Read up to size bytes, looping over short reads from pipes."""
+    chunks = []
+    while size > 0:
+        chunk = f.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def _read_exact(f, size):
+    data = _read(f, size)
+    if len(data) != size:
+        raise ValueError("truncated stream")
+    return data
+
+class _Pipeline:
+    """Run tasks on a process pool (or inline for one worker) and yield their results in order, with at most max_pending in flight."""
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers or lw.usable_cpus()
+        self.max_pending = max_pending or 2 * self.workers
+        self.pool = concurrent.futures.ProcessPoolExecutor(self.workers) if self.workers > 1 else None
+        self.pending = collections.deque()
+
+    def submit(self, fn, *args):
+        """Queue a task and return the results that had to be waited for to stay within max_pending."""
+        if self.pool is None:
+            return [fn(*args)]
+        self.pending.append(self.pool.submit(fn, *args))
+        done = []
+        while len(self.pending) >= self.max_pending:
+            done.append(self.pending.popleft().result())
+        return done
+
+    def drain(self):
+        while self.pending:
+            yield self.pending.popleft().result()
+
+    def close(self):
+        if self.pool is not None:
+            for future in self.pending:
+                future.cancel()
+            self.pool.shutdown()
+
+def _open(f, mode):
+    if isinstance(f, (str, bytes, os.PathLike)):
+        return open(f, mode), True
+    return f, False
+
+def compress(src, dst, block_size=_BLOCK_SIZE, aux_rate=None, entropy="huffman", workers=None, threads=1, max_pending=None):
+    """
+    Description:
+        The compress function compresses a stream block by block. Each block is transformed with bwt_aux, its BWT is split into runs,
+        the run heads are move-to-front coded and the run lengths LEB128 coded, and both streams are entropy coded. Blocks are processed
+        concurrently on a process pool and written in order; at most max_pending blocks are held in memory at once.
+
+    Arguments:
+        src (str or binary file object): The input path or stream, e.g. sys.stdin.buffer.
+        dst (str or binary file object): The output path or stream, e.g. sys.stdout.buffer.
+        block_size (int, optional, default=8 MiB): The block size in bytes, at most 2^31 - 1.
+        aux_rate (int, optional, default=None): The sampling rate of the auxiliary indexes, a power of two >= 2. More indexes let a block be
+            inverted with more threads. If None, the largest power of two <= block_size / 16 is used.
+        entropy (str, optional, default="huffman"): The entropy coder: "huffman" (zlib, Huffman only), "lzma" (LZMA2 range coder, slower and smaller) or "none".
+        workers (int, optional, default=None): The number of worker processes, all usable CPUs if None. 1 runs in the calling process.
+        threads (int, optional, default=1): The number of OpenMP threads per block.
+        max_pending (int, optional, default=None): The maximum number of blocks in flight, 2 * workers if None.
+
+    Returns:
+        size_in (int): The number of bytes read.
+        size_out (int): The number of bytes written.
+
+    Raises:
+        ValueError: If block_size, aux_rate or entropy is invalid.
+    """
+    if not 0 < block_size <= lw._INT32_MAX:
+        raise ValueError(f"block_size must be between 1 and {lw._INT32_MAX}, got {block_size}")
+    r = _default_aux_rate(block_size) if aux_rate is None else aux_rate
+    if r < 2 or r & (r - 1):
+        raise ValueError(f"aux_rate must be a power of two >= 2, got {r}")
+    if entropy not in _ENTROPY:
+        raise ValueError(f"entropy must be one of {', '.join(_ENTROPY)}, got {entropy!r}")
+    src, close_src = _open(src, "rb")
+    dst, close_dst = _open(dst, "wb")
+    pipeline = _Pipeline(workers, max_pending)
+    size_in = size_out = 0
+    try:
+        header = _HEADER.pack(_MAGIC, _VERSION, _ENTROPY[entropy][0], block_size)
+        dst.write(header)
+        size_out += len(header)
+        while True:
+            data = _read(src, block_size)
+            if not data:
+                break
+            size_in += len(data)
+            for frame in pipeline.submit(_encode_block, data, block_size, r, entropy, threads):
+                dst.write(frame)
+                size_out += len(frame)
+        for frame in pipeline.drain():
+            dst.write(frame)
+            size_out += len(frame)
+        end = _FRAME.pack(0, 0, 0, 0, 0)
+        dst.write(end)
+        dst.flush()
+        return size_in, size_out + len(end)
+    finally:
+        pipeline.close()
+        if close_src:
+            src.close()
+        if close_dst:
+            dst.close()
+
+def decompress(src, dst, workers=None, threads=1, max_pending=None):
+    """
+    Description:
+        The decompress function decompresses a stream written by compress. Frames are read sequentially and decoded concurrently on a process
+        pool with unbwt_aux, and written in order; at most max_pending blocks are held in memory at once.
+
+    Arguments:
+        src (str or binary file object): The input path or stream.
+        dst (str or binary file object): The output path or stream.
+        workers (int, optional, default=None): The number of worker processes, all usable CPUs if None. 1 runs in the calling process.
+        threads (int, optional, default=1): The number of OpenMP threads per block; up to one per auxiliary index is used.
+        max_pending (int, optional, default=None): The maximum number of blocks in flight, 2 * workers if None.
+
+    Returns:
+        size_in (int): The number of bytes read.
+        size_out (int): The number of bytes written.
+
+    Raises:
+        ValueError: If the stream is not a compressed stream, is truncated or corrupt.
+    """
+    src, close_src = _open(src, "rb")
+    dst, close_dst = _open(dst, "wb")
+    pipeline = _Pipeline(workers, max_pending)
+    size_out = 0
+    try:
+        magic, version, entropy_id, block_size = _HEADER.unpack(_read_exact(src, _HEADER.size))
+        if magic != _MAGIC or version != _VERSION or entropy_id not in _ENTROPY_NAMES:
+            raise ValueError("not a libsais compressed stream")
+        entropy = _ENTROPY_NAMES[entropy_id]
+        size_in = _HEADER.size
+        while True:
+            n, r, crc, ranks_size, runs_size = _FRAME.unpack(_read_exact(src, _FRAME.size))
+            size_in += _FRAME.size
+            if n == 0:
+                break
+            # The sizes are checked before the payload is read, so a corrupt header cannot force a large allocation
+            if n > block_size or r < 2 or r & (r - 1) or ranks_size > _max_stream_size(n) or runs_size > _max_stream_size(n):
+                raise ValueError("corrupt frame header")
+            payload = _read_exact(src, _aux_count(n, r) * 8 + ranks_size + runs_size)
+            size_in += len(payload)
+            for block in pipeline.submit(_decode_block, payload, block_size, n, r, crc, ranks_size, entropy, threads):
+                dst.write(block)
+                size_out += len(block)
+        for block in pipeline.drain():
+            dst.write(block)
+            size_out += len(block)
+        dst.flush()
+        return size_in, size_out
+    finally:
+        pipeline.close()
+        if close_src:
+            src.close()
+        if close_dst:
+            dst.close()
+
+def compress_bytes(data, **kwargs):
+    """Compress a bytes-like object in memory; keyword arguments are passed to compress."""
+    out = io.BytesIO()
+    compress(io.BytesIO(data), out, **kwargs)
+    return out.getvalue()
+
+def decompress_bytes(data, **kwargs):
+    """Decompress a bytes-like object in memory; keyword arguments are passed to decompress."""
+    out = io.BytesIO()
+    decompress(io.BytesIO(data), out, **kwargs)
+    return out.getvalue()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Block-parallel BWT compressor using libsais. Reads standard input and writes standard output by default.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, - for standard input")
+    parser.add_argument("output", nargs="?", default="-", help="output file, - for standard output")
+    parser.add_argument("-d", "--decompress", action="store_true", help="decompress")
+    parser.add_argument("-b", "--block-size", type=int, default=_BLOCK_SIZE, help="block size in bytes")
+    parser.add_argument("--aux-rate", type=int, default=None, help="sampling rate of the auxiliary indexes (power of two)")
+    parser.add_argument("-e", "--entropy", choices=sorted(_ENTROPY), default="huffman", help="entropy coder")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--threads", type=int, default=1, help="OpenMP threads per block")
+    args = parser.parse_args(argv)
+    src = sys.stdin.buffer if args.input == "-" else args.input
+    dst = sys.stdout.buffer if args.output == "-" else args.output
+    try:
+        if args.decompress:
+            decompress(src, dst, workers=args.workers, threads=args.threads)
+        else:
+            compress(src, dst, block_size=args.block_size, aux_rate=args.aux_rate, entropy=args.entropy, workers=args.workers, threads=args.threads)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_external.py
+#
+# External-memory suffix array construction for inputs larger than RAM. The
+# input file is cut into blocks of B bytes sized to the RAM budget, aligned on
+# the end of the input, and the blocks are merged from right to left into the
+# suffixes after them, whose ranks among themselves are kept in a scratch
+# file. A block is sorted in memory by libsais over the block extended by B
+# bytes of the text; the suffixes that the extended block cannot tell apart
+# share a prefix of at least B bytes (found from the PLCP array), and their
+# order is that of the suffixes B bytes later, whose ranks are in the scratch
+# file. No suffixes are compared on the input. Then a single right-to-left
+# scan over the input after the block counts, for every suffix there, the
+# smaller suffixes of the block, by backward search over the BWT of the block
+# (the gap array of SAscan); the ranks in the scratch file are increased by
+# these counts and those of the block follow from them. The work is about
+# n^2 / (2B) steps of the scan, one per suffix after each block. The suffix
+# array is written sequentially to a file in the build_files format by
+# scattering every block into windows of rows by rank. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import os
+import tempfile
+
+import numpy as np
+
+import libsais_async
+import libsais_wrapper as lw
+
+try:
+    import _libsais_kernels as _kernels
+except ImportError:
+    _kernels = None
+
+__all__ = [
+    "build_sa_external",
+    "estimate_disk"
+]
+
+# Bytes of RAM per symbol of a block: the window of 2 blocks with its 32-bit suffix and PLCP arrays and the group labels when sorting,
+# then the sorted suffixes, the BWT with its checkpoints and the gap array when scanning
+_BLOCK_BYTES = 40
+# Bytes of RAM per suffix array row written at a time, including the ranks and block offsets read for it
+_OUTPUT_BYTES = 40
+# Bound on the block length, so that the window of a block has 32-bit indexes
+_MAX_BLOCK = lw._INT32_MAX // 2
+# Rows of the BWT of a block between two checkpoints of its symbol counts, as in gap_scan
+_CHECKPOINT = 256
+
+def _block_length(ram_budget):
+    """Return the number of suffixes per block within ram_budget bytes."""
+    return max(min(ram_budget // _BLOCK_BYTES, _MAX_BLOCK), 1)
+
+def estimate_disk(n, index_width=lw._DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The estimate_disk function estimates the disk space used by build_sa_external for an input of n bytes: the scratch files and the output file.
+
+    Arguments:
+        n (int): The length of the input.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", the index width of the output file.
+
+    Returns:
+        scratch (int): The bytes of the sorted blocks and of their ranks, freed when build_sa_external returns.
+        output (int): The bytes of the output file.
+    """
+    width = lw._index_width(index_width, n)
+    return n * (4 + width // 8), lw._FILE_ALIGN + n * width // 8
+
+def _block_starts(n, block):
+    """Return the start of every block and n: the blocks have block bytes, except the first one."""
+    count = -(-n // block)
+    return np.concatenate(([0], n - block * np.arange(count - 1, 0, -1, dtype=np.int64), [n]))
+
+def _inverse(order):
+    """Return the rank of every entry of the permutation order."""
+    rank = np.empty(order.size, dtype=np.int64 if order.size > lw._INT32_MAX else np.int32)
+    rank[order] = np.arange(order.size, dtype=rank.dtype)
+    return rank
+
+def _sort_block(text, n, start, stop, block, ranks, threads):
+    """
+    Sort the suffixes starting in start..stop-1 by their first block bytes, with one libsais call over the block extended by block bytes
+    of the text, then by the ranks of the suffixes block bytes later among the suffixes from stop, read from ranks. Returns the sorted
+    suffixes by offset in the block.
+    """
+    end = min(stop + block, n)
+    length, count = end - start, stop - start
+    T = np.array(text[start:end], dtype=np.uint8)
+    SA = np.empty(length, dtype=np.int32)
+    lw._check(lw._sa(T, SA, length, 0, None, threads, 32)[0], "suffix_array")
+    PLCP = np.empty(length, dtype=np.int32)
+    lw._check(lw._plcp(T, SA, PLCP, length, threads, 32)[0], "plcp")
+    del T
+    order = np.empty(count, dtype=np.int32)
+    labels = np.empty(count, dtype=np.int32)
+    filled = last = 0
+    chunk = max(1 << 12, block // 8)
+    for row in range(0, length, chunk):
+        sa = SA[row:row + chunk]
+        # Rows are grouped while their LCP with the previous row is at least block, counting the rows of suffixes outside the block
+        label = last + np.cumsum(PLCP[sa] < block)
+        last = label[-1]
+        kept = sa < count
+        m = int(np.count_nonzero(kept))
+        order[filled:filled + m] = sa[kept]
+        labels[filled:filled + m] = label[kept]
+        filled += m
+    del SA, PLCP, sa, label, kept
+    # Suffixes sharing their first block bytes are ordered by the suffixes block bytes later; past the end of the input, first
+    if np.any(labels[1:] == labels[:-1]):
+        after = _inverse(np.argsort(ranks[start + block:end], kind="stable"))
+        key = labels.astype(np.int64)
+        del labels
+        key *= count + 1
+        for row in range(0, count, chunk):
+            suffixes = order[row:row + chunk]
+            inside = suffixes < after.size
+            key[row:row + chunk][inside] += after[suffixes[inside]] + 1
+        del after, suffixes, inside
+        perm = np.argsort(key, kind="stable")
+        del key
+        order = order[perm]
+    return order
+
+def _py_gap_scan(text, ranks, bwt, checkpoints, counts, primary, tail, tail_rank, next_rank, next_gap, gaps):
+    """The loop of gap_scan in _libsais_kernels.c."""
+    rank, gap = next_rank, next_gap
+    for k in range(len(text) - 1, -1, -1):
+        c = int(text[k])
+        q = (gap + _CHECKPOINT // 2) // _CHECKPOINT * _CHECKPOINT
+        occ = int(checkpoints[q // _CHECKPOINT, c])
+        if q > gap:
+            occ -= int(np.count_nonzero(bwt[gap:q] == c))
+        else:
+            occ += int(np.count_nonzero(bwt[q:gap] == c))
+        if c == 0 and primary < gap:
+            occ -= 1
+        following = int(counts[c]) + occ + (c == tail and tail_rank < rank)
+        rank, gap = int(ranks[k]), following
+        ranks[k] = rank + gap
+        gaps[gap] += 1
+    return rank, gap
+
+# The compiled loops (see "make kernels") implement the scan in C; the loop above is the fallback
+_gap_scan = getattr(_kernels, "gap_scan", _py_gap_scan)
+
+def _gap_array(text, n, start, stop, order, ranks, window):
+    """
+    Rank the suffixes from stop among the sorted suffixes order of the block start..stop-1, by backward search over the BWT of the block
+    from the end of the input: their ranks in ranks are increased by the number of smaller suffixes of the block. Returns the gap array,
+    the number of suffixes from stop for each number of smaller suffixes of the block.
+    """
+    count = stop - start
+    rows = -(-count // _CHECKPOINT) * _CHECKPOINT
+    gaps = np.zeros(rows + 1, dtype=np.int64)
+    if stop == n:
+        return gaps[:count + 1]
+    # The symbol preceding every sorted suffix, 0 for the one starting the block, and the suffixes starting with a smaller symbol
+    symbols = np.array(text[start:stop], dtype=np.uint8)
+    counts = np.zeros(256, dtype=np.int64)
+    counts[1:] = np.cumsum(np.bincount(symbols, minlength=256))[:-1]
+    tail = int(symbols[-1])
+    bwt = np.zeros(rows, dtype=np.uint8)
+    for row in range(0, count, window):
+        part = order[row:row + window]
+        bwt[row:row + part.size] = symbols[part - 1]
+    del symbols
+    primary = int(np.argmin(order))
+    bwt[primary] = 0
+    # Symbol counts before every _CHECKPOINT-th row
+    checkpoints = np.zeros((rows // _CHECKPOINT + 1, 256), dtype=np.int32)
+    step = max(1, window // _CHECKPOINT) * _CHECKPOINT
+    for row in range(0, rows, step):
+        part = bwt[row:row + step]
+        index = np.arange(part.size, dtype=np.int64) // _CHECKPOINT * 256 + part
+        first = row // _CHECKPOINT + 1
+        checkpoints[first:first + part.size // _CHECKPOINT] = np.bincount(index, minlength=part.size // _CHECKPOINT * 256).reshape(-1, 256)
+    del part, index
+    np.cumsum(checkpoints, axis=0, dtype=np.int32, out=checkpoints)
+    # The suffixes after the chunk of the scan carry their previous rank and their number of smaller suffixes of the block
+    tail_rank = int(ranks[stop])
+    rank, gap = -1, 0
+    for end in range(n, stop, -window):
+        begin = max(end - window, stop)
+        values = np.array(ranks[begin:end], dtype=np.int64)
+        rank, gap = _gap_scan(text[begin:end], values, bwt, checkpoints, counts, primary, tail, tail_rank, rank, gap, gaps)
+        ranks[begin:end] = values
+    return gaps[:count + 1]
+
+def build_sa_external(input_path, output_path, ram_budget=None, disk_budget=None, scratch_dir=None, threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The build_sa_external function constructs the suffix array of a file that may be larger than RAM, into a file in the build_files format.
+        The input is cut into blocks sized to ram_budget, which are merged from right to left into the suffixes after them. Every block is
+        sorted with libsais, extended by one block of the text, suffixes sharing a prefix longer than a block being ordered by the ranks of the
+        suffixes after the block; then one scan over the rest of the input ranks its suffixes among those of the block. The input is never
+        compared; it is memory-mapped and read sequentially. The work is about n^2 / (2 * block) steps of the scan, each reading a byte of the
+        input and updating a rank in the scratch files, with blocks of ram_budget / 40 bytes; it runs in C when _libsais_kernels is built
+        (see "make kernels"), and in Python otherwise. An input of up to 2 blocks is handed to build_files.
+
+    Arguments:
+        input_path (str): The input file, taken as a string of bytes.
+        output_path (str): The output file for the suffix array; it can be opened with open_index_file.
+        ram_budget (int, optional, default=None): The memory used for sorting, scanning and writing, in bytes. If None, half of the physical memory (or of the cgroup memory limit) is used.
+        disk_budget (int, optional, default=None): The disk space available for the scratch files and the output, in bytes. If None, it is not checked.
+        scratch_dir (str, optional, default=None): The directory in which a temporary directory for the scratch files is created. If None, the directory of output_path is used.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads used by libsais for every block.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", the index width of the output file, see suffix_array.
+
+    Returns:
+        header (IndexFileHeader): The header of the written file.
+
+    Raises:
+        ValueError: If the scratch files and the output do not fit disk_budget.
+        RuntimeError: If a libsais function returns an error code.
+    """
+    n = os.path.getsize(input_path)
+    if ram_budget is None:
+        ram_budget = libsais_async._memory_limit() // 2
+    if disk_budget is not None and sum(estimate_disk(n, index_width)) > disk_budget:
+        raise ValueError(f"an input of {n} bytes needs {sum(estimate_disk(n, index_width))} bytes of disk, the budget is {disk_budget}")
+    block = _block_length(ram_budget)
+    # A block is sorted over a window of 2 blocks
+    if n <= 2 * block:
+        return lw.build_files(input_path, sa=output_path, threads=threads, index_width=index_width)["SA"]
+
+    width = lw._index_width(index_width, n)
+    typecode = lw._TYPECODES[lw._INDEX_CTYPES[width]]
+    text = np.memmap(input_path, dtype=np.uint8, mode="r")
+    starts = _block_starts(n, block)
+    count = starts.size - 1
+    window = max(1 << 12, block // 8)
+    with tempfile.TemporaryDirectory(prefix="libsais-", dir=scratch_dir or os.path.dirname(os.path.abspath(output_path))) as scratch:
+        # The suffixes of every block by offset, in sorted order, and the ranks of the suffixes from the last merged block among themselves
+        sorted_blocks = np.memmap(os.path.join(scratch, "blocks"), dtype=np.int32, mode="w+", shape=n)
+        ranks = np.memmap(os.path.join(scratch, "ranks"), dtype=typecode, mode="w+", shape=n)
+        for c in range(count - 1, -1, -1):
+            start, stop = int(starts[c]), int(starts[c + 1])
+            order = _sort_block(text, n, start, stop, block, ranks, threads)
+            sorted_blocks[start:stop] = order
+            gaps = _gap_array(text, n, start, stop, order, ranks, window)
+            # A suffix of the block follows the suffixes after it with at most as many smaller suffixes of the block
+            below = np.cumsum(gaps[:-1])
+            del gaps
+            below += np.arange(order.size)
+            ranks[start:stop][order] = below
+            del order, below
+            sorted_blocks.flush()
+            ranks.flush()
+        # Within a block the ranks of the sorted suffixes increase; they replace the ranks by offset
+        for c in range(count):
+            start, stop = int(starts[c]), int(starts[c + 1])
+            ranks[start:stop] = ranks[start:stop][sorted_blocks[start:stop]]
+        out = lw._OutputFile(output_path, "SA", width, n, 0, n)
+        try:
+            SA = np.frombuffer(out.data, dtype=typecode)
+            # Every window of rows takes the next suffixes of every block
+            cursor = starts[:-1].copy()
+            window = max(1, ram_budget // _OUTPUT_BYTES)
+            for row in range(0, n, window):
+                for c in range(count):
+                    start = int(cursor[c])
+                    stop = start + int(np.searchsorted(ranks[start:starts[c + 1]], row + window))
+                    SA[ranks[start:stop]] = sorted_blocks[start:stop].astype(np.int64) + starts[c]
+                    cursor[c] = stop
+            del SA
+        except BaseException:
+            out.abort()
+            raise
+        finally:
+            del sorted_blocks, ranks
+        return out.close()
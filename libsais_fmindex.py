@@ -0,0 +1,354 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_fmindex.py
+#
+# FM-index over the Burrows-Wheeler transform computed by libsais_wrapper.py,
+# answering count and locate queries for byte patterns. Rank tables are stored
+# as sampled NumPy blocks, the suffix array is sampled at a configurable rate,
+# queries are processed in vectorized batches, and an index can be saved to a
+# single file and loaded again through mmap. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import mmap
+import struct
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "FMIndex"
+]
+
+_MAGIC = b"FMINDEX\x00"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIIqqqI4x")          # magic, version, block_size, sa_rate, n, primary, number of arrays
+_ENTRY = struct.Struct("<8s8sqqq")              # name, dtype, offset, rows, columns (0 for 1-D arrays)
+_ALIGN = 64
+_ARRAYS = ("U", "C", "code", "super", "blocks", "marks", "mrank", "samples")
+
+_SUPER_SHIFT = 16                               # superblocks of 65536 symbols hold absolute counts
+_CHUNK = 1 << 22                                # symbols per pass when building tables or sampling the SA
+
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def _popcount64(x):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(x).astype(np.int64)
+    x = np.ascontiguousarray(x, dtype=np.uint64)
+    return _POPCOUNT8[x.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.int64)
+
+def _as_pattern(pattern):
+    if isinstance(pattern, str):
+        pattern = pattern.encode("utf-8")
+    view = memoryview(pattern)
+    return np.frombuffer(view if view.itemsize == 1 else view.cast('B'), dtype=np.uint8)
+
+def _default_block_size(sigma):
+    """Smallest power of two >= 4 * sigma within [64, 4096]: at most about half a byte of rank table per symbol."""
+    return min(4096, max(64, 1 << (4 * sigma - 1).bit_length()))
+
+class FMIndex:
+    """
+    Description:
+        An FM-index of a byte string T, made of the BWT of T as returned by libsais_bwt / libsais64_bwt (U and the primary index), the C array
+        derived from the character frequencies, occurrence counts of every symbol sampled every block_size symbols of U (relative 16-bit counts,
+        with absolute counts every 65536 symbols), and every sa_rate-th text position of the suffix array for locate queries.
+
+        Suffix array rows are numbered as in the BWT matrix of T with a sentinel: row 0 is the empty suffix at position n and row i > 0 is the
+        suffix SA[i - 1]. count, find and locate take a single pattern; count_many, find_many and locate_many take a batch of patterns and process
+        them together with vectorized NumPy steps.
+
+    Attributes:
+        n (int): The length of T.
+        primary (int): The primary index returned by libsais_bwt.
+        block_size (int): The number of symbols between rank samples.
+        sa_rate (int): The suffix array sampling rate, or 0 if the index cannot locate.
+    """
+
+    def __init__(self, U, primary, freq=None, SA=None, sa_rate=32, block_size=None):
+        """
+        Description:
+            Builds the rank tables and suffix array samples from the output of libsais_bwt or libsais64_bwt.
+
+        Arguments:
+            U (buffer): The BWT of T, n bytes.
+            primary (int): The primary index returned with U.
+            freq (list or buffer, optional, default=None): The 256 character frequencies returned with U. If None, they are counted from U.
+            SA (buffer, optional, default=None): The suffix array of T, n 32- or 64-bit integers. Required for locate queries.
+            sa_rate (int, optional, default=32): Sample every sa_rate-th text position of SA. A locate query takes at most sa_rate - 1 LF steps per occurrence.
+            block_size (int, optional, default=None): The number of symbols between rank samples, a power of two between 64 and 65536.
+                If None, the smallest power of two >= 4 * sigma within [64, 4096] is used.
+        """
+        self.U = _as_pattern(U)
+        self.n = len(self.U)
+        self.primary = int(primary)
+        if freq is None:
+            freq = np.bincount(self.U, minlength=256)
+        freq = np.asarray(freq, dtype=np.int64)
+        symbols = np.flatnonzero(freq)
+        self.code = np.full(256, -1, dtype=np.int16)
+        self.code[symbols] = np.arange(len(symbols))
+        self.C = np.zeros(257, dtype=np.int64)
+        np.cumsum(freq, out=self.C[1:])
+        self.C += 1
+
+        B = _default_block_size(len(symbols)) if block_size is None else int(block_size)
+        if B < 64 or B > 1 << _SUPER_SHIFT or B & (B - 1):
+            raise ValueError(f"block_size must be a power of two between 64 and 65536, got {B}")
+        self.block_size = B
+        self._build_rank(max(len(symbols), 1))
+
+        self.sa_rate = int(sa_rate) if SA is not None else 0
+        if self.sa_rate:
+            self._sample(SA)
+        else:
+            self.marks = np.zeros(0, dtype=np.uint64)
+            self.mrank = np.zeros(0, dtype=np.int64)
+            self.samples = np.zeros(0, dtype=np.uint32)
+
+    @classmethod
+    def build(cls, T, sa_rate=32, block_size=None, threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+        """
+        Description:
+            Builds the FM-index of T. If sa_rate is not 0, the suffix array is computed once with build_index, the BWT is derived from it and
+            the locate samples are taken from it; otherwise the BWT and the character frequencies are computed with bwt (libsais_bwt or libsais64_bwt).
+
+        Arguments:
+            T (bytes-like or str): The input string. A str is encoded as UTF-8.
+            sa_rate (int, optional, default=32): The suffix array sampling rate, or 0 for an index that only counts.
+            block_size (int, optional, default=None): The number of symbols between rank samples, see FMIndex.
+            threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+            index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+        Returns:
+            index (FMIndex): The FM-index of T.
+
+        Raises:
+            RuntimeError: If a libsais function returns an error code.
+        """
+        T = _as_pattern(T)
+        if sa_rate:
+            # The suffixes are sorted once, and the BWT is read off the suffix array; the frequencies are counted from the BWT
+            index = lw.build_index(T, want=("sa", "bwt"), threads=threads, index_width=index_width)
+            return cls(index["bwt"], index["primary"], SA=index["sa"], sa_rate=sa_rate, block_size=block_size)
+        primary, U, _, freq = lw.bwt(T, freq=[], threads=threads, index_width=index_width)
+        if primary < 0:
+            raise RuntimeError(f"BWT construction failed with error code {primary}")
+        return cls(U, primary, freq=freq, block_size=block_size)
+
+    def _build_rank(self, sigma):
+        """Fill super[j >> 16] and blocks[j // B] with the occurrences of every symbol code in U[:j] at superblock and block starts."""
+        U, n, B = self.U, self.n, self.block_size
+        per = (1 << _SUPER_SHIFT) // B
+        nb = n // B + 1
+        self.super = np.zeros(((n >> _SUPER_SHIFT) + 1, sigma), dtype=np.int64)
+        self.blocks = np.zeros((nb, sigma), dtype=np.uint16)
+        step = max(per, _CHUNK // B)
+        keys = (np.arange(step * B, dtype=np.int64) // B) * sigma
+        running = np.zeros(sigma, dtype=np.int64)
+        for b0 in range(0, nb, step):
+            b1 = min(nb, b0 + step)
+            seg = U[b0 * B:b1 * B]
+            counts = np.bincount(keys[:len(seg)] + self.code[seg], minlength=(b1 - b0) * sigma).reshape(b1 - b0, sigma)
+            before = np.cumsum(counts, axis=0)
+            before -= counts
+            before += running
+            running = before[-1] + counts[-1]
+            heads = before[::per]
+            self.super[b0 // per:b0 // per + len(heads)] = heads
+            self.blocks[b0:b1] = before - np.repeat(heads, per, axis=0)[:b1 - b0]
+
+    def _sample(self, SA):
+        """Mark the rows whose suffix starts at a multiple of sa_rate and keep their positions divided by sa_rate."""
+        n, s = self.n, self.sa_rate
+        with memoryview(SA) as view:
+            SA = np.frombuffer(view.cast('B'), dtype=np.int32 if view.itemsize == 4 else np.int64, count=n)
+        bits = np.zeros((n + 1 + 63) // 64 * 64, dtype=bool)
+        bits[0] = n % s == 0
+        samples = [np.array([n // s] if bits[0] else [], dtype=np.int64)]
+        for i in range(0, n, _CHUNK):
+            chunk = SA[i:i + _CHUNK]
+            hit = chunk % s == 0
+            bits[i + 1:i + 1 + len(chunk)] = hit
+            samples.append(chunk[hit] // s)
+        self.marks = np.packbits(bits, bitorder="little").view(np.uint64)
+        self.mrank = np.zeros(len(self.marks), dtype=np.int64)
+        np.cumsum(_popcount64(self.marks)[:-1], out=self.mrank[1:])
+        self.samples = np.concatenate(samples).astype(np.min_scalar_type(max(n // s, 0)))
+
+    def _occ(self, c, i):
+        """The number of occurrences of the symbols c in rows [0, i) of the BWT, vectorized over arrays c and i."""
+        B = self.block_size
+        j = i - (i > self.primary)
+        code = self.code[c]
+        result = self.super[j >> _SUPER_SHIFT, code] + self.blocks[j // B, code]
+        base = j - j % B
+        width = j - base
+        if self.n == 0 or not width.any():
+            return result
+        offsets = np.arange(B)
+        step = max(1, _CHUNK // B)
+        for k in range(0, len(j), step):
+            sl = slice(k, k + step)
+            idx = np.minimum(base[sl, None] + offsets, self.n - 1)
+            hit = (self.U[idx] == c[sl, None]) & (offsets < width[sl, None])
+            result[sl] += np.count_nonzero(hit, axis=1)
+        return result
+
+    def _lf(self, rows):
+        """LF-mapping of rows that do not hold the sentinel (rows != primary)."""
+        c = self.U[rows - (rows > self.primary)]
+        return self.C[c] + self._occ(c, rows)
+
+    def find_many(self, patterns):
+        """
+        Description:
+            Backward search of a batch of patterns, one vectorized step per pattern symbol.
+
+        Arguments:
+            patterns (iterable of bytes-like or str): The patterns. A str is encoded as UTF-8.
+
+        Returns:
+            sp (numpy.ndarray of int64): The first matching row of every pattern.
+            ep (numpy.ndarray of int64): One past the last matching row of every pattern; ep - sp is the number of occurrences.
+        """
+        patterns = [_as_pattern(p) for p in patterns]
+        k = len(patterns)
+        lengths = np.fromiter((len(p) for p in patterns), dtype=np.int64, count=k)
+        M = int(lengths.max()) if k else 0
+        # chars[q, t] is the t-th symbol of pattern q from the end
+        chars = np.zeros((k, M), dtype=np.uint8)
+        for q, p in enumerate(patterns):
+            chars[q, :len(p)] = p[::-1]
+        sp = np.zeros(k, dtype=np.int64)
+        ep = np.full(k, self.n + 1, dtype=np.int64)
+        sp[lengths == 0] = 1
+        for t in range(M):
+            active = np.flatnonzero((lengths > t) & (sp < ep))
+            c = chars[active, t]
+            present = self.code[c] >= 0
+            ep[active[~present]] = sp[active[~present]]
+            active, c = active[present], c[present]
+            sp[active] = self.C[c] + self._occ(c, sp[active])
+            ep[active] = self.C[c] + self._occ(c, ep[active])
+        np.maximum(ep, sp, out=ep)
+        return sp, ep
+
+    def find(self, pattern):
+        """Return the (sp, ep) row interval of the suffixes starting with pattern."""
+        sp, ep = self.find_many([pattern])
+        return int(sp[0]), int(ep[0])
+
+    def count_many(self, patterns):
+        """Return the number of occurrences of every pattern as a NumPy array."""
+        sp, ep = self.find_many(patterns)
+        return ep - sp
+
+    def count(self, pattern):
+        """Return the number of occurrences of pattern in T."""
+        sp, ep = self.find(pattern)
+        return ep - sp
+
+    def locate_rows(self, rows):
+        """
+        Description:
+            Returns the text positions of the given suffix array rows, walking LF steps from all rows at once until each reaches a sampled row.
+
+        Arguments:
+            rows (array of int): Rows in [0, n].
+
+        Returns:
+            positions (numpy.ndarray of int64): The text position of every row.
+
+        Raises:
+            ValueError: If the index was built without suffix array samples.
+        """
+        if not self.sa_rate:
+            raise ValueError("the index was built without suffix array samples (sa_rate=0)")
+        rows = np.array(rows, dtype=np.int64)
+        positions = np.empty(len(rows), dtype=np.int64)
+        pending = np.arange(len(rows))
+        steps = 0
+        while len(pending):
+            r = rows[pending]
+            words = self.marks[r >> 6]
+            shift = (r & 63).astype(np.uint64)
+            marked = ((words >> shift) & np.uint64(1)).astype(bool)
+            hit = r[marked]
+            below = words[marked] & ((np.uint64(1) << shift[marked]) - np.uint64(1))
+            rank = self.mrank[hit >> 6] + _popcount64(below)
+            positions[pending[marked]] = self.samples[rank].astype(np.int64) * self.sa_rate + steps
+            pending = pending[~marked]
+            rows[pending] = self._lf(r[~marked])
+            steps += 1
+        return positions
+
+    def locate_many(self, patterns):
+        """Return the positions of every pattern in T, as a list of NumPy arrays in suffix array order."""
+        sp, ep = self.find_many(patterns)
+        counts = ep - sp
+        starts = np.repeat(sp - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        positions = self.locate_rows(starts + np.arange(counts.sum()))
+        return np.split(positions, np.cumsum(counts)[:-1])
+
+    def locate(self, pattern):
+        """Return the positions of pattern in T as a NumPy array, in suffix array order."""
+        return self.locate_many([pattern])[0]
+
+    def nbytes(self):
+        """Return the memory used by the index arrays in bytes."""
+        return sum(getattr(self, name).nbytes for name in _ARRAYS)
+
+    def save(self, path):
+        """
+        Description:
+            Writes the index to a single file: a header, a table of the arrays, and the arrays aligned to 64 bytes.
+
+        Arguments:
+            path (str): The output file.
+        """
+        arrays = [np.ascontiguousarray(getattr(self, name)) for name in _ARRAYS]
+        offset = _HEADER.size + _ENTRY.size * len(arrays)
+        entries = []
+        for name, a in zip(_ARRAYS, arrays):
+            offset = -(-offset // _ALIGN) * _ALIGN
+            entries.append(_ENTRY.pack(name.encode(), a.dtype.str.encode(), offset, a.shape[0], a.shape[1] if a.ndim == 2 else 0))
+            offset += a.nbytes
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, self.block_size, self.sa_rate, self.n, self.primary, len(arrays)))
+            f.write(b"".join(entries))
+            for entry, a in zip(entries, arrays):
+                f.write(b"\x00" * (_ENTRY.unpack(entry)[2] - f.tell()))
+                f.write(memoryview(a).cast('B'))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Description:
+            Maps an index written by save. The arrays are read-only NumPy views of the mapping, so only the pages touched by queries are read.
+
+        Arguments:
+            path (str): The index file.
+
+        Returns:
+            index (FMIndex): The mapped index.
+
+        Raises:
+            ValueError: If the file is not an FM-index file.
+        """
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(mm) < _HEADER.size:
+            raise ValueError(f"{path} is not an FM-index file")
+        magic, version, block_size, sa_rate, n, primary, count = _HEADER.unpack_from(mm)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not an FM-index file")
+        self = cls.__new__(cls)
+        self._mmap = mm
+        self.n, self.primary, self.block_size, self.sa_rate = n, primary, block_size, sa_rate
+        for k in range(count):
+            name, dtype, offset, rows, cols = _ENTRY.unpack_from(mm, _HEADER.size + k * _ENTRY.size)
+            a = np.frombuffer(mm, dtype=np.dtype(dtype.rstrip(b"\x00").decode()), count=rows * max(cols, 1), offset=offset)
+            setattr(self, name.rstrip(b"\x00").decode(), a.reshape(rows, cols) if cols else a)
+        return self
@@ -0,0 +1,168 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_gsa.py
+#
+# Generalized suffix array over a collection of documents, built on the
+# libsais_wrapper.py functions. Documents are concatenated with separators,
+# suffixes are mapped back to (document, offset) pairs with vectorized NumPy
+# lookups, and LCP values never extend past the end of a document.
+# Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "GeneralizedSuffixArray",
+    "build_gsa"
+]
+
+class GeneralizedSuffixArray:
+    """
+    Description:
+        A generalized suffix array of D documents, as built by build_gsa. The documents are stored concatenated in text, each followed by one separator;
+        starts[j] is the offset of document j in text and starts[D] is len(text). SA holds one entry per document symbol (suffixes starting at
+        separators are dropped), LCP[i] is the length of the longest common prefix of the suffixes SA[i - 1] and SA[i], never extending past
+        the end of either document, and LCP[0] is 0.
+
+    Attributes:
+        SA (numpy.ndarray of int32 or int64): The suffix positions in text, in lexicographic order.
+        LCP (numpy.ndarray of int32 or int64 or None): The LCP array, or None if it was not requested.
+        starts (numpy.ndarray of int64): The start offsets of the documents in text, with len(text) appended.
+        text (numpy.ndarray of uint8): The concatenated documents, each followed by a 0 byte.
+        method (str): "bytes" or "int", the construction method used.
+    """
+
+    def __init__(self, SA, LCP, starts, text, method):
+        self.SA = SA
+        self.LCP = LCP
+        self.starts = starts
+        self.text = text
+        self.method = method
+        self._doc_ids = None
+
+    def __len__(self):
+        return len(self.SA)
+
+    @property
+    def num_docs(self):
+        return len(self.starts) - 1
+
+    def locate(self, positions):
+        """
+        Description:
+            Maps text positions (e.g. SA entries) to documents and offsets with a vectorized binary search over the document starts, O(log D) per position.
+
+        Arguments:
+            positions (int or array of int): Positions in text.
+
+        Returns:
+            doc (numpy.ndarray of int64): The document of every position.
+            offset (numpy.ndarray of int64): The offset of every position within its document.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        doc = np.searchsorted(self.starts, positions, side="right") - 1
+        return doc, positions - self.starts[doc]
+
+    def doc_ids(self):
+        """
+        Description:
+            Returns the document array: the document of every SA entry, in the smallest unsigned type that holds D, so that the document of
+            SA[i] is a single O(1) lookup. Computed once on first use.
+
+        Returns:
+            doc_ids (numpy.ndarray of uint8, uint16, uint32 or uint64): doc_ids[i] is the document of SA[i].
+        """
+        if self._doc_ids is None:
+            dtype = np.min_scalar_type(max(self.num_docs - 1, 0))
+            self._doc_ids = self.locate(self.SA)[0].astype(dtype)
+        return self._doc_ids
+
+    def document(self, j):
+        """Return document j as a view into text (without its separator)."""
+        return self.text[self.starts[j]:self.starts[j + 1] - 1]
+
+def _as_bytes(doc):
+    if isinstance(doc, str):
+        doc = doc.encode("utf-8")
+    view = memoryview(doc)
+    return np.frombuffer(view if view.itemsize == 1 else view.cast('B'), dtype=np.uint8)
+
+def build_gsa(docs, lcp=True, method="auto", threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The build_gsa function builds the generalized suffix array (and optionally LCP array) of a collection of byte documents.
+        Two construction methods are available:
+        "int": every byte c becomes the symbol D + c and document j is followed by the unique separator j, and the result is sorted with suffix_array_int.
+        Suffixes that are equal up to the end of their documents are ordered by document. The PLCP array comes from plcp_int, which with libsais 2.7
+        is limited to D + 256 <= 65536, i.e. at most 65280 documents.
+        "bytes": documents are joined with a 0 byte and sorted with suffix_array, using 1 byte per symbol instead of 4. This requires that no document
+        contains a 0 byte; suffixes that are equal up to the end of their documents are then in arbitrary order. LCP values are clamped to the
+        distance to the end of both documents in a vectorized pass.
+        "auto" uses "bytes" if no document contains a 0 byte and "int" otherwise.
+
+    Arguments:
+        docs (iterable of bytes-like or str): The documents. A str is encoded as UTF-8.
+        lcp (bool, optional, default=True): Whether to compute the LCP array.
+        method (str, optional, default="auto"): "auto", "bytes" or "int".
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        gsa (GeneralizedSuffixArray): The generalized suffix array.
+
+    Raises:
+        ValueError: If method is "bytes" and a document contains a 0 byte, or method is unknown.
+        RuntimeError: If a libsais function returns an error code.
+    """
+    docs = [_as_bytes(doc) for doc in docs]
+    D = len(docs)
+    lengths = np.fromiter((len(doc) for doc in docs), dtype=np.int64, count=D)
+    starts = np.zeros(D + 1, dtype=np.int64)
+    np.cumsum(lengths + 1, out=starts[1:])
+    ends = starts[1:] - 1
+
+    parts = [np.zeros(1, dtype=np.uint8)] * (2 * D)
+    parts[::2] = docs
+    text = np.concatenate(parts) if D else np.zeros(0, dtype=np.uint8)
+    has_zero = D > 0 and np.count_nonzero(text == 0) > D
+    if method == "auto":
+        method = "int" if has_zero else "bytes"
+    if method == "bytes" and has_zero:
+        raise ValueError("the bytes method requires documents without 0 bytes")
+    if method not in ("bytes", "int"):
+        raise ValueError(f"method must be 'auto', 'bytes' or 'int', got {method!r}")
+
+    if method == "int":
+        symbols = text.astype(np.int32)
+        symbols += D
+        symbols[ends] = np.arange(D, dtype=np.int32)
+        result, SA = lw.suffix_array_int(symbols.copy(), k=D + 256, threads=threads, index_width=index_width)
+    else:
+        result, SA, _ = lw.suffix_array(text, threads=threads, index_width=index_width)
+    if result != 0:
+        raise RuntimeError(f"suffix array construction failed with error code {result}")
+    SA_full = np.frombuffer(SA, dtype=np.dtype(SA.typecode))
+
+    LCP = None
+    if lcp:
+        if method == "int":
+            result, PLCP = lw.plcp_int(symbols, SA_full, k=D + 256, threads=threads)
+        else:
+            result, PLCP = lw.plcp(text, SA_full, threads=threads)
+        if result == 0:
+            result, LCP = lw.lcp(PLCP, SA_full, threads=threads)
+        if result != 0:
+            raise RuntimeError(f"LCP construction failed with error code {result}")
+        LCP = np.frombuffer(LCP, dtype=SA_full.dtype)[D:]
+
+    # Separators are the D smallest symbols, so their suffixes come first
+    SA_full = SA_full[D:]
+    if LCP is not None and method == "bytes" and len(LCP):
+        # Separators are not unique here, so matches may run through a separator into the next document
+        left = ends[np.searchsorted(starts, SA_full, side="right") - 1] - SA_full
+        np.minimum(LCP[1:], left[1:], out=LCP[1:])
+        np.minimum(LCP[1:], left[:-1], out=LCP[1:])
+        LCP[0] = 0
+    return GeneralizedSuffixArray(SA_full, LCP, starts, text, method)
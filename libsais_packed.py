@@ -0,0 +1,300 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_packed.py
+#
+# Compact on-disk format for suffix and LCP arrays. A suffix array of n
+# entries is bit-packed to ceil(log2 n) bits per entry; an LCP array is
+# stored as one byte per entry, values of 255 and above being escaped to an
+# exception table, with a directory locating the exceptions of every chunk of
+# _CHUNK rows. Writers stream from the construction buffers (NumPy arrays,
+# array.array, files written by build_files, ...) one chunk at a time.
+# Readers map the file and decode single entries, slices and index arrays
+# with vectorized NumPy operations, without unpacking the whole array.
+# Requires NumPy.
+#
+# File layout (little-endian), every section aligned to 64 bytes:
+#   header: magic, kind ("SA" or "LCP"), version, n, bits per entry (SA) or
+#           number of exceptions (LCP), chunk size, largest value
+#   SA:     the packed entries as 64-bit words, plus one padding word
+#   LCP:    n bytes; the directory, nchunks + 1 int64 offsets of the first
+#           exception of every chunk; the uint16 positions of the exceptions
+#           within their chunk; their int64 values
+# -----------------------------------------------------------------------------
+
+import bisect
+import mmap
+import struct
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "write_packed_sa",
+    "write_packed_lcp",
+    "open_packed",
+    "PackedArray",
+    "PackedSA",
+    "PackedLCP"
+]
+
+_MAGIC = b"LIBSAISK"
+_VERSION = 1
+# magic, kind, version, n, bits per entry (SA) or exception count (LCP), chunk size, largest value
+_HEADER = struct.Struct("<8s4sIqqqq16x")
+_ALIGN = 64
+# Rows per chunk: a multiple of 64, so that every packed SA chunk fills whole words, and at most 65536, so that exception positions fit 16 bits
+_CHUNK = 1 << 16
+# LCP byte marking an entry stored in the exception table
+_ESCAPE = 255
+
+def _align(offset, alignment=_ALIGN):
+    return -(-offset // alignment) * alignment
+
+def _source(obj):
+    """Return an array to pack as a NumPy array without copying buffers. A str is a file written by build_files, mapped read-only."""
+    if isinstance(obj, str):
+        return np.asarray(lw.open_index_file(obj)[2])
+    if isinstance(obj, np.ndarray):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return np.asarray(obj, dtype=np.int64)
+    return np.asarray(memoryview(obj))
+
+def _pack(values, bits):
+    """Pack values (uint64, each below 2^bits) into 64-bit words, value i taking bits i * bits to (i + 1) * bits - 1."""
+    pos = np.arange(values.size, dtype=np.uint64) * np.uint64(bits)
+    word = (pos >> np.uint64(6)).astype(np.intp)
+    shift = pos & np.uint64(63)
+    words = np.zeros(-(-values.size * bits // 64), dtype=np.uint64)
+    # With bits <= 64 every word but the last holds the start of at least one value, whose low parts are OR-ed together
+    starts = np.flatnonzero(np.diff(word, prepend=-1))
+    words[word[starts]] = np.bitwise_or.reduceat(values << shift, starts)
+    # The high part of a value crossing a word boundary goes to the next word, at most one per boundary
+    spill = np.flatnonzero(shift + np.uint64(bits) > np.uint64(64))
+    words[word[spill] + 1] |= values[spill] >> (np.uint64(64) - shift[spill])
+    return words
+
+def write_packed_sa(path, SA, n=None):
+    """
+    Description:
+        The write_packed_sa function writes a suffix array bit-packed to ceil(log2 n) bits per entry, e.g. 32 bits instead of 64 for n up to 2^32.
+        The suffix array is read and packed one chunk at a time.
+
+    Arguments:
+        path (str): The output file.
+        SA (buffer, numpy.ndarray, list or str): The suffix array, e.g. as computed by libsais64 or suffix_array, or an SA file written by build_files.
+        n (int, optional, default=None): The number of entries. If None, the length of SA is used.
+
+    Returns:
+        nbytes (int): The size of the written file.
+    """
+    SA = _source(SA)
+    n = len(SA) if n is None else n
+    bits = max(1, (n - 1).bit_length())
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, b"SA", _VERSION, n, bits, _CHUNK, n - 1))
+        f.write(bytes(_align(_HEADER.size) - _HEADER.size))
+        for start in range(0, n, _CHUNK):
+            f.write(_pack(np.asarray(SA[start:min(start + _CHUNK, n)]).astype(np.uint64), bits).tobytes())
+        # Padding, so that decoding may always read the word after the one holding an entry
+        f.write(bytes(8))
+        return f.tell()
+
+def write_packed_lcp(path, LCP, n=None):
+    """
+    Description:
+        The write_packed_lcp function writes an LCP array with one byte per entry. Values of 255 and above, rare in most texts,
+        are stored in an exception table indexed by a directory with the offset of the first exception of every chunk.
+        The LCP array is read one chunk at a time; only the exceptions are kept in memory until they are written.
+
+    Arguments:
+        path (str): The output file.
+        LCP (buffer, numpy.ndarray, list or str): The LCP array, e.g. as computed by libsais64_lcp or lcp, or an LCP file written by build_files.
+        n (int, optional, default=None): The number of entries. If None, the length of LCP is used.
+
+    Returns:
+        nbytes (int): The size of the written file.
+    """
+    LCP = _source(LCP)
+    n = len(LCP) if n is None else n
+    directory = np.zeros(-(-n // _CHUNK) + 1, dtype=np.int64)
+    positions, values = [], []
+    largest = 0
+    with open(path, "wb") as f:
+        f.write(bytes(_align(_HEADER.size)))
+        for chunk, start in enumerate(range(0, n, _CHUNK)):
+            L = np.asarray(LCP[start:min(start + _CHUNK, n)])
+            escaped = np.flatnonzero(L >= _ESCAPE)
+            f.write(np.minimum(L, _ESCAPE).astype(np.uint8).tobytes())
+            positions.append(escaped.astype(np.uint16))
+            values.append(L[escaped].astype(np.int64))
+            directory[chunk + 1] = directory[chunk] + escaped.size
+            if L.size:
+                largest = max(largest, int(L.max()))
+        f.write(bytes(_align(f.tell()) - f.tell()))
+        f.write(directory.tobytes())
+        for p in positions:
+            f.write(p.tobytes())
+        f.write(bytes(_align(f.tell(), 8) - f.tell()))
+        for v in values:
+            f.write(v.tobytes())
+        size = f.tell()
+        f.seek(0)
+        f.write(_HEADER.pack(_MAGIC, b"LCP", _VERSION, n, int(directory[-1]), _CHUNK, largest))
+    return size
+
+class PackedArray:
+    """
+    Read-only array backed by a memory-mapped packed file, see open_packed.
+
+    Indexing with an int returns an int; indexing with a slice or an integer array decodes only the requested entries
+    into a NumPy int64 array. chunks iterates over the whole array in decoded slices, for sequential scans.
+    """
+
+    def __init__(self, path, mm, header):
+        self.path = path
+        self._mm = mm
+        _, kind, _, self.n, self._param, self.chunk, self.max_value = header
+        self.kind = kind.rstrip(b"\x00").decode()
+
+    def __len__(self):
+        return self.n
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.path!r}, n={self.n})"
+
+    @property
+    def nbytes(self):
+        """The size of the file."""
+        return len(self._mm)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._decode(np.arange(*key.indices(self.n), dtype=np.int64))
+        if isinstance(key, (int, np.integer)):
+            i = int(key)
+            if i < 0:
+                i += self.n
+            if not 0 <= i < self.n:
+                raise IndexError(f"index {key} is out of range for {self.n} entries")
+            return self._get(i)
+        idx = np.asarray(key, dtype=np.int64)
+        idx = np.where(idx < 0, idx + self.n, idx)
+        if idx.size and (idx.min() < 0 or idx.max() >= self.n):
+            raise IndexError(f"index out of range for {self.n} entries")
+        return self._decode(idx.ravel()).reshape(idx.shape)
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:]
+        return values if dtype is None else values.astype(dtype)
+
+    def chunks(self, size=_CHUNK):
+        """Yield the entries in order as decoded int64 arrays of size entries."""
+        for start in range(0, self.n, size):
+            yield self[start:start + size]
+
+    def close(self):
+        """Unmap the file; arrays decoded from it stay valid."""
+        self._release()
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class PackedSA(PackedArray):
+    """A bit-packed suffix array, see write_packed_sa."""
+
+    def __init__(self, path, mm, header):
+        super().__init__(path, mm, header)
+        self.bits = self._param
+        self._offset = _align(_HEADER.size)
+        self._words = np.frombuffer(mm, dtype="<u8", offset=self._offset, count=(len(mm) - self._offset) // 8)
+        self._mask = (1 << self.bits) - 1
+
+    def _release(self):
+        self._words = None
+
+    def _get(self, i):
+        pos = i * self.bits
+        start = self._offset + (pos >> 6) * 8
+        return (int.from_bytes(self._mm[start:start + 16], "little") >> (pos & 63)) & self._mask
+
+    def _decode(self, idx):
+        pos = idx.astype(np.uint64) * np.uint64(self.bits)
+        word = (pos >> np.uint64(6)).astype(np.intp)
+        shift = pos & np.uint64(63)
+        # The high part is shifted in two steps, as a shift by 64 (for shift == 0) is undefined
+        high = (self._words[word + 1] << np.uint64(1)) << (np.uint64(63) - shift)
+        return (((self._words[word] >> shift) | high) & np.uint64(self._mask)).astype(np.int64)
+
+class PackedLCP(PackedArray):
+    """An LCP array of bytes with an exception table, see write_packed_lcp."""
+
+    def __init__(self, path, mm, header):
+        super().__init__(path, mm, header)
+        self.exceptions = self._param
+        nchunks = -(-self.n // self.chunk)
+        offset = _align(_HEADER.size)
+        self._bytes = np.frombuffer(mm, dtype=np.uint8, offset=offset, count=self.n)
+        offset = _align(offset + self.n)
+        self._directory = np.frombuffer(mm, dtype="<i8", offset=offset, count=nchunks + 1)
+        offset += (nchunks + 1) * 8
+        self._positions = np.frombuffer(mm, dtype="<u2", offset=offset, count=self.exceptions)
+        offset = _align(offset + self.exceptions * 2, 8)
+        self._values = np.frombuffer(mm, dtype="<i8", offset=offset, count=self.exceptions)
+
+    def _release(self):
+        self._bytes = self._directory = self._positions = self._values = None
+
+    def _get(self, i):
+        value = int(self._bytes[i])
+        if value < _ESCAPE:
+            return value
+        chunk, local = divmod(i, self.chunk)
+        lo, hi = int(self._directory[chunk]), int(self._directory[chunk + 1])
+        return int(self._values[bisect.bisect_left(self._positions, local, lo, hi)])
+
+    def _decode(self, idx):
+        values = self._bytes[idx].astype(np.int64)
+        escaped = np.flatnonzero(values == _ESCAPE)
+        if escaped.size:
+            chunk, local = np.divmod(idx[escaped], self.chunk)
+            # Vectorized binary search of every escaped entry among the exceptions of its chunk
+            lo, hi = self._directory[chunk], self._directory[chunk + 1]
+            active = lo < hi
+            while active.any():
+                mid = (lo + hi) // 2
+                below = self._positions[np.where(active, mid, 0)] < local
+                lo = np.where(active & below, mid + 1, lo)
+                hi = np.where(active & ~below, mid, hi)
+                active = lo < hi
+            values[escaped] = self._values[lo]
+        return values
+
+def open_packed(path):
+    """
+    Description:
+        The open_packed function maps a file written by write_packed_sa or write_packed_lcp read-only, reading only its header.
+
+    Arguments:
+        path (str): The file to open.
+
+    Returns:
+        array (PackedSA or PackedLCP): The packed array. It supports len, indexing with an int, a slice or an integer array,
+            numpy.asarray and iteration over decoded chunks with chunks(); the analytics functions accept it like any other array.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    header = _HEADER.unpack_from(mm)
+    magic, kind, version = header[:3]
+    if magic != _MAGIC:
+        mm.close()
+        raise ValueError(f"{path} is not a packed libsais array file")
+    if version != _VERSION:
+        mm.close()
+        raise ValueError(f"{path} has version {version}, only version {_VERSION} is supported")
+    return (PackedSA if kind.rstrip(b"\x00") == b"SA" else PackedLCP)(path, mm, header)
@@ -0,0 +1,374 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_rlbwt.py
+#
+# Run-length compressed Burrows-Wheeler transform and r-index for highly
+# repetitive inputs, whose BWT consists of r << n runs. RLBWT converts the
+# output of bwt (or a BWT file written by build_files) to run heads and run
+# lengths in one streaming pass, and supports access and rank over the runs
+# and inversion through unbwt. RIndex adds the suffix array samples of the
+# r-index (Gagie, Navarro and Prezza, 2018): the suffix array values at the
+# first and last row of every run. Backward search keeps one known suffix
+# array value of the current range (the toehold), and the occurrences are
+# then enumerated with the phi function, SA[i] -> SA[i - 1], from the samples.
+# All arrays hold O(r) entries; queries are vectorized over batches of
+# patterns. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "RLBWT",
+    "RIndex"
+]
+
+# Symbols of the BWT read at a time when splitting it into runs
+_CHUNK = 1 << 22
+
+def _as_symbols(U):
+    if isinstance(U, str):
+        U = U.encode("utf-8")
+    if isinstance(U, np.ndarray):
+        return U.view(np.uint8) if U.dtype != np.uint8 else U
+    view = memoryview(U)
+    return np.frombuffer(view if view.itemsize == 1 else view.cast('B'), dtype=np.uint8)
+
+class RLBWT:
+    """
+    Description:
+        A BWT stored as r runs: heads[k] is the symbol of run k and starts[k] its first position, with starts[r] = n. Positions are those of the
+        BWT returned by bwt or libsais64_bwt (n symbols, the sentinel removed), and primary is the primary index returned with it.
+
+        For rank queries the runs are also kept grouped by symbol: for every symbol, the starts and lengths of its runs and the number of its
+        occurrences before each of them, so that rank is one binary search over the r runs.
+
+    Attributes:
+        n (int): The length of the BWT.
+        primary (int): The primary index.
+        heads (numpy.ndarray of uint8): The symbol of every run.
+        starts (numpy.ndarray of int64): The first position of every run, followed by n.
+        C (numpy.ndarray of int64): C[c] is 1 plus the number of symbols smaller than c, the first row of the suffixes starting with c.
+    """
+
+    def __init__(self, heads, lengths, primary):
+        """
+        Description:
+            Builds the rank structures from the runs, e.g. as returned by runs().
+
+        Arguments:
+            heads (array of uint8): The symbol of every run.
+            lengths (array of int): The length of every run.
+            primary (int): The primary index of the BWT.
+        """
+        self.heads = np.asarray(heads, dtype=np.uint8)
+        lengths = np.asarray(lengths, dtype=np.int64)
+        self.starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.starts[1:])
+        self.n = int(self.starts[-1])
+        self.primary = int(primary)
+        freq = np.bincount(self.heads, weights=lengths, minlength=256).astype(np.int64)
+        self.C = np.zeros(257, dtype=np.int64)
+        np.cumsum(freq, out=self.C[1:])
+        self.C += 1
+        # Runs grouped by symbol, in order of position within every group: keys are symbol * (n + 1) + start
+        order = np.argsort(self.heads, kind="stable")
+        self._keys = self.heads[order].astype(np.int64) * (self.n + 1) + self.starts[:-1][order]
+        self._lengths = lengths[order]
+        self._before = np.cumsum(self._lengths) - self._lengths
+        self._before -= self.C[self.heads[order]] - 1
+
+    @staticmethod
+    def runs(U, n=None):
+        """
+        Description:
+            Splits a BWT into runs in one pass over chunks of _CHUNK symbols.
+
+        Arguments:
+            U (buffer or numpy.ndarray): The BWT, e.g. as returned by bwt or mapped with open_index_file.
+            n (int, optional, default=None): The length of the BWT. If None, the length of U is used.
+
+        Returns:
+            heads (numpy.ndarray of uint8): The symbol of every run.
+            lengths (numpy.ndarray of int64): The length of every run.
+        """
+        U = _as_symbols(U)
+        n = len(U) if n is None else n
+        heads, starts = [np.zeros(0, dtype=np.uint8)], []
+        previous = -1
+        for start in range(0, n, _CHUNK):
+            chunk = U[start:min(start + _CHUNK, n)]
+            # The first symbol of a chunk continues the last run of the previous chunk if it is equal
+            change = np.empty(len(chunk), dtype=bool)
+            change[0] = chunk[0] != previous
+            np.not_equal(chunk[1:], chunk[:-1], out=change[1:])
+            first = np.flatnonzero(change)
+            heads.append(chunk[first])
+            starts.append(first + start)
+            previous = chunk[-1]
+        starts.append(np.array([n], dtype=np.int64))
+        return np.concatenate(heads), np.diff(np.concatenate(starts))
+
+    @classmethod
+    def from_bwt(cls, U, primary, n=None):
+        """
+        Description:
+            Builds the run-length BWT of the output of bwt or libsais64_bwt.
+
+        Arguments:
+            U (buffer or numpy.ndarray): The BWT.
+            primary (int): The primary index returned with U.
+            n (int, optional, default=None): The length of the BWT. If None, the length of U is used.
+
+        Returns:
+            rlbwt (RLBWT): The run-length BWT.
+        """
+        return cls(*cls.runs(U, n), primary)
+
+    @classmethod
+    def from_file(cls, path):
+        """Builds the run-length BWT of a BWT file written by build_files, streaming over its mapping."""
+        header, _, data = lw.open_index_file(path)
+        return cls.from_bwt(data, header.primary, header.n)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def r(self):
+        """The number of runs."""
+        return len(self.heads)
+
+    def _run(self, j):
+        return np.searchsorted(self.starts, j, side="right") - 1
+
+    def access(self, j):
+        """Return the BWT symbols at positions j (an int or an array), O(log r) each."""
+        j = np.asarray(j, dtype=np.int64)
+        return self.heads[self._run(j)]
+
+    def _rank(self, c, j):
+        """Return the occurrences of the symbols c in positions [0, j) and the position of the last of them (-1 if none), vectorized."""
+        c, j = np.broadcast_arrays(np.asarray(c, dtype=np.int64), np.asarray(j, dtype=np.int64))
+        if not self.r:
+            return np.zeros(c.shape, dtype=np.int64), np.full(c.shape, -1, dtype=np.int64)
+        # The last run of c starting before j; a run of a smaller symbol gives a negative start
+        m = np.maximum(np.searchsorted(self._keys, c * (self.n + 1) + j - 1, side="right") - 1, 0)
+        start = self._keys[m] - c * (self.n + 1)
+        valid = (start >= 0) & (start < j)
+        taken = np.minimum(j - start, self._lengths[m])
+        return np.where(valid, self._before[m] + taken, 0), np.where(valid, start + taken - 1, -1)
+
+    def rank(self, c, j):
+        """Return the number of occurrences of the symbols c in BWT positions [0, j), vectorized over c and j; O(log r) each."""
+        return self._rank(c, j)[0]
+
+    def to_bwt(self):
+        """Return the BWT as a NumPy uint8 array of n symbols."""
+        return np.repeat(self.heads, np.diff(self.starts))
+
+    def unbwt(self, threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+        """
+        Description:
+            Reconstructs the original string by expanding the runs and calling unbwt (libsais_unbwt or libsais64_unbwt).
+            This temporarily needs the n bytes of the BWT, the n bytes of the output and n + 1 indexes.
+
+        Arguments:
+            threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+            index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+        Returns:
+            T (numpy.ndarray of uint8): The original string.
+
+        Raises:
+            RuntimeError: If a libsais function returns an error code.
+        """
+        if self.n == 0:
+            return np.zeros(0, dtype=np.uint8)
+        T = np.empty(self.n, dtype=np.uint8)
+        result, _, _ = lw.unbwt(self.to_bwt(), self.primary, U=T, threads=threads, index_width=index_width)
+        if result != 0:
+            raise RuntimeError(f"unbwt failed with error code {result}")
+        return T
+
+    def nbytes(self):
+        """Return the memory used by the run arrays in bytes."""
+        return self.heads.nbytes + self.starts.nbytes + self._keys.nbytes + self._lengths.nbytes + self._before.nbytes + self.C.nbytes
+
+class RIndex:
+    """
+    Description:
+        An r-index of a byte string T: its run-length BWT and 2r suffix array samples. Rows are numbered as in FMIndex: row 0 is the empty
+        suffix at position n, row i > 0 is the suffix SA[i - 1], and row primary holds the sentinel in the BWT matrix. The runs of the
+        BWT matrix are those of the RLBWT, split around the sentinel, which is a run of its own.
+
+        The samples are the text positions at the last row of every run (end_rows, end_positions), used to keep a toehold during backward
+        search, and, for the first row of every run but row 0, its text position and the text position one row above (phi_keys, phi_values),
+        from which phi(p) = phi_values[k] + p - phi_keys[k], where phi_keys[k] is the largest key <= p.
+
+        count and find take a single pattern; count_many, find_many and locate_many take a batch of patterns and process them together.
+        locate takes one phi step (a binary search over the samples) per occurrence.
+
+    Attributes:
+        rlbwt (RLBWT): The run-length BWT.
+        n (int): The length of T.
+    """
+
+    def __init__(self, rlbwt, SA):
+        """
+        Description:
+            Takes the suffix array samples of rlbwt from SA, reading 2r entries of it.
+
+        Arguments:
+            rlbwt (RLBWT): The run-length BWT of T.
+            SA (buffer or numpy.ndarray): The suffix array of T, n 32- or 64-bit integers; e.g. mapped with open_index_file.
+        """
+        self.rlbwt = rlbwt
+        self.n = n = rlbwt.n
+        primary = rlbwt.primary
+        with memoryview(SA) as view:
+            SA = np.frombuffer(view.cast('B'), dtype=np.int32 if view.itemsize == 4 else np.int64, count=n)
+        # First rows of the runs of the BWT matrix: the RLBWT runs shifted past the sentinel row, the sentinel row and the row after it
+        rows = rlbwt.starts[:-1] + (rlbwt.starts[:-1] >= primary)
+        first = np.unique(np.concatenate((rows, [0, primary, primary + 1])))
+        first = first[first <= n]
+        last = np.append(first[1:] - 1, n)
+
+        def positions(i):
+            values = np.full(len(i), n, dtype=np.int64)
+            values[i > 0] = SA[i[i > 0] - 1]
+            return values
+
+        self.end_rows = last
+        self.end_positions = positions(last)
+        keys, values = positions(first[1:]), positions(first[1:] - 1)
+        order = np.argsort(keys, kind="stable")
+        self.phi_keys, self.phi_values = keys[order], values[order]
+
+    @classmethod
+    def build(cls, T, threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+        """
+        Description:
+            Builds the r-index of T: the suffix array and the BWT are computed together with build_index, the BWT is split into runs and the
+            samples are taken from the suffix array, which is then released.
+
+        Arguments:
+            T (bytes-like or str): The input string. A str is encoded as UTF-8.
+            threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+            index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+        Returns:
+            index (RIndex): The r-index of T.
+
+        Raises:
+            RuntimeError: If a libsais function returns an error code.
+        """
+        T = _as_symbols(T)
+        if not len(T):
+            return cls(RLBWT(np.zeros(0, dtype=np.uint8), np.zeros(0, dtype=np.int64), 0), np.zeros(0, dtype=np.int64))
+        index = lw.build_index(T, want=("sa", "bwt"), threads=threads, index_width=index_width)
+        return cls(RLBWT.from_bwt(index["bwt"], index["primary"]), index["sa"])
+
+    @classmethod
+    def from_files(cls, bwt_path, sa_path):
+        """
+        Description:
+            Builds the r-index from a BWT file and an SA file written by build_files (or build_sa_external for the SA), streaming over the BWT
+            and reading 2r entries of the SA, so that memory scales with r rather than n.
+
+        Arguments:
+            bwt_path (str): The BWT file.
+            sa_path (str): The SA file.
+
+        Returns:
+            index (RIndex): The r-index.
+        """
+        return cls(RLBWT.from_file(bwt_path), lw.open_index_file(sa_path)[2])
+
+    def _phi(self, p):
+        k = np.searchsorted(self.phi_keys, p, side="right") - 1
+        return self.phi_values[k] + (p - self.phi_keys[k])
+
+    def find_many(self, patterns):
+        """
+        Description:
+            Backward search of a batch of patterns, one vectorized step per pattern symbol, keeping the text position of the last row of every range.
+
+        Arguments:
+            patterns (iterable of bytes-like or str): The patterns. A str is encoded as UTF-8.
+
+        Returns:
+            sp (numpy.ndarray of int64): The first matching row of every pattern.
+            ep (numpy.ndarray of int64): One past the last matching row of every pattern; ep - sp is the number of occurrences.
+            toehold (numpy.ndarray of int64): The text position of row ep - 1 of every pattern with occurrences.
+        """
+        rl, n = self.rlbwt, self.n
+        patterns = [_as_symbols(p) for p in patterns]
+        k = len(patterns)
+        lengths = np.fromiter((len(p) for p in patterns), dtype=np.int64, count=k)
+        M = int(lengths.max()) if k else 0
+        chars = np.zeros((k, M), dtype=np.uint8)
+        for q, p in enumerate(patterns):
+            chars[q, :len(p)] = p[::-1]
+        sp = np.zeros(k, dtype=np.int64)
+        ep = np.full(k, n + 1, dtype=np.int64)
+        # The full range ends at row n, the last row of the last run
+        toehold = np.full(k, self.end_positions[-1], dtype=np.int64)
+        sp[lengths == 0] = 1
+        for t in range(M):
+            active = np.flatnonzero((lengths > t) & (sp < ep))
+            c = chars[active, t].astype(np.int64)
+            s, e = sp[active], ep[active]
+            rank_s = rl.rank(c, s - (s > rl.primary))
+            rank_e, x = rl._rank(c, e - (e > rl.primary))
+            # The last occurrence of c in the range is either the last row, whose position precedes the toehold,
+            # or the last row of a run, whose position is sampled
+            row = x + (x >= rl.primary)
+            sampled = self.end_positions[np.minimum(np.searchsorted(self.end_rows, row), len(self.end_rows) - 1)]
+            toehold[active] = np.where(row == e - 1, toehold[active], sampled) - 1
+            sp[active] = rl.C[c] + rank_s
+            ep[active] = rl.C[c] + rank_e
+        np.maximum(ep, sp, out=ep)
+        return sp, ep, toehold
+
+    def find(self, pattern):
+        """Return the (sp, ep) row interval of the suffixes starting with pattern."""
+        sp, ep, _ = self.find_many([pattern])
+        return int(sp[0]), int(ep[0])
+
+    def count_many(self, patterns):
+        """Return the number of occurrences of every pattern as a NumPy array."""
+        sp, ep, _ = self.find_many(patterns)
+        return ep - sp
+
+    def count(self, pattern):
+        """Return the number of occurrences of pattern in T."""
+        sp, ep = self.find(pattern)
+        return ep - sp
+
+    def locate_many(self, patterns):
+        """Return the positions of every pattern in T, as a list of NumPy arrays in suffix array order."""
+        sp, ep, toehold = self.find_many(patterns)
+        counts = ep - sp
+        ends = np.cumsum(counts)
+        positions = np.empty(int(ends[-1]) if len(ends) else 0, dtype=np.int64)
+        # Every step fills the rows from ep - 1 downwards of all patterns with occurrences left
+        pending = np.flatnonzero(counts > 0)
+        p = toehold[pending]
+        step = 0
+        while len(pending):
+            positions[ends[pending] - 1 - step] = p
+            step += 1
+            keep = counts[pending] > step
+            pending, p = pending[keep], p[keep]
+            p = self._phi(p)
+        return np.split(positions, ends[:-1])
+
+    def locate(self, pattern):
+        """Return the positions of pattern in T as a NumPy array, in suffix array order."""
+        return self.locate_many([pattern])[0]
+
+    def nbytes(self):
+        """Return the memory used by the index arrays in bytes."""
+        return self.rlbwt.nbytes() + sum(a.nbytes for a in (self.end_rows, self.end_positions, self.phi_keys, self.phi_values))
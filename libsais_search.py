@@ -0,0 +1,255 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_search.py
+#
+# Batched pattern search over a suffix array and LCP array built with
+# libsais_wrapper.py. Queries use Manber-Myers LCP-LR binary search, so each
+# one takes O(m + log n) character comparisons, and a batch of patterns is
+# searched in lockstep with vectorized NumPy steps. The arrays may be NumPy
+# memmaps or files written by build_files. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+
+import libsais_wrapper as lw
+
+__all__ = [
+    "lcp_lr",
+    "SuffixArraySearch"
+]
+
+_WINDOW = 16                                    # characters compared per vectorized step
+
+def _as_array(obj, dtype=None):
+    """Wrap a list or buffer as a NumPy array without copying; 4- and 8-byte buffers are taken as int32 and int64."""
+    if isinstance(obj, np.ndarray):
+        return obj
+    if isinstance(obj, (list, tuple)):
+        return np.array(obj, dtype=dtype or np.int64)
+    view = memoryview(obj)
+    if dtype is None:
+        dtype = {1: np.uint8, 4: np.int32, 8: np.int64}[view.itemsize]
+    return np.frombuffer(view.cast('B'), dtype=dtype)
+
+def _as_pattern(pattern):
+    if isinstance(pattern, str):
+        pattern = pattern.encode("utf-8")
+    return bytes(pattern)
+
+def lcp_lr(LCP):
+    """
+    Description:
+        The lcp_lr function computes the Llcp and Rlcp arrays of the Manber-Myers binary search over a suffix array of n entries.
+        The search starts from the virtual bounds (-1, n) and always probes M = (L + R) // 2, so every M is the midpoint of exactly one
+        interval (L, R); then Llcp[M] is the length of the longest common prefix of the suffixes SA[L] and SA[M], and Rlcp[M] that of SA[M] and SA[R],
+        both 0 at the virtual bounds. The tree is processed level by level with vectorized NumPy operations in O(n) time.
+
+    Arguments:
+        LCP (list, buffer or numpy.ndarray): The LCP array, LCP[i] being the length of the longest common prefix of SA[i - 1] and SA[i].
+
+    Returns:
+        Llcp (numpy.ndarray): The left LCP-LR array, with the dtype of LCP.
+        Rlcp (numpy.ndarray): The right LCP-LR array, with the dtype of LCP.
+    """
+    LCP = _as_array(LCP)
+    n = len(LCP)
+    Llcp = np.zeros(n, dtype=LCP.dtype)
+    Rlcp = np.zeros(n, dtype=LCP.dtype)
+    # Top-down: the (L, R) intervals of every level that still have a midpoint
+    levels = []
+    L = np.array([-1], dtype=np.int64)
+    R = np.array([n], dtype=np.int64)
+    while True:
+        inner = R - L > 1
+        L, R = L[inner], R[inner]
+        if not len(L):
+            break
+        levels.append((L, R))
+        M = (L + R) // 2
+        L, R = np.column_stack((L, M)).ravel(), np.column_stack((M, R)).ravel()
+    # Bottom-up: the minimum of LCP over (L, R] of every interval, 0 if a bound is virtual
+    below = None
+    for L, R in reversed(levels):
+        M = (L + R) // 2
+        children_L = np.column_stack((L, M)).ravel()
+        children_R = np.column_stack((M, R)).ravel()
+        values = np.zeros(len(children_L), dtype=LCP.dtype)
+        leaf = children_R - children_L == 1
+        real = leaf & (children_L >= 0) & (children_R < n)
+        values[real] = LCP[children_R[real]]
+        if below is not None:
+            values[~leaf] = below
+        values = values.reshape(-1, 2)
+        Llcp[M], Rlcp[M] = values[:, 0], values[:, 1]
+        below = values.min(axis=1)
+    return Llcp, Rlcp
+
+class SuffixArraySearch:
+    """
+    Description:
+        Searches a text T through its suffix array SA. With the LCP array (or precomputed LCP-LR arrays), every binary search step continues
+        comparing where the previous steps stopped, so a query of length m takes O(m + log n) character comparisons. Without it, comparisons
+        start at the shorter of the matches with both bounds, which is correct but may take O(m log n) comparisons for repetitive texts.
+
+        Batches of patterns are sorted and deduplicated, then searched in lockstep: every step probes the next midpoint of all pending
+        queries at once and compares up to 16 characters per query at a time. Neighbouring patterns in sorted order follow the same path
+        through the search tree for as long as they agree with the probed suffixes, so their reads of SA and T hit the same cache lines and pages.
+
+        Intervals [sp, ep) are indexes into SA; SA[sp:ep] are the positions of the matches.
+
+    Attributes:
+        T (numpy.ndarray of uint8): The text.
+        SA (numpy.ndarray of int32 or int64): The suffix array.
+        Llcp, Rlcp (numpy.ndarray or None): The LCP-LR arrays, see lcp_lr.
+    """
+
+    def __init__(self, T, SA, LCP=None, lcp_lr_arrays=None):
+        """
+        Description:
+            Wraps T and SA without copying and computes the LCP-LR arrays from LCP, unless they are given.
+
+        Arguments:
+            T (bytes-like or numpy.ndarray): The text.
+            SA (list, buffer or numpy.ndarray): The suffix array of T.
+            LCP (list, buffer or numpy.ndarray, optional, default=None): The LCP array of T.
+            lcp_lr_arrays (tuple, optional, default=None): The (Llcp, Rlcp) arrays returned by lcp_lr, e.g. loaded with numpy.load(mmap_mode="r").
+        """
+        self.T = _as_array(T, np.uint8)
+        self.SA = _as_array(SA)
+        self.n = len(self.SA)
+        if lcp_lr_arrays is None and LCP is not None:
+            lcp_lr_arrays = lcp_lr(LCP)
+        self.Llcp, self.Rlcp = lcp_lr_arrays if lcp_lr_arrays is not None else (None, None)
+
+    @classmethod
+    def from_files(cls, text_path, sa_path, lcp_path=None, lcp_lr_path=None):
+        """
+        Description:
+            Maps a text file and the SA (and LCP) files written by build_files, without reading them. If lcp_lr_path is given, the LCP-LR arrays
+            are stored there as a (2, n) .npy file on first use and mapped on later calls.
+
+        Arguments:
+            text_path (str): The text file.
+            sa_path (str): The suffix array file.
+            lcp_path (str, optional, default=None): The LCP array file.
+            lcp_lr_path (str, optional, default=None): The LCP-LR cache file.
+
+        Returns:
+            search (SuffixArraySearch): The search object.
+        """
+        T = np.memmap(text_path, dtype=np.uint8, mode="r") if os.path.getsize(text_path) else np.zeros(0, dtype=np.uint8)
+        SA = _as_array(lw.open_index_file(sa_path)[2])
+        arrays = None
+        if lcp_lr_path is not None and os.path.exists(lcp_lr_path):
+            arrays = tuple(np.load(lcp_lr_path, mmap_mode="r"))
+        elif lcp_path is not None:
+            arrays = lcp_lr(_as_array(lw.open_index_file(lcp_path)[2]))
+            if lcp_lr_path is not None:
+                np.save(lcp_lr_path, np.stack(arrays))
+        return cls(T, SA, lcp_lr_arrays=arrays)
+
+    def _extend(self, P, q, s, k):
+        """The length of the longest common prefix of the patterns P[q] and the suffixes at s, known to be at least k."""
+        T, n = self.T, len(self.T)
+        k = k.copy()
+        pending = np.arange(len(q))
+        offsets = np.arange(_WINDOW)
+        width = P.shape[1]
+        while len(pending):
+            idx = k[pending, None] + offsets
+            pos = s[pending, None] + idx
+            t = T[np.minimum(pos, max(n - 1, 0))] if n else np.zeros(pos.shape, dtype=np.uint8)
+            p = P[q[pending, None], np.minimum(idx, width - 1)]
+            equal = (pos < n) & (idx < width) & (t == p)
+            first = np.where(equal.all(axis=1), _WINDOW, equal.argmin(axis=1))
+            k[pending] += first
+            pending = pending[first == _WINDOW]
+        return k
+
+    def _bounds(self, P, m, upper):
+        """Binary search for the first suffix whose first m characters are >= P (upper=False) or > P (upper=True)."""
+        count = len(m)
+        L = np.full(count, -1, dtype=np.int64)
+        R = np.full(count, self.n, dtype=np.int64)
+        l = np.zeros(count, dtype=np.int64)
+        r = np.zeros(count, dtype=np.int64)
+        while True:
+            q = np.flatnonzero(R - L > 1)
+            if not len(q):
+                return R
+            M = (L[q] + R[q]) // 2
+            left = l[q] >= r[q]
+            h = np.where(left, l[q], r[q])
+            if self.Llcp is not None:
+                x = np.where(left, self.Llcp[M], self.Rlcp[M]).astype(np.int64)
+            else:
+                h = np.minimum(l[q], r[q])
+                x = h
+            # x > h: M lies on the same side of the pattern as that bound, x < h: on the other side, with x matching characters
+            to_left = np.where(left, x > h, x < h)
+            k = np.minimum(x, h)
+            compare = x == h
+            if compare.any():
+                c = np.flatnonzero(compare)
+                s = self.SA[M[c]].astype(np.int64)
+                k[c] = self._extend(P, q[c], s, h[c])
+                full = k[c] >= m[q[c]]
+                ended = s + k[c] >= len(self.T)
+                t = self.T[np.minimum(s + k[c], max(len(self.T) - 1, 0))] if len(self.T) else np.zeros(len(c), dtype=np.uint8)
+                p = P[q[c], np.minimum(k[c], P.shape[1] - 1)]
+                smaller = ~full & (ended | (t < p))
+                to_left[c] = smaller | full if upper else smaller
+            L[q] = np.where(to_left, M, L[q])
+            l[q] = np.where(to_left, k, l[q])
+            R[q] = np.where(to_left, R[q], M)
+            r[q] = np.where(to_left, r[q], k)
+
+    def find_many(self, patterns):
+        """
+        Description:
+            Searches a batch of patterns.
+
+        Arguments:
+            patterns (iterable of bytes-like or str): The patterns. A str is encoded as UTF-8.
+
+        Returns:
+            sp (numpy.ndarray of int64): The first SA index of the matches of every pattern.
+            ep (numpy.ndarray of int64): One past the last SA index; ep - sp is the number of occurrences.
+        """
+        patterns = [_as_pattern(p) for p in patterns]
+        unique = sorted(set(patterns))
+        slot = {p: i for i, p in enumerate(unique)}
+        m = np.fromiter((len(p) for p in unique), dtype=np.int64, count=len(unique))
+        P = np.full((len(unique), int(m.max()) + 1 if len(unique) else 1), -1, dtype=np.int16)
+        for i, p in enumerate(unique):
+            P[i, :len(p)] = np.frombuffer(p, dtype=np.uint8)
+        sp = self._bounds(P, m, False)
+        ep = self._bounds(P, m, True)
+        order = np.fromiter((slot[p] for p in patterns), dtype=np.int64, count=len(patterns))
+        return sp[order], ep[order]
+
+    def find(self, pattern):
+        """Return the [sp, ep) interval of SA indexes of the suffixes starting with pattern."""
+        sp, ep = self.find_many([pattern])
+        return int(sp[0]), int(ep[0])
+
+    def count_many(self, patterns):
+        """Return the number of occurrences of every pattern as a NumPy array."""
+        sp, ep = self.find_many(patterns)
+        return ep - sp
+
+    def count(self, pattern):
+        """Return the number of occurrences of pattern in T."""
+        sp, ep = self.find(pattern)
+        return ep - sp
+
+    def locate_many(self, patterns):
+        """Return the positions of every pattern in T, as a list of NumPy arrays in suffix array order."""
+        return [np.asarray(self.SA[sp:ep]) for sp, ep in zip(*self.find_many(patterns))]
+
+    def locate(self, pattern):
+        """Return the positions of pattern in T as a NumPy array, in suffix array order."""
+        sp, ep = self.find(pattern)
+        return np.asarray(self.SA[sp:ep])
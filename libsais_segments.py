@@ -0,0 +1,293 @@
+#!/bin/python3
+# -----------------------------------------------------------------------------
+# libsais_segments.py
+#
+# Append-friendly segmented index for a growing collection of documents.
+# Every batch of added documents becomes a small segment: a generalized suffix
+# array with its LCP array (see libsais_gsa.py), searched with LCP-LR binary
+# search (see libsais_search.py). Segments are merged into larger ones in a
+# background thread on a size-tiered schedule, as in LSM trees: a segment of
+# s bytes belongs to tier floor(log_f(s / base)) (tier 0 below base), and f
+# segments of the same tier are rebuilt as one segment of a higher tier. The merge factor f trades
+# write amplification (every byte is rebuilt about log_f(total / base) times)
+# against query fan-out (up to f - 1 segments per tier). Queries run on a
+# snapshot of the segments and combine their results, so they never wait for
+# a merge. Requires NumPy.
+# -----------------------------------------------------------------------------
+
+import concurrent.futures
+import threading
+
+import numpy as np
+
+import libsais_gsa
+import libsais_search
+import libsais_wrapper as lw
+
+__all__ = [
+    "SegmentedIndex"
+]
+
+# Number of segments of a tier merged into one segment of the next tier
+_DEFAULT_MERGE_FACTOR = 4
+# Size in bytes of the segments of tier 0
+_DEFAULT_TIER_BASE = 1 << 16
+
+class _Segment:
+    """An immutable segment: the generalized suffix array of some documents, their global ids in increasing order, and its search structure."""
+
+    def __init__(self, gsa, doc_ids):
+        self.gsa = gsa
+        self.doc_ids = doc_ids
+        self.search = libsais_search.SuffixArraySearch(gsa.text, gsa.SA, gsa.LCP)
+
+    @property
+    def nbytes(self):
+        return len(self.gsa.text)
+
+    def documents(self):
+        """Yield (id, document) pairs, the documents being views into the segment text."""
+        for j, doc_id in enumerate(self.doc_ids.tolist()):
+            yield doc_id, self.gsa.document(j)
+
+class SegmentedIndex:
+    """
+    Description:
+        A full-text index over a growing collection of documents, made of segments that are built when documents are added and merged in the background.
+        Adding documents costs a suffix array construction over the new documents only; the merges rebuild every document about
+        log_merge_factor(total / tier_base) times over its lifetime. Queries search every segment: with merge_factor f, at most f - 1 segments per tier
+        plus the segments being merged.
+
+        Documents are bytes (a str is encoded as UTF-8) without 0 bytes, which separate the documents in the segments. Document ids are assigned
+        consecutively from 0 in the order in which documents are added. Matches never span two documents; patterns containing a 0 byte have none.
+
+    Arguments:
+        merge_factor (int, optional, default=_DEFAULT_MERGE_FACTOR): The number of segments of a tier merged together, at least 2.
+            Larger values mean fewer rebuilds of every document and more segments per query.
+        tier_base (int, optional, default=_DEFAULT_TIER_BASE): The size in bytes of tier 0: tier t holds the segments of tier_base * merge_factor^t
+            up to tier_base * merge_factor^(t + 1) bytes, and tier 0 also the smaller ones.
+        max_segment_bytes (int, optional, default=None): Segments of this size or larger are never merged again, which bounds the cost of a merge.
+            If None, segments are merged at every tier.
+        background (bool, optional, default=True): Whether merges run in a background thread. If False, they run in add before it returns.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads used by libsais for every segment.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Attributes:
+        bytes_added (int): The size of all added documents, separators included.
+        bytes_indexed (int): The size of all segments built, by add and by merges; bytes_indexed / bytes_added is the write amplification.
+    """
+
+    def __init__(self, merge_factor=_DEFAULT_MERGE_FACTOR, tier_base=_DEFAULT_TIER_BASE, max_segment_bytes=None, background=True, threads=lw._DEFAULT_THREADS, index_width=lw._DEFAULT_INDEX_WIDTH):
+        if merge_factor < 2:
+            raise ValueError(f"merge_factor must be at least 2, got {merge_factor}")
+        self.merge_factor = merge_factor
+        self.tier_base = tier_base
+        self.max_segment_bytes = max_segment_bytes
+        self.threads = threads
+        self.index_width = index_width
+        self.bytes_added = 0
+        self.bytes_indexed = 0
+        # The segments in order of creation; replaced, never modified, so that queries can use a snapshot without locking
+        self._segments = ()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="libsais-merge") if background else None
+        self._merging = None
+        self._error = None
+        self._closed = False
+
+    def __len__(self):
+        return self._next_id
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _build(self, docs):
+        gsa = libsais_gsa.build_gsa(docs, lcp=True, method="bytes", threads=self.threads, index_width=self.index_width)
+        with self._lock:
+            self.bytes_indexed += len(gsa.text)
+        return gsa
+
+    def add(self, docs):
+        """
+        Description:
+            Adds a batch of documents as a new segment and schedules the merges it makes due. The documents are searchable when add returns.
+
+        Arguments:
+            docs (iterable of bytes-like or str): The documents.
+
+        Returns:
+            ids (range): The ids of the added documents.
+
+        Raises:
+            ValueError: If a document contains a 0 byte.
+            RuntimeError: If a libsais function returns an error code.
+        """
+        docs = [libsais_gsa._as_bytes(doc) for doc in docs]
+        if not docs:
+            return range(self._next_id, self._next_id)
+        gsa = self._build(docs)
+        # Ids are assigned once the segment is built, so that a failed add leaves no gap
+        with self._lock:
+            start = self._next_id
+            self._next_id += len(docs)
+            self._segments += (_Segment(gsa, np.arange(start, start + len(docs), dtype=np.int64)),)
+            self.bytes_added += len(gsa.text)
+        self._schedule()
+        return range(start, start + len(docs))
+
+    def _tier(self, nbytes):
+        tier, bound = 0, self.tier_base * self.merge_factor
+        while nbytes >= bound:
+            tier, bound = tier + 1, bound * self.merge_factor
+        return tier
+
+    def _due(self):
+        """Return the oldest merge_factor segments of the lowest full tier, or None."""
+        tiers = {}
+        for segment in self._segments:
+            if self.max_segment_bytes is None or segment.nbytes < self.max_segment_bytes:
+                tiers.setdefault(self._tier(segment.nbytes), []).append(segment)
+        for tier in sorted(tiers):
+            if len(tiers[tier]) >= self.merge_factor:
+                return tiers[tier][:self.merge_factor]
+        return None
+
+    def _merge(self, segments):
+        """Rebuild segments as one segment, with the documents in id order, and swap it in."""
+        ids = np.concatenate([segment.doc_ids for segment in segments])
+        views = [doc for segment in segments for _, doc in segment.documents()]
+        order = np.argsort(ids, kind="stable")
+        merged = _Segment(self._build([views[i] for i in order.tolist()]), ids[order])
+        with self._lock:
+            kept = tuple(s for s in self._segments if not any(s is m for m in segments))
+            self._segments = kept + (merged,)
+
+    def _merge_due(self):
+        while True:
+            with self._lock:
+                segments = self._due()
+            if segments is None:
+                return
+            self._merge(segments)
+
+    def _merge_in_background(self):
+        try:
+            self._merge_due()
+        except BaseException as e:
+            with self._lock:
+                self._error = self._error or e
+
+    def _schedule(self):
+        if self._closed:
+            return
+        if self._executor is None:
+            self._merge_due()
+            return
+        with self._lock:
+            # A pass that has not started yet will see the new segments; one that is running may already have checked them
+            if self._merging is None or self._merging.running() or self._merging.done():
+                self._merging = self._executor.submit(self._merge_in_background)
+
+    def wait(self):
+        """
+        Description:
+            Waits until the merges scheduled so far have finished.
+
+        Raises:
+            Exception: The error of a failed background merge, if any; the segments it was merging are kept.
+        """
+        while True:
+            with self._lock:
+                merging = self._merging
+            if merging is not None:
+                merging.result()
+            with self._lock:
+                if self._merging is merging:
+                    error, self._error = self._error, None
+                    break
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Waits for the running merges and stops the background thread; the index stays searchable and accepts documents, but merges no more."""
+        self._closed = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+
+    def segments(self):
+        """
+        Description:
+            Describes the current segments.
+
+        Returns:
+            segments (list of dict): For every segment in order of creation: its size in bytes ("bytes"), number of documents ("documents") and tier ("tier").
+        """
+        return [{"bytes": s.nbytes, "documents": len(s.doc_ids), "tier": self._tier(s.nbytes)} for s in self._segments]
+
+    def _find_many(self, patterns):
+        """Search every segment of a snapshot. Returns the patterns, the snapshot and the [sp, ep) arrays of every segment."""
+        patterns = [libsais_search._as_pattern(p) for p in patterns]
+        valid = np.fromiter((0 not in p for p in patterns), dtype=bool, count=len(patterns))
+        snapshot = self._segments
+        found = []
+        for segment in snapshot:
+            sp, ep = segment.search.find_many(patterns)
+            found.append((sp, np.where(valid, ep, sp)))
+        return patterns, snapshot, found
+
+    def count_many(self, patterns):
+        """Return the number of occurrences of every pattern over all documents as a NumPy array."""
+        patterns, _, found = self._find_many(patterns)
+        counts = np.zeros(len(patterns), dtype=np.int64)
+        for sp, ep in found:
+            counts += ep - sp
+        return counts
+
+    def count(self, pattern):
+        """Return the number of occurrences of pattern over all documents."""
+        return int(self.count_many([pattern])[0])
+
+    def locate_many(self, patterns):
+        """
+        Description:
+            Finds the occurrences of a batch of patterns in all segments.
+
+        Arguments:
+            patterns (iterable of bytes-like or str): The patterns. A str is encoded as UTF-8.
+
+        Returns:
+            matches (list of tuple): For every pattern, the document ids and the offsets within the documents of its occurrences,
+                as two NumPy int64 arrays sorted by document and offset.
+        """
+        patterns, snapshot, found = self._find_many(patterns)
+        matches = []
+        for i in range(len(patterns)):
+            docs, offsets = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+            for segment, (sp, ep) in zip(snapshot, found):
+                doc, offset = segment.gsa.locate(segment.gsa.SA[sp[i]:ep[i]])
+                docs.append(segment.doc_ids[doc])
+                offsets.append(offset)
+            docs, offsets = np.concatenate(docs), np.concatenate(offsets)
+            order = np.lexsort((offsets, docs))
+            matches.append((docs[order], offsets[order]))
+        return matches
+
+    def locate(self, pattern):
+        """Return the document ids and offsets of the occurrences of pattern, sorted by document and offset."""
+        return self.locate_many([pattern])[0]
+
+    def documents_containing(self, pattern):
+        """Return the sorted ids of the documents containing pattern as a NumPy array."""
+        return np.unique(self.locate(pattern)[0])
+
+    def document(self, doc_id):
+        """Return document doc_id as a view into the text of its segment."""
+        for segment in self._segments:
+            j = int(np.searchsorted(segment.doc_ids, doc_id))
+            if j < len(segment.doc_ids) and segment.doc_ids[j] == doc_id:
+                return segment.gsa.document(j)
+        raise IndexError(f"document {doc_id} is not in the index")
@@ -10,42 +10,49 @@
 # Newton Winter provided the prompts, composition, testing, bugfixes, code rearrangements and overall logic.
 # -----------------------------------------------------------------------------
 
+import array
+import bisect
+import collections
 import ctypes
+import functools
+import hashlib
+import json
+import math
+import mmap
 import os
+import platform
+import random
+import struct
 import sys
-from ctypes import c_int64, c_uint8, POINTER
-from ctypes.util import find_library
-
-if sys.platform.startswith('win'):  # Windows
-    libname = "libsais-2.7.1.dll"
-elif sys.platform.startswith('darwin'):  # macOS
-    libname = "libsais.2.dylib"
-elif sys.platform.startswith('linux'):  # Linux
-    libname = "libsais.so.2"
-else:
-    print("OS not supported")
-    sys.exit(1)
-
-# Check if the library is in PATH directories
-found_in_path = False
-for path in os.environ["PATH"].split(os.pathsep):
-    if os.path.exists(os.path.join(path, libname)):
-        libname = os.path.join(path, libname)
-        found_in_path = True
-        break
-
-# If the library is not in PATH, look for it in the current directory
-if not found_in_path:
-    libname = os.path.join(os.getcwd(), libname)
-
-# Load the shared library
-libsais = ctypes.CDLL(libname)
-      
-# Set the default number of threads for OMP functions
-_DEFAULT_THREADS = 4
-# Enable or disable OMP functions
+import threading
+import time
+import warnings
+from ctypes import c_int32, c_int64, c_uint8, c_uint16
+
+# NumPy is optional, it is only required by compact_alphabet; it is imported on first use by _numpy
+np = None
+_np_imported = False
+
+def _numpy():
+    """Import NumPy on first use and return it, or None if it is not installed."""
+    global np, _np_imported
+    if not _np_imported:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            pass
+        _np_imported = True
+    return np
+
+# Set the default number of threads for OMP functions; 0 picks the threads of every call from the tuning table, see tuned_settings
+_DEFAULT_THREADS = 0
+# Enable or disable OMP functions; turned off when the library is loaded if it is compiled without OpenMP
 _USE_OMP = True
-#we need to test if the library is compiled with OMP first!
+# Set the default index width policy: "auto" uses 32-bit indexes whenever the input fits, "32" or "64" force a width
+_DEFAULT_INDEX_WIDTH = "auto"
+# Use the compiled binding _libsais_fast (see "make fast") when it can be imported; LIBSAIS_BINDING=ctypes turns it off
+_USE_FAST = os.environ.get("LIBSAIS_BINDING", "auto") != "ctypes"
 
 __all__ = [
     "libsais64",
@@ -54,7 +61,39 @@ __all__ = [
     "libsais64_unbwt",
     "libsais64_unbwt_aux",
     "libsais64_plcp",
-    "libsais64_lcp"
+    "libsais64_lcp",
+    "suffix_array",
+    "bwt",
+    "bwt_aux",
+    "unbwt",
+    "unbwt_aux",
+    "plcp",
+    "lcp",
+    "suffix_array16",
+    "plcp16",
+    "suffix_array_int",
+    "plcp_int",
+    "compact_alphabet",
+    "batch_suffix_array",
+    "batch_bwt",
+    "batch_lcp",
+    "SaisContext",
+    "build_index",
+    "build_files",
+    "open_index_file",
+    "IndexFileHeader",
+    "usable_cpus",
+    "omp_available",
+    "tuned_settings",
+    "calibrate",
+    "CallRecord",
+    "add_call_hook",
+    "remove_call_hook",
+    "profile",
+    "enable_metrics",
+    "reset_metrics",
+    "export_metrics",
+    "library_info"
 ]
 
 """
@@ -76,340 +115,2337 @@ libsais64_plcp: Constructs the permuted longest common prefix array (PLCP) of a
 libsais64_lcp: Constructs the longest common prefix array (LCP) of a given permuted longest common prefix array (PLCP) and a suffix array.
 libsais64_plcp_omp: Constructs the permuted longest common prefix array (PLCP) of a given string and a suffix array in parallel using OpenMP.
 libsais64_lcp_omp: Constructs the longest common prefix array (LCP) of a given permuted longest common prefix array (PLCP) and a suffix array in parallel using OpenMP.
+
+The same functions without the 64 suffix (libsais, libsais_bwt, ..., libsais_lcp_omp) use 32-bit indexes and are limited to inputs of fewer than 2^31 symbols.
+They are used by suffix_array, bwt, bwt_aux, unbwt, unbwt_aux, plcp and lcp, which pick the index width according to the index_width policy.
+
+libsais16, libsais16_plcp: Construct the suffix array and PLCP array of a string of 16-bit symbols (e.g. UTF-16 code units), used by suffix_array16 and plcp16.
+libsais_int: Constructs the suffix array of an integer array over the alphabet [0, k), used by suffix_array_int.
+libsais_create_ctx, libsais_ctx, libsais_bwt_ctx, libsais_bwt_aux_ctx, libsais_unbwt_create_ctx, libsais_unbwt_ctx, libsais_unbwt_aux_ctx: 32-bit construction with a reusable context that keeps the internal buffers of libsais between calls, used by SaisContext.
+libsais_plcp_int, libsais64_long, libsais64_plcp_long: Integer alphabet PLCP and 64-bit integer alphabet construction, bound only if the library exports them (libsais 2.8+).
 """
 
-# Define the types of the arguments for the exported functions
-libsais.libsais64.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
-libsais.libsais64_bwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
-libsais.libsais64_bwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
-libsais.libsais64_unbwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
-libsais.libsais64_unbwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
-libsais.libsais64_plcp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
-libsais.libsais64_lcp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
-
-# Define the return types of the exported functions
-libsais.libsais64.restype = ctypes.c_int64
-libsais.libsais64_bwt.restype = ctypes.c_int64
-libsais.libsais64_bwt_aux.restype = ctypes.c_int64
-libsais.libsais64_unbwt.restype = ctypes.c_int64
-libsais.libsais64_unbwt_aux.restype = ctypes.c_int64
-libsais.libsais64_plcp.restype = ctypes.c_int64
-libsais.libsais64_lcp.restype = ctypes.c_int64
-
-# OMP functions argtypes and restypes
-
-if _USE_OMP and hasattr(libsais, "libsais64_omp"): 
-    # Define the types of the arguments for the exported OMP functions
-    libsais.libsais64_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
-    libsais.libsais64_bwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
-    libsais.libsais64_bwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
-    libsais.libsais64_unbwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
-    libsais.libsais64_unbwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
-    libsais.libsais64_plcp_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
-    libsais.libsais64_lcp_omp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
-
-    # Define the return types of the exported OMP functions
-    libsais.libsais64_omp.restype = ctypes.c_int64
-    libsais.libsais64_bwt_omp.restype = ctypes.c_int64
-    libsais.libsais64_bwt_aux_omp.restype = ctypes.c_int64
-    libsais.libsais64_unbwt_omp.restype = ctypes.c_int64
-    libsais.libsais64_unbwt_aux_omp.restype = ctypes.c_int64
-    libsais.libsais64_plcp_omp.restype = ctypes.c_int64
-    libsais.libsais64_lcp_omp.restype = ctypes.c_int64
-else:
-    #The library does not contain the exported OMP functions, turn off the use:
-    print("WARNING: OpenMP exports not found in", libname, "Using single-thread. Re-compile the library with OpenMP or disable _USE_OMP in libsais_wrapper.py");
-    _USE_OMP = False
+# -----------------------------------------------------------------------------
+# Library loading
+#
+# Nothing is loaded at import time. The first call that needs libsais
+# resolves the shared library once, in this order: LIBSAIS_PATH (a file, or a
+# directory holding it), the PATH directories, the directory of this module,
+# the current directory and finally the system library search. Functions are
+# called through the compiled binding _libsais_fast when it is importable,
+# and through ctypes otherwise; SaisContext always uses ctypes.
+# -----------------------------------------------------------------------------
+
+# The ctypes library and its path, set by _load
+libsais = None
+libname = None
+# The compiled binding module, or None
+_fast = None
+_loaded = False
+_load_lock = threading.Lock()
+_HAS_CTX = _HAS_PLCP_INT = _HAS_LONG = False
+
+def _default_libname():
+    if sys.platform.startswith('win'):  # Windows
+        return "libsais-2.7.1.dll"
+    if sys.platform.startswith('darwin'):  # macOS
+        return "libsais.2.dylib"
+    if sys.platform.startswith('linux'):  # Linux
+        return "libsais.so.2"
+    return None
+
+def _find_library():
+    """Return the path of the libsais shared library, or None if it is not found."""
+    name = _default_libname()
+    override = os.environ.get("LIBSAIS_PATH")
+    if override:
+        if os.path.isdir(override) and name is not None:
+            override = os.path.join(override, name)
+        if not os.path.exists(override):
+            raise OSError(f"LIBSAIS_PATH is set to {override}, which does not exist")
+        return override
+    if name is not None:
+        directories = os.environ.get("PATH", "").split(os.pathsep) + [os.path.dirname(os.path.abspath(__file__)), os.getcwd()]
+        for directory in directories:
+            path = os.path.join(directory, name)
+            if os.path.exists(path):
+                return path
+    from ctypes.util import find_library
+    return find_library("sais")
+
+def _bind(libsais):
+    """Set the argument and return types of the libsais functions and detect the optional exports."""
+    global _USE_OMP, _HAS_CTX, _HAS_PLCP_INT, _HAS_LONG
+    # Define the types of the arguments for the exported functions
+    libsais.libsais64.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
+    libsais.libsais64_bwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
+    libsais.libsais64_bwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
+    libsais.libsais64_unbwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
+    libsais.libsais64_unbwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64)]
+    libsais.libsais64_plcp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
+    libsais.libsais64_lcp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
+
+    # Define the return types of the exported functions
+    libsais.libsais64.restype = ctypes.c_int64
+    libsais.libsais64_bwt.restype = ctypes.c_int64
+    libsais.libsais64_bwt_aux.restype = ctypes.c_int64
+    libsais.libsais64_unbwt.restype = ctypes.c_int64
+    libsais.libsais64_unbwt_aux.restype = ctypes.c_int64
+    libsais.libsais64_plcp.restype = ctypes.c_int64
+    libsais.libsais64_lcp.restype = ctypes.c_int64
+
+    # Define the types of the arguments for the exported 32-bit functions
+    libsais.libsais.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+    libsais.libsais_bwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+    libsais.libsais_bwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+    libsais.libsais_unbwt.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+    libsais.libsais_unbwt_aux.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+    libsais.libsais_plcp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+    libsais.libsais_lcp.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+
+    # Define the return types of the exported 32-bit functions
+    libsais.libsais.restype = ctypes.c_int32
+    libsais.libsais_bwt.restype = ctypes.c_int32
+    libsais.libsais_bwt_aux.restype = ctypes.c_int32
+    libsais.libsais_unbwt.restype = ctypes.c_int32
+    libsais.libsais_unbwt_aux.restype = ctypes.c_int32
+    libsais.libsais_plcp.restype = ctypes.c_int32
+    libsais.libsais_lcp.restype = ctypes.c_int32
+
+    # Define the types of the arguments and return types for the exported 16-bit and integer alphabet functions
+    libsais.libsais16.argtypes = [ctypes.POINTER(ctypes.c_uint16), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+    libsais.libsais16_plcp.argtypes = [ctypes.POINTER(ctypes.c_uint16), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+    libsais.libsais_int.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.c_int32]
+    libsais.libsais16.restype = ctypes.c_int32
+    libsais.libsais16_plcp.restype = ctypes.c_int32
+    libsais.libsais_int.restype = ctypes.c_int32
+
+    # Context functions of the 32-bit API, which keep libsais's internal buffers between calls
+    _HAS_CTX = hasattr(libsais, "libsais_create_ctx") and hasattr(libsais, "libsais_unbwt_create_ctx")
+    if _HAS_CTX:
+        libsais.libsais_create_ctx.argtypes = []
+        libsais.libsais_free_ctx.argtypes = [ctypes.c_void_p]
+        libsais.libsais_ctx.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+        libsais.libsais_bwt_ctx.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+        libsais.libsais_bwt_aux_ctx.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+        libsais.libsais_unbwt_create_ctx.argtypes = []
+        libsais.libsais_unbwt_free_ctx.argtypes = [ctypes.c_void_p]
+        libsais.libsais_unbwt_ctx.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_unbwt_aux_ctx.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32)]
+        libsais.libsais_create_ctx.restype = ctypes.c_void_p
+        libsais.libsais_free_ctx.restype = None
+        libsais.libsais_ctx.restype = ctypes.c_int32
+        libsais.libsais_bwt_ctx.restype = ctypes.c_int32
+        libsais.libsais_bwt_aux_ctx.restype = ctypes.c_int32
+        libsais.libsais_unbwt_create_ctx.restype = ctypes.c_void_p
+        libsais.libsais_unbwt_free_ctx.restype = None
+        libsais.libsais_unbwt_ctx.restype = ctypes.c_int32
+        libsais.libsais_unbwt_aux_ctx.restype = ctypes.c_int32
+
+    # Integer alphabet functions added in later libsais versions, bound only when exported
+    _HAS_PLCP_INT = hasattr(libsais, "libsais_plcp_int")
+    _HAS_LONG = hasattr(libsais, "libsais64_long") and hasattr(libsais, "libsais64_plcp_long")
+    if _HAS_PLCP_INT:
+        libsais.libsais_plcp_int.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_plcp_int.restype = ctypes.c_int32
+    if _HAS_LONG:
+        libsais.libsais64_long.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.c_int64]
+        libsais.libsais64_plcp_long.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64]
+        libsais.libsais64_long.restype = ctypes.c_int64
+        libsais.libsais64_plcp_long.restype = ctypes.c_int64
+
+    # OMP functions argtypes and restypes
+
+    if _USE_OMP and hasattr(libsais, "libsais64_omp") and hasattr(libsais, "libsais_omp"):
+        # Define the types of the arguments for the exported OMP functions
+        libsais.libsais64_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
+        libsais.libsais64_bwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
+        libsais.libsais64_bwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
+        libsais.libsais64_unbwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
+        libsais.libsais64_unbwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.POINTER(ctypes.c_int64), ctypes.c_int32]
+        libsais.libsais64_plcp_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
+        libsais.libsais64_lcp_omp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
+
+        # Define the return types of the exported OMP functions
+        libsais.libsais64_omp.restype = ctypes.c_int64
+        libsais.libsais64_bwt_omp.restype = ctypes.c_int64
+        libsais.libsais64_bwt_aux_omp.restype = ctypes.c_int64
+        libsais.libsais64_unbwt_omp.restype = ctypes.c_int64
+        libsais.libsais64_unbwt_aux_omp.restype = ctypes.c_int64
+        libsais.libsais64_plcp_omp.restype = ctypes.c_int64
+        libsais.libsais64_lcp_omp.restype = ctypes.c_int64
+
+        # Define the types of the arguments for the exported 32-bit OMP functions
+        libsais.libsais_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_bwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_bwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_unbwt_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32]
+        libsais.libsais_unbwt_aux_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais_plcp_omp.argtypes = [ctypes.POINTER(ctypes.c_uint8), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32]
+        libsais.libsais_lcp_omp.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32]
+
+        # Define the return types of the exported 32-bit OMP functions
+        libsais.libsais_omp.restype = ctypes.c_int32
+        libsais.libsais_bwt_omp.restype = ctypes.c_int32
+        libsais.libsais_bwt_aux_omp.restype = ctypes.c_int32
+        libsais.libsais_unbwt_omp.restype = ctypes.c_int32
+        libsais.libsais_unbwt_aux_omp.restype = ctypes.c_int32
+        libsais.libsais_plcp_omp.restype = ctypes.c_int32
+        libsais.libsais_lcp_omp.restype = ctypes.c_int32
+
+        # Define the types of the arguments and return types for the exported 16-bit and integer alphabet OMP functions
+        libsais.libsais16_omp.argtypes = [ctypes.POINTER(ctypes.c_uint16), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.POINTER(ctypes.c_int32), ctypes.c_int32]
+        libsais.libsais16_plcp_omp.argtypes = [ctypes.POINTER(ctypes.c_uint16), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32]
+        libsais.libsais_int_omp.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32, ctypes.c_int32, ctypes.c_int32]
+        libsais.libsais16_omp.restype = ctypes.c_int32
+        libsais.libsais16_plcp_omp.restype = ctypes.c_int32
+        libsais.libsais_int_omp.restype = ctypes.c_int32
+        if _HAS_CTX:
+            libsais.libsais_create_ctx_omp.argtypes = [ctypes.c_int32]
+            libsais.libsais_unbwt_create_ctx_omp.argtypes = [ctypes.c_int32]
+            libsais.libsais_create_ctx_omp.restype = ctypes.c_void_p
+            libsais.libsais_unbwt_create_ctx_omp.restype = ctypes.c_void_p
+        if _HAS_PLCP_INT:
+            libsais.libsais_plcp_int_omp.argtypes = [ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.POINTER(ctypes.c_int32), ctypes.c_int32, ctypes.c_int32]
+            libsais.libsais_plcp_int_omp.restype = ctypes.c_int32
+        if _HAS_LONG:
+            libsais.libsais64_long_omp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int64, ctypes.c_int64, ctypes.c_int32]
+            libsais.libsais64_plcp_long_omp.argtypes = [ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.POINTER(ctypes.c_int64), ctypes.c_int64, ctypes.c_int32]
+            libsais.libsais64_long_omp.restype = ctypes.c_int64
+            libsais.libsais64_plcp_long_omp.restype = ctypes.c_int64
+    else:
+        # The library does not contain the exported OMP functions, turn off their use
+        warnings.warn(f"OpenMP exports not found in {libname}, using a single thread. Re-compile the library with OpenMP or set _USE_OMP = False in libsais_wrapper.py", RuntimeWarning, stacklevel=3)
+        _USE_OMP = False
+
+def _load():
+    """Load the library and the compiled binding on first use; later calls return immediately."""
+    global libsais, libname, _fast, _loaded, _USE_OMP, _HAS_PLCP_INT, _HAS_LONG
+    with _load_lock:
+        if _loaded:
+            return libsais
+        fast = None
+        if _USE_FAST:
+            try:
+                import _libsais_fast as fast
+            except ImportError:
+                fast = None
+        path = _find_library()
+        if path is None and fast is None:
+            raise OSError(f"libsais shared library {_default_libname() or ''} not found in LIBSAIS_PATH, PATH, {os.path.dirname(os.path.abspath(__file__))}, "
+                          "the current directory or the system library path; build it with make or set LIBSAIS_PATH")
+        if path is not None:
+            lib = ctypes.CDLL(path)
+            libname = path
+            _bind(lib)
+            libsais = lib
+        if fast is not None:
+            # Calls go through the binding, so its exports decide what is available
+            _USE_OMP = _USE_OMP and fast.OPENMP.get("libsais", False)
+            _HAS_PLCP_INT = hasattr(fast, "libsais_plcp_int")
+            _HAS_LONG = hasattr(fast, "libsais64_long") and hasattr(fast, "libsais64_plcp_long")
+            _fast = fast
+        _loaded = True
+        return libsais
+
+def library_info():
+    """
+    Description:
+        The library_info function loads libsais if needed and describes what is used.
+
+    Returns:
+        info (dict): "path" (the shared library loaded with ctypes, or None), "binding" ("fast" if calls go through the compiled binding,
+        otherwise "ctypes"), "omp" (whether the _omp entry points are used) and "context" (whether SaisContext uses the libsais context API).
+
+    Raises:
+        OSError: If neither the shared library nor the compiled binding is found.
+    """
+    if not _loaded:
+        _load()
+    return {"path": libname, "binding": "fast" if _fast is not None else "ctypes", "omp": _USE_OMP, "context": _HAS_CTX}
+
+# -----------------------------------------------------------------------------
+# Buffer handling
+#
+# Every wrapper accepts either Python lists (the original interface) or any
+# object exporting the buffer protocol: bytes, bytearray, memoryview,
+# array.array, mmap and NumPy arrays. Buffers are handed to the C library by
+# address, without copying; lists are converted once with array.array and the
+# results are turned back into lists with tolist(), so no per-element Python
+# code runs in either case.
+# -----------------------------------------------------------------------------
+
+# Flags from CPython's buffer interface (Include/pybuffer.h)
+_PyBUF_WRITABLE = 0x0001
+_PyBUF_FORMAT = 0x0004
+_PyBUF_C_CONTIGUOUS = 0x0038
+
+class _Py_buffer(ctypes.Structure):
+    _fields_ = [
+        ("buf", ctypes.c_void_p),
+        ("obj", ctypes.c_void_p),
+        ("len", ctypes.c_ssize_t),
+        ("itemsize", ctypes.c_ssize_t),
+        ("readonly", ctypes.c_int),
+        ("ndim", ctypes.c_int),
+        ("format", ctypes.c_char_p),
+        ("shape", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("strides", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("suboffsets", ctypes.POINTER(ctypes.c_ssize_t)),
+        ("internal", ctypes.c_void_p),
+    ]
+
+_PyObject_GetBuffer = ctypes.pythonapi.PyObject_GetBuffer
+_PyObject_GetBuffer.argtypes = [ctypes.py_object, ctypes.POINTER(_Py_buffer), ctypes.c_int]
+_PyObject_GetBuffer.restype = ctypes.c_int
+_PyBuffer_Release = ctypes.pythonapi.PyBuffer_Release
+_PyBuffer_Release.argtypes = [ctypes.POINTER(_Py_buffer)]
+_PyBuffer_Release.restype = None
+
+# array.array typecodes for the C element types used by libsais
+_TYPECODES = {c_uint8: 'B', c_uint16: 'H', c_int32: 'i', c_int64: 'q'}
+
+# C index type for each supported index width
+_INDEX_CTYPES = {32: c_int32, 64: c_int64}
+# Largest n + fs supported by the 32-bit entry points
+_INT32_MAX = 2**31 - 1
+
+# Struct format codes accepted for each C element type: 1-byte codes for symbols, 16-bit codes for 16-bit symbols, signed codes
+# of the same size for the index arrays; the item size is checked separately, as 'l' has 4 or 8 bytes
+_FORMAT_CODES = {c_uint8: "Bbc", c_uint16: "hH", c_int32: "il", c_int64: "lqn"}
+_FORMAT_NAMES = {c_uint8: "bytes", c_uint16: "16-bit integers", c_int32: "signed 32-bit integers", c_int64: "signed 64-bit integers"}
+# Byte order prefixes of formats whose items are in native order
+_NATIVE_ORDER = "@=" + ("<" if sys.byteorder == "little" else ">!")
+
+def _format_matches(fmt, itemsize, ctype):
+    """Return whether a buffer with the struct format fmt and items of itemsize bytes holds elements of ctype."""
+    if fmt[:1] in ("@", "=", "<", ">", "!"):
+        if fmt[0] not in _NATIVE_ORDER:
+            return False
+        fmt = fmt[1:]
+    return len(fmt) == 1 and fmt in _FORMAT_CODES[ctype] and itemsize == ctypes.sizeof(ctype)
+
+class _Pins:
+    """
+    Context manager that pins buffer-protocol objects for the duration of a C call.
+
+    Calling the instance with an object returns a ctypes pointer to its first element;
+    every acquired buffer is released again when the with-block exits.
+    """
+
+    def __init__(self, fast=True):
+        if not _loaded:
+            _load()
+        # The compiled binding pins and checks the objects itself, so they are passed through
+        self._fast = fast and _fast is not None
+        self._views = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        for view in self._views:
+            _PyBuffer_Release(ctypes.byref(view))
+        self._views.clear()
+
+    def __call__(self, obj, ctype, count, name, writable=False):
+        if obj is None:
+            return None
+        if self._fast:
+            if _INSTRUMENT:
+                with memoryview(obj) as view:
+                    _count_bytes("bytes_pinned", view.nbytes)
+            return obj
+        view = _Py_buffer()
+        flags = _PyBUF_C_CONTIGUOUS | _PyBUF_FORMAT | (_PyBUF_WRITABLE if writable else 0)
+        try:
+            _PyObject_GetBuffer(obj, ctypes.byref(view), flags)
+        except (BufferError, TypeError, ValueError) as e:
+            raise TypeError(f"{name} must be a C-contiguous{' writable' if writable else ''} buffer: {e}") from None
+        self._views.append(view)
+        if _INSTRUMENT:
+            _count_bytes("bytes_pinned", view.len)
+        size = ctypes.sizeof(ctype)
+        fmt = view.format.decode("ascii") if view.format else "B"
+        if not _format_matches(fmt, view.itemsize, ctype):
+            raise TypeError(f"{name} must be a buffer of {_FORMAT_NAMES[ctype]}, got format '{fmt}' with {view.itemsize}-byte items")
+        if view.len < count * size:
+            raise ValueError(f"{name} must hold at least {count} items of {size} bytes, got {view.len} bytes")
+        return ctypes.cast(view.buf, ctypes.POINTER(ctype))
+
+def _as_buffer(obj, ctype):
+    """Convert a list or tuple into an array.array of the matching type; pass buffers through unchanged."""
+    if isinstance(obj, (list, tuple)):
+        if _INSTRUMENT:
+            _count_bytes("bytes_converted", len(obj) * ctypes.sizeof(ctype))
+        return array.array(_TYPECODES[ctype], obj), True
+    return obj, False
+
+def _output(obj, ctype, count):
+    """Return a writable output buffer: a fresh zeroed array.array for None or a list, otherwise obj itself."""
+    if obj is None or isinstance(obj, (list, tuple)):
+        return array.array(_TYPECODES[ctype], [0]) * count, isinstance(obj, (list, tuple))
+    return obj, False
+
+def _result(obj, as_list):
+    if as_list and _INSTRUMENT:
+        _count_bytes("bytes_converted", len(obj) * obj.itemsize)
+    return obj.tolist() if as_list else obj
+
+def _length(obj):
+    """Return the number of items in a list or buffer."""
+    if isinstance(obj, (list, tuple)):
+        return len(obj)
+    with memoryview(obj) as view:
+        return view.nbytes // view.itemsize
+
+def _index_width(index_width, n, *arrays):
+    """
+    Resolve an index width policy to 32 or 64 for arrays of n elements.
+
+    "auto" takes the width from the first given index buffer with 4- or 8-byte items and otherwise
+    uses 32-bit indexes whenever n fits; "32" and "64" (or the integers 32 and 64) force a width.
+    """
+    if index_width == "auto":
+        width = 32 if n <= _INT32_MAX else 64
+        for a in arrays:
+            if a is not None and not isinstance(a, (list, tuple)):
+                with memoryview(a) as view:
+                    if view.itemsize in (4, 8):
+                        width = view.itemsize * 8
+                        break
+    elif str(index_width) in ("32", "64"):
+        width = int(index_width)
+    else:
+        raise ValueError(f"index_width must be 'auto', '32' or '64', got {index_width!r}")
+    if width == 32 and n > _INT32_MAX:
+        raise ValueError(f"32-bit indexes support at most {_INT32_MAX} elements, got {n}")
+    return width
+
+# -----------------------------------------------------------------------------
+# Instrumentation
+#
+# Every wrapper call has three phases: converting the arguments and pinning
+# the buffers, the libsais C call, and converting the results back. When at
+# least one call hook is registered, every public wrapper call records the
+# time of each phase, the bytes converted from and to Python lists, the bytes
+# passed to C, the entry point (serial or _omp, 32- or 64-bit), the threads
+# and the return code in a CallRecord and passes it to the hooks. Without
+# hooks a call only pays for one extra Python frame and a check of a module
+# flag, well under a microsecond.
+# -----------------------------------------------------------------------------
+
+# True while call hooks are registered; checked on every call
+_INSTRUMENT = False
+_hooks = ()
+_hooks_lock = threading.Lock()
+_local = threading.local()
+
+# Upper bounds in seconds of the call time histogram buckets
+_METRIC_BUCKETS = (1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0, 100.0)
+
+class CallRecord:
+    """
+    Description:
+        The measurements of one public wrapper call, passed to the call hooks.
+
+    Attributes:
+        function (str): The wrapper called, e.g. "bwt" or "SaisContext.suffix_array".
+        entry_point (str or None): The C function called, e.g. "libsais64_bwt_omp", or None if the call failed before reaching it.
+        index_width (int or None): 32 or 64, taken from the entry point.
+        threads (int): The threads passed to the C function (1 for the serial entry points).
+        n (int): The number of symbols passed to the C function.
+        result (int or None): The return code of the C function.
+        input_seconds (float): The time spent converting arguments and pinning buffers before the C call.
+        c_seconds (float): The time spent in the C function.
+        output_seconds (float): The time spent after the C call, converting results back.
+        total_seconds (float): The time of the whole call.
+        bytes_converted (int): The bytes converted between Python lists and arrays, in both directions.
+        bytes_pinned (int): The bytes of the buffers passed to the C function.
+    """
+
+    __slots__ = ("function", "entry_point", "index_width", "threads", "n", "result", "input_seconds", "c_seconds", "output_seconds",
+                 "total_seconds", "bytes_converted", "bytes_pinned", "_c_first", "_c_last")
+
+    def __init__(self, function):
+        self.function = function
+        self.entry_point = self.index_width = self.result = self._c_first = self._c_last = None
+        self.threads = self.n = self.bytes_converted = self.bytes_pinned = 0
+        self.input_seconds = self.c_seconds = self.output_seconds = self.total_seconds = 0.0
+
+    def __repr__(self):
+        return "CallRecord(" + ", ".join(f"{k}={getattr(self, k)!r}" for k in self.__slots__ if not k.startswith("_")) + ")"
+
+    def as_dict(self):
+        """Return the attributes as a dict, e.g. for json.dumps."""
+        return {k: getattr(self, k) for k in self.__slots__ if not k.startswith("_")}
+
+def add_call_hook(hook):
+    """
+    Description:
+        The add_call_hook function registers hook(record) to be called with a CallRecord after every public wrapper call, in the thread that made it.
+        Registering the first hook turns instrumentation on. Hooks should return quickly; an exception raised by a hook propagates to the caller.
+
+    Arguments:
+        hook (callable): The hook.
+    """
+    global _hooks, _INSTRUMENT
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+        _INSTRUMENT = True
+
+def remove_call_hook(hook):
+    """Unregister a hook added with add_call_hook; instrumentation turns off with the last hook."""
+    global _hooks, _INSTRUMENT
+    with _hooks_lock:
+        hooks = list(_hooks)
+        hooks.remove(hook)
+        _hooks = tuple(hooks)
+        _INSTRUMENT = bool(_hooks)
+
+class profile:
+    """
+    Description:
+        Context manager that collects the CallRecord of every wrapper call made inside the with-block, from any thread.
+
+        with profile() as calls:
+            bwt(data)
+        print(calls[0].c_seconds)
+    """
+
+    def __enter__(self):
+        self.calls = []
+        add_call_hook(self.calls.append)
+        return self.calls
+
+    def __exit__(self, *exc):
+        remove_call_hook(self.calls.append)
+
+def _instrumented(fn):
+    """Decorator recording the calls of the public wrapper fn while instrumentation is on; nested wrapper calls are part of the outer record."""
+    name = fn.__qualname__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _INSTRUMENT or getattr(_local, "record", None) is not None:
+            return fn(*args, **kwargs)
+        record = _local.record = CallRecord(name)
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            end = time.perf_counter()
+            _local.record = None
+            record.total_seconds = end - start
+            if record._c_first is None:
+                record.input_seconds = record.total_seconds
+            else:
+                record.input_seconds = record._c_first - start
+                record.output_seconds = end - record._c_last
+            for hook in _hooks:
+                hook(record)
+    return wrapper
+
+def _invoke(name, threads, fn, args, n):
+    """Call the C function fn named name with args, adding its time, return code and entry point to the current record if instrumented."""
+    if not _INSTRUMENT:
+        return fn(*args)
+    start = time.perf_counter()
+    result = fn(*args)
+    end = time.perf_counter()
+    record = getattr(_local, "record", None)
+    if record is not None:
+        if record._c_first is None:
+            record._c_first = start
+        record._c_last = end
+        record.c_seconds += end - start
+        record.entry_point, record.threads, record.n, record.result = name, threads, n, result
+        record.index_width = 64 if name.startswith("libsais64") else 32
+    return result
+
+def _count_bytes(attr, nbytes):
+    record = getattr(_local, "record", None)
+    if record is not None:
+        setattr(record, attr, getattr(record, attr) + nbytes)
+
+class _Metrics:
+    """Call hook aggregating CallRecords into counters and a histogram of call times per function and entry point."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def __call__(self, record):
+        with self.lock:
+            s = self.series.get((record.function, record.entry_point))
+            if s is None:
+                s = self.series[(record.function, record.entry_point)] = {
+                    "calls": 0, "errors": 0, "symbols": 0, "bytes_converted": 0, "bytes_pinned": 0,
+                    "seconds": {"input": 0.0, "c": 0.0, "output": 0.0, "total": 0.0}, "buckets": [0] * (len(_METRIC_BUCKETS) + 1)}
+            s["calls"] += 1
+            s["errors"] += record.result is None or record.result < 0
+            s["symbols"] += record.n
+            s["bytes_converted"] += record.bytes_converted
+            s["bytes_pinned"] += record.bytes_pinned
+            for phase in ("input", "c", "output", "total"):
+                s["seconds"][phase] += getattr(record, phase + "_seconds")
+            s["buckets"][bisect.bisect_left(_METRIC_BUCKETS, record.total_seconds)] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {key: dict(s, seconds=dict(s["seconds"]), buckets=list(s["buckets"])) for key, s in self.series.items()}
+
+_metrics = _Metrics()
+
+def enable_metrics(enabled=True):
+    """
+    Description:
+        The enable_metrics function turns the built-in aggregation of wrapper calls on or off. While on, every call is counted per function and
+        entry point: calls, errors (negative or missing return codes), symbols, bytes converted and pinned, seconds per phase and a histogram of
+        call times. Counters are kept when aggregation is turned off; see reset_metrics and export_metrics.
+
+    Arguments:
+        enabled (bool, optional, default=True): Whether to aggregate calls.
+    """
+    if enabled and _metrics not in _hooks:
+        add_call_hook(_metrics)
+    elif not enabled and _metrics in _hooks:
+        remove_call_hook(_metrics)
+
+def reset_metrics():
+    """Clear the aggregated counters."""
+    with _metrics.lock:
+        _metrics.series.clear()
+
+def _prometheus_labels(function, entry_point, **extra):
+    labels = dict(function=function, entry_point=entry_point or "", **extra)
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}"
+
+def export_metrics(format="prometheus"):
+    """
+    Description:
+        The export_metrics function returns the counters aggregated since enable_metrics (or the last reset_metrics).
+
+    Arguments:
+        format (str, optional, default="prometheus"): "prometheus" for the Prometheus text exposition format, or "json".
+
+    Returns:
+        text (str): The metrics. The JSON form is a list with one object per function and entry point, holding the counters,
+        the seconds per phase and the cumulative histogram counts keyed by upper bound.
+
+    Raises:
+        ValueError: If format is unknown.
+    """
+    series = sorted(_metrics.snapshot().items(), key=lambda item: (item[0][0], item[0][1] or ""))
+    bounds = [repr(b) for b in _METRIC_BUCKETS] + ["+Inf"]
+    if format == "json":
+        out = []
+        for (function, entry_point), s in series:
+            cumulative = [sum(s["buckets"][:i + 1]) for i in range(len(bounds))]
+            out.append(dict(function=function, entry_point=entry_point, **{k: s[k] for k in ("calls", "errors", "symbols", "bytes_converted", "bytes_pinned", "seconds")},
+                            histogram=dict(zip(bounds, cumulative))))
+        return json.dumps(out, indent=1)
+    if format != "prometheus":
+        raise ValueError(f"format must be 'prometheus' or 'json', got {format!r}")
+    lines = []
+    counters = (("calls", "libsais_calls_total", "Wrapper calls."),
+                ("errors", "libsais_errors_total", "Wrapper calls with a negative or missing return code."),
+                ("symbols", "libsais_symbols_total", "Symbols passed to the C functions."),
+                ("bytes_converted", "libsais_converted_bytes_total", "Bytes converted between Python lists and arrays."),
+                ("bytes_pinned", "libsais_pinned_bytes_total", "Bytes of the buffers passed to the C functions."))
+    for key, metric, text in counters:
+        lines += [f"# HELP {metric} {text}", f"# TYPE {metric} counter"]
+        lines += [f"{metric}{_prometheus_labels(*labels)} {s[key]}" for labels, s in series]
+    lines += ["# HELP libsais_phase_seconds_total Seconds spent in each phase of the wrapper calls.", "# TYPE libsais_phase_seconds_total counter"]
+    for labels, s in series:
+        lines += [f"libsais_phase_seconds_total{_prometheus_labels(*labels, phase=phase)} {s['seconds'][phase]!r}" for phase in ("input", "c", "output")]
+    lines += ["# HELP libsais_call_seconds Wrapper call times.", "# TYPE libsais_call_seconds histogram"]
+    for labels, s in series:
+        count = 0
+        for bound, c in zip(bounds, s["buckets"]):
+            count += c
+            lines.append(f"libsais_call_seconds_bucket{_prometheus_labels(*labels, le=bound)} {count}")
+        lines.append(f"libsais_call_seconds_sum{_prometheus_labels(*labels)} {s['seconds']['total']!r}")
+        lines.append(f"libsais_call_seconds_count{_prometheus_labels(*labels)} {s['calls']}")
+    return "\n".join(lines) + "\n"
+
+def _call(name, threads, args, n=0):
+    """Call the C function name, or its _omp variant if _USE_OMP is True and threads > 1. threads=0 (or None) picks the threads for n symbols with tuned_settings."""
+    if not threads:
+        threads = tuned_settings(_tune_key(name), n)[0]
+    if _fast is not None:
+        threads = threads if _USE_OMP and threads > 1 and _fast.OPENMP[name] else 1
+        return _invoke(name + "_omp" if threads > 1 else name, threads, getattr(_fast, name), (threads,) + args, n)
+    if _USE_OMP and threads > 1:
+        return _invoke(name + "_omp", threads, getattr(libsais, name + "_omp"), args + (threads,), n)
+    return _invoke(name, 1, getattr(libsais, name), args, n)
+
+def _dispatch(name, width, threads, args, n=0):
+    """Call libsais<name> or libsais64<name> depending on width, see _call."""
+    return _call(("libsais64" if width == 64 else "libsais") + name, threads, args, n)
+
+def _sa(T, A, n, fs, freq, threads, width):
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, c_uint8)
+    fs, extra = _free_space("sa", n, fs, A, width)
+    A, A_list = _output(A, idx, n + fs)
+    freq, freq_list = (None, False) if freq is None else _output(freq, idx, 256)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        A_ptr = pin(A, idx, n + fs, "A", writable=True)
+        freq_ptr = pin(freq, idx, 256, "freq", writable=True)
+        result = _dispatch("", width, threads, (T_ptr, A_ptr, n, fs, freq_ptr), n)
+
+    if extra:
+        del A[n:]
+
+    return result, _result(A, A_list), _result(freq, freq_list)
+
+def _bwt(T, U, A, n, fs, freq, threads, width):
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, c_uint8)
+    U, U_list = _output(U, c_uint8, n)
+    fs, extra = _free_space("bwt", n, fs, A, width)
+    A, A_list = _output(A, idx, n + fs)
+    freq, freq_list = (None, False) if freq is None else _output(freq, idx, 256)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        U_ptr = pin(U, c_uint8, n, "U", writable=True)
+        A_ptr = pin(A, idx, n + fs, "A", writable=True)
+        freq_ptr = pin(freq, idx, 256, "freq", writable=True)
+        result = _dispatch("_bwt", width, threads, (T_ptr, U_ptr, A_ptr, n, fs, freq_ptr), n)
+
+    if extra:
+        del A[n:]
+
+    return result, _result(U, U_list), _result(A, A_list), _result(freq, freq_list)
+
+def _bwt_aux(T, U, A, n, r, I, fs, freq, threads, width):
+    idx = _INDEX_CTYPES[width]
+    m = (n - 1) // r + 1 if n > 0 else 0
+    T, _ = _as_buffer(T, c_uint8)
+    U, U_list = _output(U, c_uint8, n)
+    fs, extra = _free_space("bwt_aux", n, fs, A, width)
+    A, A_list = _output(A, idx, n + fs)
+    I, I_list = _output(I, idx, m)
+    freq, freq_list = (None, False) if freq is None else _output(freq, idx, 256)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        U_ptr = pin(U, c_uint8, n, "U", writable=True)
+        A_ptr = pin(A, idx, n + fs, "A", writable=True)
+        I_ptr = pin(I, idx, m, "I", writable=True)
+        freq_ptr = pin(freq, idx, 256, "freq", writable=True)
+        result = _dispatch("_bwt_aux", width, threads, (T_ptr, U_ptr, A_ptr, n, fs, freq_ptr, r, I_ptr), n)
+
+    if extra:
+        del A[n:]
 
+    return result, _result(U, U_list), _result(A, A_list), _result(I, I_list), _result(freq, freq_list)
+
+def _unbwt(T, U, A, n, i, freq, threads, width):
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, c_uint8)
+    U, U_list = _output(U, c_uint8, n)
+    A, _ = _output(A, idx, n + 1)
+    freq, freq_list = _as_buffer(freq, idx)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        U_ptr = pin(U, c_uint8, n, "U", writable=True)
+        A_ptr = pin(A, idx, n + 1, "A", writable=True)
+        freq_ptr = pin(freq, idx, 256, "freq")
+        result = _dispatch("_unbwt", width, threads, (T_ptr, U_ptr, A_ptr, n, freq_ptr, i), n)
+
+    return result, _result(U, U_list), _result(freq, freq_list)
+
+def _unbwt_aux(T, U, A, n, r, I, freq, threads, width):
+    idx = _INDEX_CTYPES[width]
+    m = (n - 1) // r + 1 if n > 0 else 0
+    T, _ = _as_buffer(T, c_uint8)
+    U, U_list = _output(U, c_uint8, n)
+    A, _ = _output(A, idx, n + 1)
+    I, _ = _as_buffer(I, idx)
+    freq, freq_list = _as_buffer(freq, idx)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        U_ptr = pin(U, c_uint8, n, "U", writable=True)
+        A_ptr = pin(A, idx, n + 1, "A", writable=True)
+        I_ptr = pin(I, idx, m, "I")
+        freq_ptr = pin(freq, idx, 256, "freq")
+        result = _dispatch("_unbwt_aux", width, threads, (T_ptr, U_ptr, A_ptr, n, freq_ptr, r, I_ptr), n)
+
+    return result, _result(U, U_list), _result(freq, freq_list)
+
+def _plcp(T, A, PLCP, n, threads, width):
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, c_uint8)
+    A, _ = _as_buffer(A, idx)
+    PLCP, PLCP_list = _output(PLCP, idx, n)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint8, n, "T")
+        A_ptr = pin(A, idx, n, "A")
+        PLCP_ptr = pin(PLCP, idx, n, "PLCP", writable=True)
+        result = _dispatch("_plcp", width, threads, (T_ptr, A_ptr, PLCP_ptr, n), n)
+
+    return result, _result(PLCP, PLCP_list)
+
+def _lcp(PLCP, A, LCP, n, threads, width):
+    idx = _INDEX_CTYPES[width]
+    PLCP, _ = _as_buffer(PLCP, idx)
+    A, _ = _as_buffer(A, idx)
+    LCP, LCP_list = _output(LCP, idx, n)
+
+    with _Pins() as pin:
+        PLCP_ptr = pin(PLCP, idx, n, "PLCP")
+        A_ptr = pin(A, idx, n, "A")
+        LCP_ptr = pin(LCP, idx, n, "LCP", writable=True)
+        result = _dispatch("_lcp", width, threads, (PLCP_ptr, A_ptr, LCP_ptr, n), n)
+
+    return result, _result(LCP, LCP_list)
+
+@_instrumented
 def libsais64(T, A, n, fs=0, freq=None, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64 function is a Python wrapper for the libsais64 and libsais64_omp C functions. 
         It computes the suffix array A of a given input string T of length n, with an optional fs extra allocated space for the suffix array. 
         It also supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        T, A and freq may be Python lists or buffer-protocol objects (bytes, bytearray, memoryview, array.array, mmap, NumPy arrays).
+        Buffers are passed to the C library without copying and are filled in place.
 
     Arguments:
-        T (list of uint8): The input string, represented as a list of 8-bit unsigned integers.
-        A (list of int64): The initial suffix array, represented as a list of 64-bit signed integers. The length of this list must be n + fs.
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        A (list of int64, buffer or None): The output suffix array. A buffer must hold at least n + fs 64-bit signed integers and is filled in place. If None or a list, a new array is allocated.
         n (int64): The length of the input string T.
         fs (int64, optional, default=0): The extra allocated space for the suffix array. The suffix array will have a length of n + fs.
-        freq (list of int64, optional, default=None): A list of 64-bit signed integers of length 256 to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
+        freq (list of int64 or buffer, optional, default=None): A list or writable buffer of 256 64-bit signed integers to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
         threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization. 
         The function will use the libsais64_omp function if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64 function.
         
     Returns:
         result (int): The return value from the underlying libsais64 or libsais64_omp C function. A value of 0 indicates success.
-        A (list of int64): The computed suffix array, represented as a list of 64-bit signed integers. The length of this list will be n + fs.
-        freq (list of int64 or None): A list of 64-bit signed integers of length 256 with the frequency of each character in the input string T, or None if the freq argument was None.
+        A (list of int64 or buffer): The computed suffix array of length n + fs. A list if A was a list, the given buffer if A was a buffer, or a new array.array('q') if A was None.
+        freq (list of int64, buffer or None): The frequency of each character in the input string T, in the same form as the freq argument, or None if the freq argument was None.
     """
-    
-    # Convert Python types to ctypes types
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    A_ctypes = (ctypes.c_int64 * (n + fs))(*A)
-    freq_ctypes = None if freq is None else (ctypes.c_int64 * 256)(*freq)
-    
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_omp(T_ctypes, A_ctypes, n, fs, freq_ctypes, threads)
-    else:
-        result = libsais.libsais64(T_ctypes, A_ctypes, n, fs, freq_ctypes)
-
-    # Convert the ctypes arrays back to Python lists
-    A = [ctypes.c_int64(a).value for a in A_ctypes]
-    freq = None if freq is None else list(freq_ctypes)
-
-    return result, A, freq
+    return _sa(T, A, n, fs, freq, threads, 64)
 
+@_instrumented
 def libsais64_bwt(T, U, A, n, fs=0, freq=None, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64_bwt function is a Python wrapper for the libsais64_bwt and libsais64_bwt_omp C functions. 
-        It computes the Burrows-Wheeler Transform (BWT) U of a given input string T of length n and the corresponding suffix array A, with an optional fs extra allocated space for the suffix array. 
+        It computes the Burrows-Wheeler Transform (BWT) U of a given input string T of length n, using A as temporary space with an optional fs extra allocated space. 
         It also supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        T, U, A and freq may be Python lists or buffer-protocol objects; buffers are passed without copying and filled in place. U may be the same buffer as T.
 
     Arguments:
-        T (list of uint8): The input string, represented as a list of 8-bit unsigned integers.
-        U (list of uint8): The initial BWT, represented as a list of 8-bit unsigned integers. The length of this list must be n.
-        A (list of int64): The initial suffix array, represented as a list of 64-bit signed integers. The length of this list must be n + fs.
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        U (list of uint8, buffer or None): The output BWT. A buffer must hold at least n bytes and is filled in place. If None or a list, a new array is allocated.
+        A (list of int64, buffer or None): The temporary array, holding at least n + fs 64-bit signed integers. If None or a list, a new array is allocated.
         n (int64): The length of the input string T.
-        fs (int64, optional, default=0): The extra allocated space for the suffix array. The suffix array will have a length of n + fs.
-        freq (list of int64, optional, default=None): A list of 64-bit signed integers of length 256 to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
+        fs (int64, optional, default=0): The extra allocated space for the temporary array. The temporary array will have a length of n + fs.
+        freq (list of int64 or buffer, optional, default=None): A list or writable buffer of 256 64-bit signed integers to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
         threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization. 
         The function will use the libsais64_bwt_omp function if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_bwt function.
     
     Returns:
-        result (int): The return value from the underlying libsais64_bwt or libsais64_bwt_omp C function. A value of 0 indicates success.
-        U (list of uint8): The computed BWT, represented as a list of 8-bit unsigned integers. The length of this list will be n.
-        A (list of int64): The computed suffix array, represented as a list of 64-bit signed integers. The length of this list will be n + fs.
-        freq (list of int64 or None): A list of 64-bit signed integers of length 256 with the frequency of each character in the input string T, or None if the freq argument was None.
+        result (int): The return value from the underlying libsais64_bwt or libsais64_bwt_omp C function: the primary index on success, a negative value on error.
+        U (list of uint8 or buffer): The computed BWT of length n, in the same form as the U argument.
+        A (list of int64 or buffer): The temporary array of length n + fs, in the same form as the A argument.
+        freq (list of int64, buffer or None): The frequency of each character in the input string T, in the same form as the freq argument, or None if the freq argument was None.
     """
-    
-    # Convert Python types to ctypes types
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    U_ctypes = (ctypes.c_uint8 * n)(*U)
-    A_ctypes = (ctypes.c_int64 * (n + fs))(*A)
-    freq_ctypes = None if freq is None else (ctypes.c_int64 * 256)(*freq)
- 
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_bwt_omp(T_ctypes, U_ctypes, A_ctypes, n, fs, freq_ctypes, threads)
-    else:
-        result = libsais.libsais64_bwt(T_ctypes, U_ctypes, A_ctypes, n, fs, freq_ctypes)
-
-    # Convert the ctypes arrays back to Python lists
-    U = list(U_ctypes)
-    A = [ctypes.c_int64(a).value for a in A_ctypes]
-    freq = None if freq is None else list(freq_ctypes)
+    return _bwt(T, U, A, n, fs, freq, threads, 64)
 
-    return result, U, A, freq
-    
-def libsais64_bwt_aux(T, U, A, n, fs=0, freq=None, threads=_DEFAULT_THREADS):
+@_instrumented
+def libsais64_bwt_aux(T, U, A, n, r, I, fs=0, freq=None, threads=_DEFAULT_THREADS):
     """
     Description:
-        The libsais64_bwt_aux function is a Python wrapper for the libsais64_bwt_aux and libsais64_bwt_aux_omp C functions. It computes the Burrows-Wheeler Transform (BWT) U of a given input string T of length n and the corresponding auxiliary array A, with an optional fs extra allocated space for the auxiliary array. It also supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        The libsais64_bwt_aux function is a Python wrapper for the libsais64_bwt_aux and libsais64_bwt_aux_omp C functions. 
+        It computes the Burrows-Wheeler Transform (BWT) U of a given input string T of length n together with the auxiliary indexes I sampled every r positions, using A as temporary space with an optional fs extra allocated space. 
+        It also supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        T, U, A, I and freq may be Python lists or buffer-protocol objects; buffers are passed without copying and filled in place.
 
     Arguments:
-        T (list of uint8): The input string, represented as a list of 8-bit unsigned integers.
-        U (list of uint8): The initial BWT, represented as a list of 8-bit unsigned integers. The length of this list must be n.
-        A (list of int64): The initial auxiliary array, represented as a list of 64-bit signed integers. The length of this list must be n + fs.
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        U (list of uint8, buffer or None): The output BWT. A buffer must hold at least n bytes and is filled in place. If None or a list, a new array is allocated.
+        A (list of int64, buffer or None): The temporary array, holding at least n + fs 64-bit signed integers. If None or a list, a new array is allocated.
         n (int64): The length of the input string T.
-        fs (int64, optional, default=0): The extra allocated space for the auxiliary array. The auxiliary array will have a length of n + fs.
-        freq (list of int64, optional, default=None): A list of 64-bit signed integers of length 256 to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
+        r (int64): The sampling rate for auxiliary indexes (must be a power of 2).
+        I (list of int64, buffer or None): The output auxiliary indexes, holding at least (n - 1) // r + 1 64-bit signed integers. If None or a list, a new array is allocated.
+        fs (int64, optional, default=0): The extra allocated space for the temporary array. The temporary array will have a length of n + fs.
+        freq (list of int64 or buffer, optional, default=None): A list or writable buffer of 256 64-bit signed integers to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
         threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization. 
         The function will use the libsais64_bwt_aux_omp function if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_bwt_aux function.
         
     Returns:
         result (int): The return value from the underlying libsais64_bwt_aux or libsais64_bwt_aux_omp C function. A value of 0 indicates success.
-        U (list of uint8): The computed BWT, represented as a list of 8-bit unsigned integers. The length of this list will be n.
-        A (list of int64): The computed auxiliary array, represented as a list of 64-bit signed integers. The length of this list will be n + fs.
-        freq (list of int64 or None): A list of 64-bit signed integers of length 256 with the frequency of each character in the input string T, or None if the freq argument was None.
+        U (list of uint8 or buffer): The computed BWT of length n, in the same form as the U argument.
+        A (list of int64 or buffer): The temporary array of length n + fs, in the same form as the A argument.
+        I (list of int64 or buffer): The computed auxiliary indexes, in the same form as the I argument. I[0] is the primary index.
+        freq (list of int64, buffer or None): The frequency of each character in the input string T, in the same form as the freq argument, or None if the freq argument was None.
     """
-    
-    # Convert Python types to ctypes types
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    U_ctypes = (ctypes.c_uint8 * n)(*U)
-    A_ctypes = (ctypes.c_int64 * (n + fs))(*A)
-    freq_ctypes = None if freq is None else (ctypes.c_int64 * 256)(*freq)
-    
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_bwt_aux_omp(T_ctypes, U_ctypes, A_ctypes, n, fs, freq_ctypes, threads)
-    else:
-        result = libsais.libsais64_bwt_aux(T_ctypes, U_ctypes, A_ctypes, n, fs, freq_ctypes)
+    return _bwt_aux(T, U, A, n, r, I, fs, freq, threads, 64)
 
-    # Convert the ctypes arrays back to Python lists
-    U = list(U_ctypes)
-    A = [ctypes.c_int64(a).value for a in A_ctypes]
-    freq = None if freq is None else list(freq_ctypes)
-
-    return result, U, A, freq
-    
-def libsais64_unbwt(T, U, A, n, fs=0, freq=None, threads=_DEFAULT_THREADS):
+@_instrumented
+def libsais64_unbwt(T, U, A, n, i, freq=None, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64_unbwt function is a Python wrapper for the libsais64_unbwt and libsais64_unbwt_omp C functions. 
-        It computes the inverse Burrows-Wheeler Transform (iBWT) U of a given input string T of length n and the corresponding auxiliary array A, with a specified fs extra allocated space for the auxiliary array. 
-        It also supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        It reconstructs the original string U of length n from its Burrows-Wheeler Transform T and the primary index i, using A as temporary space. 
+        It optionally takes the character frequencies of T and allows for OpenMP parallelization based on the specified number of threads.
+        T, U, A and freq may be Python lists or buffer-protocol objects; buffers are passed without copying and U is filled in place. U may be the same buffer as T.
 
     Arguments:
-        T (list of int8): The input string, represented as a list of 64-bit signed integers.
-        U (list of int8): The initial iBWT, represented as a list of 64-bit signed integers. The length of this list must be n.
-        A (list of int64): The initial auxiliary array, represented as a list of 64-bit signed integers. The length of this list must be n + fs.
-        n (int64): The length of the input string T.
-        fs (int64, optional, default=0): The extra allocated space for the auxiliary array. The auxiliary array will have a length of n + fs.
-        freq (list of int64, optional, default=None): A list of 64-bit signed integers of length 256 to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
+        T (list of uint8 or buffer): The BWT string, represented as a list or buffer of 8-bit unsigned integers.
+        U (list of uint8, buffer or None): The output string. A buffer must hold at least n bytes and is filled in place. If None or a list, a new array is allocated.
+        A (list of int64, buffer or None): The temporary array, holding at least n + 1 64-bit signed integers. If None or a list, a new array is allocated.
+        n (int64): The length of the BWT string T.
+        i (int64): The primary index returned by libsais64_bwt.
+        freq (list of int64 or buffer, optional, default=None): The 256 character frequencies of T as computed by libsais64_bwt, or None to have them counted again.
         threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization. 
         The function will use the libsais64_unbwt_omp function if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_unbwt function.
         
     Returns:
         result (int): The return value from the underlying libsais64_unbwt or libsais64_unbwt_omp C function. A value of 0 indicates success.
-        U (list of int64): The computed iBWT, represented as a list of 64-bit signed integers. The length of this list will be n.
-        freq (list of int64 or None): A list of 64-bit signed integers of length 256 with the frequency of each character in the input string T, or None if the freq argument was None.
+        U (list of uint8 or buffer): The reconstructed string of length n, in the same form as the U argument.
+        freq (list of int64, buffer or None): The freq argument, unchanged.
     """
-    
-    # Convert Python lists to ctypes arrays
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    U_ctypes = (ctypes.c_uint8 * n)(*U)
-    A_ctypes = (ctypes.c_int64 * (n + fs))(*A)
-    freq_ctypes = None if freq is None else (ctypes.c_int64 * 256)(*freq)
-
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_unbwt_omp(T_ctypes, U_ctypes, A_ctypes, n, freq_ctypes, fs, threads)
-    else:
-        result = libsais.libsais64_unbwt(T_ctypes, U_ctypes, A_ctypes, n, freq_ctypes, fs)
-
-
-    # Convert the ctypes arrays back to Python lists
-    T = list(T_ctypes)
-    freq = None if freq is None else list(freq_ctypes)
-
-    return result, T, freq
+    return _unbwt(T, U, A, n, i, freq, threads, 64)
 
+@_instrumented
 def libsais64_unbwt_aux(T, U, A, n, r, I, fs=0, freq=None, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64_unbwt_aux function is a Python wrapper for the libsais64_unbwt_aux and libsais64_unbwt_aux_omp C functions. 
-        It computes the inverse Burrows-Wheeler Transform (iBWT) U of a given input string T of length n and the corresponding auxiliary array A, with a specified r sampling rate for auxiliary indexes. 
-        This function also reconstructs the input string T from the computed iBWT U. It supports frequency counting of the input characters and allows for OpenMP parallelization based on the specified number of threads.
+        It reconstructs the original string U of length n from its Burrows-Wheeler Transform T and the auxiliary indexes I sampled every r positions, using A as temporary space. 
+        It optionally takes the character frequencies of T and allows for OpenMP parallelization based on the specified number of threads.
+        T, U, A, I and freq may be Python lists or buffer-protocol objects; buffers are passed without copying and U is filled in place.
 
     Arguments:
-        T (list of int8): The input string, represented as a list of 8-bit unsigned integers.
-        U (list of int8): The initial iBWT, represented as a list of 8-bit unsigned integers. The length of this list must be n.
-        A (list of int64): The initial auxiliary array, represented as a list of 64-bit signed integers. The length of this list must be n + 1.
-        n (int64): The length of the input string T.
+        T (list of uint8 or buffer): The BWT string, represented as a list or buffer of 8-bit unsigned integers.
+        U (list of uint8, buffer or None): The output string. A buffer must hold at least n bytes and is filled in place. If None or a list, a new array is allocated.
+        A (list of int64, buffer or None): The temporary array, holding at least n + 1 64-bit signed integers. If None or a list, a new array is allocated.
+        n (int64): The length of the BWT string T.
         r (int64): The sampling rate for auxiliary indexes (must be a power of 2).
-        I (list of int64): The input auxiliary indexes, represented as a list of 64-bit signed integers. The length of this list must be (n - 1) // r.
-        fs (int64, optional, default=0): The extra allocated space for the auxiliary array. The auxiliary array will have a length of n + fs.
-        freq (list of int64, optional, default=None): A list of 64-bit signed integers of length 256 to store the frequency of each character in the input string T. If None, the function will not compute the frequency.
+        I (list of int64 or buffer): The auxiliary indexes returned by libsais64_bwt_aux, holding (n - 1) // r + 1 64-bit signed integers.
+        fs (int64, optional, default=0): Ignored, kept for compatibility with earlier versions of this wrapper.
+        freq (list of int64 or buffer, optional, default=None): The 256 character frequencies of T as computed by libsais64_bwt_aux, or None to have them counted again.
         threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization. 
         The function will use the libsais64_unbwt_aux_omp function if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_unbwt_aux function.
 
     Returns:
         result (int): The return value from the underlying libsais64_unbwt_aux or libsais64_unbwt_aux_omp C function. A value of 0 indicates success.
-        U (list of int8): The computed iBWT, represented as a list of 8-bit unsigned integers. The length of this list will be n.
-        freq (list of int64 or None): A list of 64-bit signed integers of length 256 with the frequency of each character in the input string T, or None if the freq argument was None.
+        U (list of uint8 or buffer): The reconstructed string of length n, in the same form as the U argument.
+        freq (list of int64, buffer or None): The freq argument, unchanged.
     """
-    # Convert Python lists to ctypes arrays
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    U_ctypes = (ctypes.c_uint8 * n)(*U)
-    A_ctypes = (ctypes.c_int64 * (n + fs))(*A)
-    freq_ctypes = None if freq is None else (ctypes.c_int64 * 256)(*freq)
-    I_ctypes = (ctypes.c_int64 * len(I))(*I)
-
-      # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_unbwt_aux_omp(T_ctypes, U_ctypes, A_ctypes, n, freq_ctypes, r, I_ctypes, threads)
-    else:
-        result = libsais.libsais64_unbwt_aux(T_ctypes, U_ctypes, A_ctypes, n, freq_ctypes, r, I_ctypes)
-
-    # Convert the ctypes arrays back to Python lists
-    T = list(T_ctypes)
-    freq = None if freq is None else list(freq_ctypes)
-
-    return result, T, freq
+    return _unbwt_aux(T, U, A, n, r, I, freq, threads, 64)
 
+@_instrumented
 def libsais64_plcp(T, A, LCP, n, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64_plcp function is a Python wrapper for the libsais64_plcp and libsais64_plcp_omp C functions. 
         It computes the permuted longest common prefix (PLCP) array LCP of a given input string T of length n and the corresponding suffix array A. 
         This function allows for OpenMP parallelization based on the specified number of threads.
+        T, A and LCP may be Python lists or buffer-protocol objects; buffers are passed without copying and LCP is filled in place.
         
     Arguments:
-        T (list of uint8): The input string, represented as a list of 64-bit signed integers.
-        A (list of int64): The suffix array of the input string T, represented as a list of 64-bit signed integers. The length of this list must be n.
-        LCP (list of int64): The initial PLCP array, represented as a list of 64-bit signed integers. The length of this list must be n.
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        A (list of int64 or buffer): The suffix array of the input string T, holding at least n 64-bit signed integers.
+        LCP (list of int64, buffer or None): The output PLCP array. A buffer must hold at least n 64-bit signed integers and is filled in place. If None or a list, a new array is allocated.
         n (int64): The length of the input string T.
         threads (int, optional): The number of threads to use for OpenMP parallelization. Defaults to _DEFAULT_THREADS.
         The function will use the libsais64_plcp_omp if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_plcp function.
         
     Returns:
         result (int): The return value from the underlying libsais64_plcp or libsais64_plcp_omp C function. A value of 0 indicates success.
-        LCP (list of int64): The computed PLCP array, represented as a list of 64-bit signed integers. The length of this list will be n.
+        LCP (list of int64 or buffer): The computed PLCP array of length n, in the same form as the LCP argument.
     """
-    # Convert Python lists to ctypes arrays
-    T_ctypes = (ctypes.c_uint8 * n)(*T)
-    A_ctypes = (ctypes.c_int64 * n)(*A)
-    LCP_ctypes = (ctypes.c_int64 * n)(*LCP)
-
-    # Print ctypes arrays
-    #print("T_ctypes:", [T_ctypes[i] for i in range(n)])
-    #print("A_ctypes:", [A_ctypes[i] for i in range(n)])
-    #print("LCP_ctypes:", [LCP_ctypes[i] for i in range(n)])
+    return _plcp(T, A, LCP, n, threads, 64)
 
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_plcp_omp(T_ctypes, A_ctypes, LCP_ctypes, n, threads)
-    else:
-        result = libsais.libsais64_plcp(T_ctypes, A_ctypes, LCP_ctypes, n)
-
-    # Convert the ctypes arrays back to Python lists
-    LCP = list(LCP_ctypes)
-
-    return result, LCP
-
-def libsais64_lcp(T, A, LCP, n, threads=_DEFAULT_THREADS):
+@_instrumented
+def libsais64_lcp(PLCP, A, LCP, n, threads=_DEFAULT_THREADS):
     """
     Description:
         The libsais64_lcp function is a Python wrapper for the libsais64_lcp and libsais64_lcp_omp C functions. 
-        It computes the longest common prefix (LCP) array LCP of a given input string T of length n and the corresponding suffix array A. 
+        It computes the longest common prefix (LCP) array LCP from the permuted LCP array PLCP (see libsais64_plcp) and the corresponding suffix array A of length n. 
         This function allows for OpenMP parallelization based on the specified number of threads.
+        PLCP, A and LCP may be Python lists or buffer-protocol objects; buffers are passed without copying and LCP is filled in place. LCP may be the same buffer as A.
 
     Arguments:
-        T (list of int64): The input string, represented as a list of 64-bit signed integers.
-        A (list of int64): The suffix array of the input string T, represented as a list of 64-bit signed integers. The length of this list must be n.
-        LCP (list of int64): The initial LCP array, represented as a list of 64-bit signed integers. The length of this list must be n.
-        n (int64): The length of the input string T.
+        PLCP (list of int64 or buffer): The permuted LCP array, holding at least n 64-bit signed integers.
+        A (list of int64 or buffer): The suffix array, holding at least n 64-bit signed integers.
+        LCP (list of int64, buffer or None): The output LCP array. A buffer must hold at least n 64-bit signed integers and is filled in place. If None or a list, a new array is allocated.
+        n (int64): The length of the input string.
         threads (int, optional): The number of threads to use for OpenMP parallelization. Defaults to _DEFAULT_THREADS. 
         The function will use the libsais64_lcp_omp if _USE_OMP is True and threads > 1. Otherwise, it will use the single-threaded libsais64_lcp function.
     Returns:
         result (int): The return value from the underlying libsais64_lcp or libsais64_lcp_omp C function. A value of 0 indicates success.
-        LCP (list of int64): The computed LCP array, represented as a list of 64-bit signed integers. The length of this list will be n.
+        LCP (list of int64 or buffer): The computed LCP array of length n, in the same form as the LCP argument.
 
     """
-    # Convert Python lists to ctypes arrays
-    T_ctypes = (ctypes.c_int64 * n)(*T)
-    A_ctypes = (ctypes.c_int64 * n)(*A)
-    LCP_ctypes = (ctypes.c_int64 * n)(*LCP)
+    return _lcp(PLCP, A, LCP, n, threads, 64)
 
-    # Print ctypes arrays
-    #print("T_ctypes:", [T_ctypes[i] for i in range(n)])
-    #print("A_ctypes:", [A_ctypes[i] for i in range(n)])
-    #print("LCP_ctypes:", [LCP_ctypes[i] for i in range(n)])
+@_instrumented
+def suffix_array(T, A=None, n=None, fs=0, freq=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The suffix_array function computes the suffix array A of a given input string T using the libsais or libsais64 C functions, chosen according to the index_width policy.
+        With 32-bit indexes the suffix array takes half the memory and bandwidth of the 64-bit one. Arguments and results are handled as in libsais64.
 
-    # Call the appropriate function from the C library based on _USE_OMP and the number of threads
-    if _USE_OMP and threads > 1:
-        result = libsais.libsais64_lcp_omp(T_ctypes, A_ctypes, LCP_ctypes, n, threads)
+    Arguments:
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        A (list, buffer or None, optional, default=None): The output suffix array of at least n + fs 32- or 64-bit signed integers, matching the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T. If None, the length of T is used.
+        fs (int, optional, default=0): The extra allocated space for the suffix array.
+        freq (list or buffer, optional, default=None): A list or writable buffer of 256 signed integers of the chosen index width to store the frequency of each character in T. If None, the function will not compute the frequency.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto" picks the width of the given A or freq buffer, or 32-bit indexes if n + fs < 2^31 and 64-bit indexes otherwise. "32" or "64" force a width.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        A (list or buffer): The computed suffix array of length n + fs. A list if A was a list, the given buffer if A was a buffer, or a new array.array ('i' or 'q') if A was None.
+        freq (list, buffer or None): The frequency of each character in T, in the same form as the freq argument, or None if the freq argument was None.
+    """
+    n = _length(T) if n is None else n
+    return _sa(T, A, n, fs, freq, threads, _index_width(index_width, n + fs, A, freq))
+
+@_instrumented
+def bwt(T, U=None, A=None, n=None, fs=0, freq=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The bwt function computes the Burrows-Wheeler Transform U of a given input string T using the libsais_bwt or libsais64_bwt C functions, chosen according to the index_width policy.
+        Arguments and results are handled as in libsais64_bwt.
+
+    Arguments:
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        U (list, buffer or None, optional, default=None): The output BWT of at least n bytes. If None or a list, a new array is allocated.
+        A (list, buffer or None, optional, default=None): The temporary array of at least n + fs integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T. If None, the length of T is used.
+        fs (int, optional, default=0): The extra allocated space for the temporary array.
+        freq (list or buffer, optional, default=None): A list or writable buffer of 256 integers of the chosen index width to store the frequency of each character in T. If None, the function will not compute the frequency.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The primary index on success, a negative value on error.
+        U (list or buffer): The computed BWT of length n.
+        A (list or buffer): The temporary array of length n + fs.
+        freq (list, buffer or None): The frequency of each character in T, or None if the freq argument was None.
+    """
+    n = _length(T) if n is None else n
+    return _bwt(T, U, A, n, fs, freq, threads, _index_width(index_width, n + fs, A, freq))
+
+@_instrumented
+def bwt_aux(T, r, U=None, A=None, I=None, n=None, fs=0, freq=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The bwt_aux function computes the Burrows-Wheeler Transform U of a given input string T together with the auxiliary indexes I sampled every r positions,
+        using the libsais_bwt_aux or libsais64_bwt_aux C functions, chosen according to the index_width policy. Arguments and results are handled as in libsais64_bwt_aux.
+
+    Arguments:
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        r (int): The sampling rate for auxiliary indexes (must be a power of 2).
+        U (list, buffer or None, optional, default=None): The output BWT of at least n bytes. If None or a list, a new array is allocated.
+        A (list, buffer or None, optional, default=None): The temporary array of at least n + fs integers of the chosen index width. If None or a list, a new array is allocated.
+        I (list, buffer or None, optional, default=None): The output auxiliary indexes, (n - 1) // r + 1 integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T. If None, the length of T is used.
+        fs (int, optional, default=0): The extra allocated space for the temporary array.
+        freq (list or buffer, optional, default=None): A list or writable buffer of 256 integers of the chosen index width to store the frequency of each character in T. If None, the function will not compute the frequency.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        U (list or buffer): The computed BWT of length n.
+        A (list or buffer): The temporary array of length n + fs.
+        I (list or buffer): The computed auxiliary indexes. I[0] is the primary index.
+        freq (list, buffer or None): The frequency of each character in T, or None if the freq argument was None.
+    """
+    n = _length(T) if n is None else n
+    return _bwt_aux(T, U, A, n, r, I, fs, freq, threads, _index_width(index_width, n + fs, A, I, freq))
+
+@_instrumented
+def unbwt(T, i, U=None, A=None, n=None, freq=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The unbwt function reconstructs the original string U from its Burrows-Wheeler Transform T and the primary index i,
+        using the libsais_unbwt or libsais64_unbwt C functions, chosen according to the index_width policy. Arguments and results are handled as in libsais64_unbwt.
+
+    Arguments:
+        T (list of uint8 or buffer): The BWT string, represented as a list or buffer of 8-bit unsigned integers.
+        i (int): The primary index returned by bwt.
+        U (list, buffer or None, optional, default=None): The output string of at least n bytes. If None or a list, a new array is allocated.
+        A (list, buffer or None, optional, default=None): The temporary array of at least n + 1 integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the BWT string T. If None, the length of T is used.
+        freq (list or buffer, optional, default=None): The 256 character frequencies of T as computed by bwt, or None to have them counted again.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        U (list or buffer): The reconstructed string of length n.
+        freq (list, buffer or None): The freq argument, unchanged.
+    """
+    n = _length(T) if n is None else n
+    return _unbwt(T, U, A, n, i, freq, threads, _index_width(index_width, n + 1, A, freq))
+
+@_instrumented
+def unbwt_aux(T, r, I, U=None, A=None, n=None, freq=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The unbwt_aux function reconstructs the original string U from its Burrows-Wheeler Transform T and the auxiliary indexes I sampled every r positions,
+        using the libsais_unbwt_aux or libsais64_unbwt_aux C functions, chosen according to the index_width policy. Arguments and results are handled as in libsais64_unbwt_aux.
+
+    Arguments:
+        T (list of uint8 or buffer): The BWT string, represented as a list or buffer of 8-bit unsigned integers.
+        r (int): The sampling rate for auxiliary indexes (must be a power of 2).
+        I (list or buffer): The auxiliary indexes returned by bwt_aux.
+        U (list, buffer or None, optional, default=None): The output string of at least n bytes. If None or a list, a new array is allocated.
+        A (list, buffer or None, optional, default=None): The temporary array of at least n + 1 integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the BWT string T. If None, the length of T is used.
+        freq (list or buffer, optional, default=None): The 256 character frequencies of T as computed by bwt_aux, or None to have them counted again.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array. With "auto" the width of an I buffer takes precedence.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        U (list or buffer): The reconstructed string of length n.
+        freq (list, buffer or None): The freq argument, unchanged.
+    """
+    n = _length(T) if n is None else n
+    return _unbwt_aux(T, U, A, n, r, I, freq, threads, _index_width(index_width, n + 1, I, A, freq))
+
+@_instrumented
+def plcp(T, A, PLCP=None, n=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The plcp function computes the permuted longest common prefix array PLCP of a given input string T and its suffix array A,
+        using the libsais_plcp or libsais64_plcp C functions, chosen according to the index_width policy. Arguments and results are handled as in libsais64_plcp.
+
+    Arguments:
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        A (list or buffer): The suffix array of T. With "auto", the width of an A buffer selects the index width.
+        PLCP (list, buffer or None, optional, default=None): The output PLCP array of at least n integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T. If None, the length of T is used.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        PLCP (list or buffer): The computed PLCP array of length n.
+    """
+    n = _length(T) if n is None else n
+    return _plcp(T, A, PLCP, n, threads, _index_width(index_width, n, A, PLCP))
+
+@_instrumented
+def lcp(PLCP, A, LCP=None, n=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The lcp function computes the longest common prefix array LCP from the permuted LCP array PLCP and the suffix array A,
+        using the libsais_lcp or libsais64_lcp C functions, chosen according to the index_width policy. Arguments and results are handled as in libsais64_lcp.
+
+    Arguments:
+        PLCP (list or buffer): The permuted LCP array computed by plcp.
+        A (list or buffer): The suffix array. With "auto", the width of an A buffer selects the index width.
+        LCP (list, buffer or None, optional, default=None): The output LCP array of at least n integers of the chosen index width. If None or a list, a new array is allocated. May be the same buffer as A.
+        n (int, optional, default=None): The length of the input string. If None, the length of A is used.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        LCP (list or buffer): The computed LCP array of length n.
+    """
+    n = _length(A) if n is None else n
+    return _lcp(PLCP, A, LCP, n, threads, _index_width(index_width, n, A, PLCP, LCP))
+
+def _alphabet_size(T, ctype, n):
+    """Return max(T[:n]) + 1, the smallest k such that every symbol of T lies in [0, k)."""
+    if n == 0:
+        return 1
+    view = memoryview(T)
+    if view.itemsize == 1:
+        view = view.cast(_TYPECODES[ctype])
+    view = view[:n]
+    np = _numpy()
+    return int(np.asarray(view).max() if np is not None else max(view)) + 1
+
+@_instrumented
+def suffix_array16(T, A=None, n=None, fs=0, freq=None, threads=_DEFAULT_THREADS):
+    """
+    Description:
+        The suffix_array16 function is a Python wrapper for the libsais16 and libsais16_omp C functions.
+        It computes the suffix array A of a given string T of 16-bit symbols (e.g. UTF-16 code units or token IDs below 65536), with one suffix per symbol.
+        The suffix array uses 32-bit indexes, so n + fs must be below 2^31. Arguments and results are handled as in libsais64.
+
+    Arguments:
+        T (list of uint16 or buffer): The input string, represented as a list or buffer of 16-bit unsigned integers.
+        A (list of int32, buffer or None, optional, default=None): The output suffix array of at least n + fs 32-bit signed integers. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T in symbols. If None, the length of T is used.
+        fs (int, optional, default=0): The extra allocated space for the suffix array.
+        freq (list of int32 or buffer, optional, default=None): A list or writable buffer of 65536 32-bit signed integers to store the frequency of each symbol in T. If None, the function will not compute the frequency.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+
+    Returns:
+        result (int): The return value from the underlying libsais16 or libsais16_omp C function. A value of 0 indicates success.
+        A (list of int32 or buffer): The computed suffix array of length n + fs.
+        freq (list of int32, buffer or None): The frequency of each symbol in T, or None if the freq argument was None.
+    """
+    n = _length(T) if n is None else n
+    _index_width("32", n + fs)
+    T, _ = _as_buffer(T, c_uint16)
+    A, A_list = _output(A, c_int32, n + fs)
+    freq, freq_list = (None, False) if freq is None else _output(freq, c_int32, 65536)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint16, n, "T")
+        A_ptr = pin(A, c_int32, n + fs, "A", writable=True)
+        freq_ptr = pin(freq, c_int32, 65536, "freq", writable=True)
+        result = _call("libsais16", threads, (T_ptr, A_ptr, n, fs, freq_ptr), n)
+
+    return result, _result(A, A_list), _result(freq, freq_list)
+
+@_instrumented
+def plcp16(T, A, PLCP=None, n=None, threads=_DEFAULT_THREADS):
+    """
+    Description:
+        The plcp16 function is a Python wrapper for the libsais16_plcp and libsais16_plcp_omp C functions.
+        It computes the permuted longest common prefix array PLCP of a string T of 16-bit symbols and its suffix array A, as computed by suffix_array16.
+        The LCP array is then obtained with lcp(PLCP, A).
+
+    Arguments:
+        T (list of uint16 or buffer): The input string, represented as a list or buffer of 16-bit unsigned integers.
+        A (list of int32 or buffer): The suffix array of T.
+        PLCP (list of int32, buffer or None, optional, default=None): The output PLCP array of at least n 32-bit signed integers. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of the input string T in symbols. If None, the length of T is used.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+
+    Returns:
+        result (int): The return value from the underlying libsais16_plcp or libsais16_plcp_omp C function. A value of 0 indicates success.
+        PLCP (list of int32 or buffer): The computed PLCP array of length n.
+    """
+    n = _length(T) if n is None else n
+    _index_width("32", n)
+    T, _ = _as_buffer(T, c_uint16)
+    A, _ = _as_buffer(A, c_int32)
+    PLCP, PLCP_list = _output(PLCP, c_int32, n)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, c_uint16, n, "T")
+        A_ptr = pin(A, c_int32, n, "A")
+        PLCP_ptr = pin(PLCP, c_int32, n, "PLCP", writable=True)
+        result = _call("libsais16_plcp", threads, (T_ptr, A_ptr, PLCP_ptr, n), n)
+
+    return result, _result(PLCP, PLCP_list)
+
+@_instrumented
+def suffix_array_int(T, k=None, A=None, n=None, fs=0, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The suffix_array_int function is a Python wrapper for the libsais_int and libsais_int_omp C functions (and libsais64_long for 64-bit indexes, if the library exports it).
+        It computes the suffix array A of an integer array T over the alphabet [0, k), e.g. token IDs or Unicode code points remapped with compact_alphabet, with one suffix per symbol.
+        The C function uses T as workspace during construction and restores it afterwards, so T must be writable.
+
+    Arguments:
+        T (list or buffer of int32/int64): The input integer array, with integers of the chosen index width. Every value must lie in [0, k).
+        k (int, optional, default=None): The alphabet size. If None, max(T) + 1 is used.
+        A (list, buffer or None, optional, default=None): The output suffix array of at least n + fs integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of T. If None, the length of T is used.
+        fs (int, optional, default=0): The extra allocated space for the suffix array.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array. With "auto" the width of an A or T buffer takes precedence.
+        64-bit indexes require libsais64_long, which libsais exports from version 2.8 on.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        A (list or buffer): The computed suffix array of length n + fs.
+
+    Raises:
+        RuntimeError: If 64-bit indexes are required and the library does not export libsais64_long.
+    """
+    n = _length(T) if n is None else n
+    width = _index_width(index_width, n + fs, A, T)
+    if not _loaded:
+        _load()
+    if width == 64 and not _HAS_LONG:
+        raise RuntimeError(f"64-bit integer alphabet construction requires libsais64_long, which {libname} does not export; use int32 input, e.g. from compact_alphabet")
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, idx)
+    k = _alphabet_size(T, idx, n) if k is None else k
+    A, A_list = _output(A, idx, n + fs)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, idx, n, "T", writable=True)
+        A_ptr = pin(A, idx, n + fs, "A", writable=True)
+        result = _call("libsais64_long" if width == 64 else "libsais_int", threads, (T_ptr, A_ptr, n, k, fs), n)
+
+    return result, _result(A, A_list)
+
+@_instrumented
+def plcp_int(T, A, PLCP=None, n=None, k=None, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The plcp_int function computes the permuted longest common prefix array PLCP of an integer array T and its suffix array A, as computed by suffix_array_int.
+        It uses libsais_plcp_int (or libsais64_plcp_long for 64-bit indexes) if the library exports them. Older libraries only support alphabets of at most 65536 symbols,
+        for which T is narrowed to 16 bits and passed to libsais16_plcp; PLCP only compares symbols for equality, so the result is the same.
+        The LCP array is then obtained with lcp(PLCP, A).
+
+    Arguments:
+        T (list or buffer of int32/int64): The input integer array.
+        A (list or buffer): The suffix array of T. With "auto", the width of an A buffer selects the index width.
+        PLCP (list, buffer or None, optional, default=None): The output PLCP array of at least n integers of the chosen index width. If None or a list, a new array is allocated.
+        n (int, optional, default=None): The length of T. If None, the length of T is used.
+        k (int, optional, default=None): The alphabet size, only needed for the 16-bit fallback. If None, max(T) + 1 is used.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        result (int): The return value from the underlying C function. A value of 0 indicates success.
+        PLCP (list or buffer): The computed PLCP array of length n.
+
+    Raises:
+        RuntimeError: If 64-bit indexes are required and the library does not export libsais64_plcp_long,
+            or if the alphabet has more than 65536 symbols and the library does not export libsais_plcp_int.
+    """
+    n = _length(T) if n is None else n
+    width = _index_width(index_width, n, A, PLCP, T)
+    if not _loaded:
+        _load()
+    if width == 64 and not _HAS_LONG:
+        raise RuntimeError(f"64-bit integer alphabet PLCP requires libsais64_plcp_long, which {libname} does not export")
+    idx = _INDEX_CTYPES[width]
+    T, _ = _as_buffer(T, idx)
+    if width == 32 and not _HAS_PLCP_INT:
+        k = _alphabet_size(T, idx, n) if k is None else k
+        if k > 65536:
+            raise RuntimeError(f"PLCP over more than 65536 symbols requires libsais_plcp_int, which {libname} does not export")
+        view = memoryview(T)
+        view = (view.cast('i') if view.itemsize == 1 else view)[:n]
+        np = _numpy()
+        return plcp16(np.asarray(view, dtype=np.uint16) if np is not None else array.array('H', view), A, PLCP, n, threads)
+    A, _ = _as_buffer(A, idx)
+    PLCP, PLCP_list = _output(PLCP, idx, n)
+
+    with _Pins() as pin:
+        T_ptr = pin(T, idx, n, "T")
+        A_ptr = pin(A, idx, n, "A")
+        PLCP_ptr = pin(PLCP, idx, n, "PLCP", writable=True)
+        result = _call("libsais64_plcp_long" if width == 64 else "libsais_plcp_int", threads, (T_ptr, A_ptr, PLCP_ptr, n), n)
+
+    return result, _result(PLCP, PLCP_list)
+
+def compact_alphabet(T):
+    """
+    Description:
+        The compact_alphabet function remaps the symbols of T (token IDs, Unicode code points, ...) to the dense alphabet [0, k), preserving their order,
+        so that suffix arrays of the result equal suffix arrays of T. The result can be passed to suffix_array_int with the smallest possible k,
+        or to suffix_array16 if k <= 65536. The remapping is done with vectorized NumPy operations: a lookup table when the symbol range is small
+        compared to the length of T, a sort otherwise. Requires NumPy.
+
+    Arguments:
+        T (str, list or buffer of integers): The input symbols. A str is taken as a sequence of Unicode code points.
+
+    Returns:
+        D (numpy.ndarray of int32): The remapped symbols, D[i] in [0, k). int64 if T has 2^31 or more symbols.
+        symbols (numpy.ndarray): The sorted distinct symbols of T, so that symbols[D] == T. The alphabet size k is len(symbols).
+    """
+    np = _numpy()
+    if np is None:
+        raise ImportError("compact_alphabet requires NumPy")
+    if isinstance(T, str):
+        T = np.frombuffer(T.encode("utf-32-le"), dtype="<u4")
+    elif not isinstance(T, (list, tuple, np.ndarray)):
+        T = memoryview(T)
+    T = np.asarray(T).ravel()
+    dtype = np.int32 if T.size <= _INT32_MAX else np.int64
+    if T.size == 0:
+        return np.zeros(0, dtype=dtype), np.zeros(0, dtype=dtype)
+    if T.dtype.kind not in "biu":
+        raise TypeError(f"T must contain integers, got {T.dtype}")
+
+    lo, hi = T.min(), T.max()
+    span = int(hi) - int(lo) + 1
+    if span <= 2 * T.size + 65536:
+        # Lookup table over the symbol range: linear time
+        offsets = np.subtract(T, lo, dtype=np.intp)
+        present = np.zeros(span, dtype=bool)
+        present[offsets] = True
+        symbols = (np.flatnonzero(present) + int(lo)).astype(T.dtype)
+        D = (np.cumsum(present, dtype=dtype) - 1)[offsets]
     else:
-        result = libsais.libsais64_lcp(T_ctypes, A_ctypes, LCP_ctypes, n)
+        symbols, D = np.unique(T, return_inverse=True)
+        D = D.ravel().astype(dtype)
+    return D, symbols
+
+# -----------------------------------------------------------------------------
+# Auto-tuning
+#
+# With threads=0 (the default _DEFAULT_THREADS), every call picks its number
+# of OpenMP threads, and with it the serial or _omp entry point, from a tuning
+# table keyed by function and input size. The table also holds the extra
+# free space fs used when SA and BWT construction allocate their temporary
+# array themselves. Without calibration, small inputs run serially and large
+# ones get one thread per _AUTO_GRAIN symbols, capped at the CPUs this process
+# may actually use (affinity mask, cgroup CPU quota, OMP_NUM_THREADS and
+# OMP_THREAD_LIMIT). calibrate measures the fastest settings on this machine
+# and caches them on disk, where later processes pick them up on first use.
+# -----------------------------------------------------------------------------
 
-    # Convert the ctypes arrays back to Python lists
-    LCP = list(LCP_ctypes)
+# Number of symbols per OpenMP thread when no calibration is available
+_AUTO_GRAIN = 1 << 20
+_TUNE_FUNCTIONS = ("sa", "bwt", "bwt_aux", "unbwt", "unbwt_aux", "plcp", "lcp")
+_TUNE_KEYS = {"": "sa", "int": "sa", "long": "sa", "plcp_int": "plcp", "plcp_long": "plcp"}
+_TUNE_VERSION = 1
 
-    return result, LCP
+_usable_cpus = None
+_tuning = None
+_tuning_lock = threading.Lock()
+
+def _tune_key(name):
+    """Map a C function name (libsais64_bwt_aux, libsais16_plcp, ...) to its tuning table key (bwt_aux, plcp, ...)."""
+    suffix = name.partition("_")[2]
+    return _TUNE_KEYS.get(suffix, suffix)
+
+def _cgroup_quota(directory):
+    """Return the CPU quota of a cgroup v2 or v1 directory in CPUs, or None if unlimited or unreadable."""
+    try:
+        with open(os.path.join(directory, "cpu.max")) as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(directory, "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(directory, "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+        if quota > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+def _cgroup_cpu_limit():
+    """Return the smallest CPU quota of the cgroups of this process and their ancestors, or None."""
+    try:
+        with open("/proc/self/cgroup") as f:
+            paths = {line.split(":", 2)[2] for line in f.read().splitlines() if line.count(":") >= 2}
+    except OSError:
+        return None
+    limits = []
+    for root in ("/sys/fs/cgroup", "/sys/fs/cgroup/cpu", "/sys/fs/cgroup/cpu,cpuacct"):
+        for path in paths:
+            directory = os.path.normpath(root + path)
+            while directory.startswith(root):
+                quota = _cgroup_quota(directory)
+                if quota is not None:
+                    limits.append(quota)
+                if directory == root:
+                    break
+                directory = os.path.dirname(directory)
+    return min(limits) if limits else None
+
+def usable_cpus(refresh=False):
+    """
+    Description:
+        The usable_cpus function returns the number of CPUs this process can keep busy: the CPUs in its affinity mask (sched_getaffinity),
+        limited by the CPU quota of its cgroup (cgroup v2 cpu.max or v1 cpu.cfs_quota_us, rounded up) and by the OMP_NUM_THREADS and
+        OMP_THREAD_LIMIT environment variables. The result is computed once and cached.
+
+    Arguments:
+        refresh (bool, optional, default=False): Recompute the value, e.g. after changing the affinity mask.
+
+    Returns:
+        cpus (int): The number of usable CPUs, at least 1.
+    """
+    global _usable_cpus
+    if _usable_cpus is None or refresh:
+        count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+        quota = _cgroup_cpu_limit()
+        if quota:
+            count = min(count, math.ceil(quota))
+        for var in ("OMP_NUM_THREADS", "OMP_THREAD_LIMIT"):
+            value = os.environ.get(var, "").split(",")[0].strip()
+            if value.isdigit() and int(value) > 0:
+                count = min(count, int(value))
+        _usable_cpus = max(1, count)
+    return _usable_cpus
+
+def omp_available():
+    """Return True if the library exports the _omp entry points (it is compiled with OpenMP) and _USE_OMP is enabled."""
+    if not _loaded:
+        _load()
+    return _USE_OMP
+
+def _tuning_path():
+    """The calibration cache file: LIBSAIS_TUNING, or a file under ~/.cache named after the library, the machine and the usable CPUs."""
+    if os.environ.get("LIBSAIS_TUNING"):
+        return os.environ["LIBSAIS_TUNING"]
+    if not _loaded:
+        _load()
+    # Keyed by the file doing the calls: the compiled binding if it is used, otherwise the shared library
+    library = _fast.__file__ if _fast is not None else libname
+    try:
+        st = os.stat(library)
+        key = f"{os.path.abspath(library)}:{st.st_size}:{st.st_mtime_ns}:{platform.machine()}:{usable_cpus()}:{_USE_OMP}"
+    except (OSError, TypeError):
+        key = f"{library}:{platform.machine()}:{usable_cpus()}:{_USE_OMP}"
+    cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache, "libsais_wrapper", f"tuning-{hashlib.sha1(key.encode()).hexdigest()[:16]}.json")
+
+def _load_tuning():
+    """Return the calibrated tuning table, reading the cache file on first use; {} if there is none."""
+    global _tuning
+    if _tuning is None:
+        with _tuning_lock:
+            if _tuning is None:
+                table = {}
+                try:
+                    with open(_tuning_path()) as f:
+                        data = json.load(f)
+                    if data.get("version") == _TUNE_VERSION:
+                        table = {k: sorted(v) for k, v in data["table"].items()}
+                except (OSError, ValueError, KeyError, TypeError):
+                    pass
+                _tuning = table
+    return _tuning
+
+def tuned_settings(function, n):
+    """
+    Description:
+        The tuned_settings function returns the settings used for a call with threads=0: the calibrated entry for the largest calibrated size
+        not above n (or the smallest one), or otherwise one thread per _AUTO_GRAIN symbols. The number of threads is capped at usable_cpus()
+        and is 1 if OpenMP is not available.
+
+    Arguments:
+        function (str): "sa", "bwt", "bwt_aux", "unbwt", "unbwt_aux", "plcp" or "lcp".
+        n (int): The input size.
+
+    Returns:
+        threads (int): The number of threads; 1 selects the serial entry point.
+        fs (int): The extra free space for an internally allocated temporary array.
+    """
+    table = _load_tuning().get(function)
+    if table:
+        entry = table[0]
+        for e in table:
+            if e[0] <= n:
+                entry = e
+        threads, fs = entry[1], entry[2]
+    else:
+        threads, fs = n // _AUTO_GRAIN, 0
+    return (max(1, min(threads, usable_cpus())) if _USE_OMP else 1), fs
+
+def _free_space(function, n, fs, A, width):
+    """Return (fs, extra): the tuned free space if the caller passed fs=0 and no A, so the array is allocated here and trimmed after the call."""
+    if fs or not (A is None or isinstance(A, (list, tuple))):
+        return fs, 0
+    extra = tuned_settings(function, n)[1]
+    if width == 32:
+        extra = max(0, min(extra, _INT32_MAX - n))
+    return extra, extra
+
+def _calibration_input(n, seed=0):
+    """A reproducible text-like input of n bytes whose second half repeats the first, so that both short and long matches are sorted."""
+    alphabet = b"etaoinshrdlucmfwyp "
+    table = bytes(alphabet[i % len(alphabet)] for i in range(256))
+    first = random.Random(seed).randbytes((n + 1) // 2).translate(table)
+    return (first + first)[:n]
+
+def calibrate(sizes=(1 << 16, 1 << 20, 1 << 23), functions=_TUNE_FUNCTIONS, max_threads=None, fs_candidates=(0, 1 << 12, 1 << 16), repeat=3, save=True):
+    """
+    Description:
+        The calibrate function times every function on reproducible inputs of the given sizes with 1, 2, 4, ... threads up to max_threads,
+        and for SA and BWT construction with every fs candidate, and keeps for each size the fewest threads (and smallest fs) within 5% of
+        the fastest median time. The resulting table is used by all later calls with threads=0 and, if save is True, written to the cache
+        file (LIBSAIS_TUNING or ~/.cache/libsais_wrapper/tuning-*.json) so that other processes start with it.
+
+    Arguments:
+        sizes (iterable of int, optional): The input sizes to time.
+        functions (iterable of str, optional, default=all): The functions to time, see tuned_settings.
+        max_threads (int, optional, default=None): The largest number of threads to try, usable_cpus() if None.
+        fs_candidates (iterable of int, optional, default=(0, 4096, 65536)): The fs values to try for "sa", "bwt" and "bwt_aux".
+        repeat (int, optional, default=3): The number of runs per setting.
+        save (bool, optional, default=True): Whether to write the cache file.
+
+    Returns:
+        table (dict): For every function, a list of [n, threads, fs] entries sorted by n.
+    """
+    global _tuning
+    if not _loaded:
+        _load()
+    max_threads = max_threads or usable_cpus()
+    candidates = sorted({1 << k for k in range(max_threads.bit_length()) if 1 << k <= max_threads} | {max_threads}) if _USE_OMP else [1]
+    table = {function: [] for function in functions}
+    for n in sorted(sizes):
+        T = _calibration_input(n)
+        r = 1 << max(1, (max(n // max_threads, 2)).bit_length() - 1)
+        _, SA, _ = _sa(T, None, n, 0, None, 1, 32)
+        primary, U, _, _ = _bwt(T, None, None, n, 0, None, 1, 32)
+        _, _, _, I, _ = _bwt_aux(T, None, None, n, r, None, 0, None, 1, 32)
+        _, PLCP = _plcp(T, SA, None, n, 1, 32)
+        runs = {
+            "sa": lambda t, fs: _sa(T, None, n, fs, None, t, 32),
+            "bwt": lambda t, fs: _bwt(T, None, None, n, fs, None, t, 32),
+            "bwt_aux": lambda t, fs: _bwt_aux(T, None, None, n, r, None, fs, None, t, 32),
+            "unbwt": lambda t, fs: _unbwt(U, None, None, n, primary, None, t, 32),
+            "unbwt_aux": lambda t, fs: _unbwt_aux(U, None, None, n, r, I, None, t, 32),
+            "plcp": lambda t, fs: _plcp(T, SA, None, n, t, 32),
+            "lcp": lambda t, fs: _lcp(PLCP, SA, None, n, t, 32)
+        }
+        for function in functions:
+            timings = []
+            for fs in (fs_candidates if function in ("sa", "bwt", "bwt_aux") else (0,)):
+                for t in candidates:
+                    samples = []
+                    for _ in range(repeat):
+                        start = time.perf_counter()
+                        runs[function](t, fs)
+                        samples.append(time.perf_counter() - start)
+                    timings.append((sorted(samples)[len(samples) // 2], t, fs))
+            best = min(timings)[0]
+            _, t, fs = min((e for e in timings if e[0] <= best * 1.05), key=lambda e: (e[1], e[2]))
+            table[function].append([n, t, fs])
+    _tuning = table
+    if save:
+        path = _tuning_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"version": _TUNE_VERSION, "library": library_info(), "cpus": usable_cpus(), "table": table}, f, indent=1)
+        os.replace(path + ".tmp", path)
+    return table
+
+# -----------------------------------------------------------------------------
+# Batched construction
+#
+# ctypes releases the GIL during the C call, so documents can be processed by
+# a pool of Python threads. A budget of cores is split between concurrent
+# calls and OpenMP threads per call: every document gets one thread per
+# grain symbols (at least one), large documents use the _omp entry points,
+# and a dispatcher only starts a document once enough cores are free.
+# Documents are started largest first, which keeps the tail short.
+# -----------------------------------------------------------------------------
+
+# Default number of symbols per OpenMP thread in batched construction
+_BATCH_GRAIN = 1 << 22
+
+def _batch(fn, docs, threads, grain, ordered):
+    import concurrent.futures
+    docs = list(docs)
+    if not _loaded:
+        _load()
+    budget = max(1, threads or usable_cpus())
+    futures = [concurrent.futures.Future() for _ in docs]
+    sizes = [_length(doc) for doc in docs]
+    free = [budget]
+    cond = threading.Condition()
+    stop = threading.Event()
+
+    def run(i, t):
+        try:
+            futures[i].set_result(fn(docs[i], t))
+        except BaseException as e:
+            futures[i].set_exception(e)
+        finally:
+            with cond:
+                free[0] += t
+                cond.notify()
+
+    def dispatch(pool):
+        for i in sorted(range(len(docs)), key=sizes.__getitem__, reverse=True):
+            t = min(budget, max(1, sizes[i] // grain)) if _USE_OMP else 1
+            with cond:
+                cond.wait_for(lambda: free[0] >= t or stop.is_set())
+                if stop.is_set():
+                    break
+                free[0] -= t
+            futures[i].set_running_or_notify_cancel()
+            pool.submit(run, i, t)
+        for f in futures:
+            f.cancel()
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=budget)
+    dispatcher = threading.Thread(target=dispatch, args=(pool,), daemon=True)
+    dispatcher.start()
+    try:
+        if ordered:
+            for f in futures:
+                yield f.result()
+        else:
+            index = {f: i for i, f in enumerate(futures)}
+            for f in concurrent.futures.as_completed(futures):
+                yield index[f], f.result()
+    finally:
+        stop.set()
+        with cond:
+            cond.notify_all()
+        dispatcher.join()
+        pool.shutdown(wait=True)
+
+def batch_suffix_array(docs, threads=None, grain=_BATCH_GRAIN, ordered=True, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The batch_suffix_array function computes the suffix arrays of many documents concurrently, splitting a budget of threads cores
+        between concurrent calls and OpenMP threads per call: every document gets max(1, len // grain) threads (at most threads),
+        so small documents run single-threaded in parallel and large ones use the _omp entry points. Documents are started largest first.
+
+    Arguments:
+        docs (iterable of lists or buffers of uint8): The input documents.
+        threads (int, optional, default=None): The total number of cores to use. If None, the number of CPUs available to the process.
+        grain (int, optional, default=_BATCH_GRAIN): The number of symbols per OpenMP thread.
+        ordered (bool, optional, default=True): If True, results are yielded in input order; otherwise as they complete, as (index, result) pairs.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        results (iterator): For each document, the (result, A, freq) tuple returned by suffix_array, with A a new array.array.
+        Exceptions raised for a document are re-raised when its result is reached. Closing the iterator early stops dispatching further documents.
+    """
+    return _batch(lambda doc, t: suffix_array(doc, threads=t, index_width=index_width), docs, threads, grain, ordered)
+
+def batch_bwt(docs, threads=None, grain=_BATCH_GRAIN, ordered=True, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The batch_bwt function computes the Burrows-Wheeler Transforms of many documents concurrently, scheduled as in batch_suffix_array.
+
+    Arguments:
+        docs (iterable of lists or buffers of uint8): The input documents.
+        threads (int, optional, default=None): The total number of cores to use. If None, the number of CPUs available to the process.
+        grain (int, optional, default=_BATCH_GRAIN): The number of symbols per OpenMP thread.
+        ordered (bool, optional, default=True): If True, results are yielded in input order; otherwise as they complete, as (index, result) pairs.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        results (iterator): For each document, the (primary index, U) pair, with U a new array.array('B').
+    """
+    def fn(doc, t):
+        primary, U, _, _ = bwt(doc, threads=t, index_width=index_width)
+        return primary, U
+    return _batch(fn, docs, threads, grain, ordered)
+
+def batch_lcp(docs, threads=None, grain=_BATCH_GRAIN, ordered=True, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The batch_lcp function computes the suffix arrays and LCP arrays of many documents concurrently, scheduled as in batch_suffix_array.
+        Every document runs suffix_array, plcp and lcp with the same thread count.
+
+    Arguments:
+        docs (iterable of lists or buffers of uint8): The input documents.
+        threads (int, optional, default=None): The total number of cores to use. If None, the number of CPUs available to the process.
+        grain (int, optional, default=_BATCH_GRAIN): The number of symbols per OpenMP thread.
+        ordered (bool, optional, default=True): If True, results are yielded in input order; otherwise as they complete, as (index, result) pairs.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        results (iterator): For each document, the (result, A, LCP) tuple, with A and LCP new array.arrays. result is the first non-zero return value of the three C calls, or 0.
+    """
+    def fn(doc, t):
+        LCP = None
+        result, A, _ = suffix_array(doc, threads=t, index_width=index_width)
+        if result == 0:
+            result, PLCP = plcp(doc, A, threads=t)
+        if result == 0:
+            result, LCP = lcp(PLCP, A, threads=t)
+        return result, A, LCP
+    return _batch(fn, docs, threads, grain, ordered)
+
+# -----------------------------------------------------------------------------
+# Reusable construction context
+# -----------------------------------------------------------------------------
+
+class SaisContext:
+    """
+    Description:
+        A SaisContext keeps the output and temporary buffers of suffix array, BWT and inverse BWT construction between calls, together with the
+        libsais context handles (libsais_create_ctx / libsais_unbwt_create_ctx) that keep the internal buffers of libsais itself.
+        Buffers grow geometrically to the largest input seen, so repeated calls on inputs of similar size do not allocate in steady state.
+        Inputs below 2^31 symbols use the 32-bit *_ctx entry points; larger inputs use the 64-bit functions with the same buffer reuse.
+        This is meant for high-rate construction over many small inputs, where per-call allocation dominates the cost of SA-IS.
+
+        The arrays returned by the methods are memoryviews into the context's buffers and are only valid until the next call that uses the
+        same buffer; copy them (e.g. with bytes() or numpy.array()) to keep them. A context must not be used from several threads at once.
+
+    Arguments:
+        threads (int, optional, default=1): The number of threads used by the context. With _USE_OMP and threads > 1 the OpenMP contexts are created.
+        capacity (int, optional, default=0): The initial buffer capacity in symbols.
+    """
+
+    def __init__(self, threads=1, capacity=0):
+        self.threads = threads
+        self._capacity = capacity
+        self._buffers = {}
+        self._ctx = None
+        self._unbwt_ctx = None
+        if not _loaded:
+            _load()
+        self._ctx_threads = threads if _USE_OMP and threads > 1 else 1
+        if _HAS_CTX:
+            self._ctx = libsais.libsais_create_ctx_omp(threads) if _USE_OMP and threads > 1 else libsais.libsais_create_ctx()
+            if not self._ctx:
+                raise MemoryError("libsais_create_ctx failed")
+
+    def close(self):
+        """Free the libsais context handles. The buffers are released when the context is garbage collected."""
+        if self._ctx:
+            libsais.libsais_free_ctx(self._ctx)
+            self._ctx = None
+        if self._unbwt_ctx:
+            libsais.libsais_unbwt_free_ctx(self._unbwt_ctx)
+            self._unbwt_ctx = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if libsais is not None:
+            self.close()
+
+    def _buffer(self, name, ctype, count):
+        """Return the ctypes array and memoryview of buffer name, reallocating it if it is too small or of another type."""
+        buf = self._buffers.get(name)
+        if buf is None or buf[0]._type_ is not ctype or len(buf[0]) < count:
+            capacity = max(count, self._capacity, 2 * len(buf[0]) if buf is not None else 0)
+            arr = (ctype * capacity)()
+            # ctypes exports an explicit-endian format such as '<i', which memoryview cannot index; recast to the native typecode
+            buf = self._buffers[name] = (arr, memoryview(arr).cast('B').cast(_TYPECODES[ctype]))
+        return buf
+
+    def _use_ctx(self, n):
+        return self._ctx is not None and n <= _INT32_MAX
+
+    @_instrumented
+    def suffix_array(self, T, n=None, fs=0, freq=None):
+        """
+        Description:
+            Computes the suffix array of T like suffix_array, into the context's buffers.
+
+        Arguments:
+            T (list of uint8 or buffer): The input string.
+            n (int, optional, default=None): The length of T. If None, the length of T is used.
+            fs (int, optional, default=0): The extra allocated space for the suffix array.
+            freq (list or buffer, optional, default=None): A list or writable buffer of 256 integers of the index width to store the character frequencies. If None, the function will not compute the frequency.
+
+        Returns:
+            result (int): The return value from the underlying C function. A value of 0 indicates success.
+            A (memoryview): The computed suffix array of length n + fs, valid until the next call.
+            freq (list, buffer or None): The character frequencies, in the same form as the freq argument.
+        """
+        n = _length(T) if n is None else n
+        width = _index_width("auto", n + fs)
+        A, A_view = self._buffer("A", _INDEX_CTYPES[width], n + fs)
+        if not self._use_ctx(n + fs):
+            result, _, freq = _sa(T, A, n, fs, freq, self.threads, width)
+            return result, A_view[:n + fs], freq
+
+        T, _ = _as_buffer(T, c_uint8)
+        freq, freq_list = (None, False) if freq is None else _output(freq, c_int32, 256)
+        with _Pins(fast=False) as pin:
+            result = _invoke("libsais_ctx", self._ctx_threads, libsais.libsais_ctx, (self._ctx, pin(T, c_uint8, n, "T"), A, n, fs, pin(freq, c_int32, 256, "freq", writable=True)), n)
+        return result, A_view[:n + fs], _result(freq, freq_list)
+
+    @_instrumented
+    def bwt(self, T, n=None, fs=0, freq=None):
+        """
+        Description:
+            Computes the Burrows-Wheeler Transform of T like bwt, into the context's buffers.
+
+        Arguments:
+            T (list of uint8 or buffer): The input string.
+            n (int, optional, default=None): The length of T. If None, the length of T is used.
+            fs (int, optional, default=0): The extra allocated space for the temporary array.
+            freq (list or buffer, optional, default=None): A list or writable buffer of 256 integers of the index width to store the character frequencies. If None, the function will not compute the frequency.
+
+        Returns:
+            result (int): The primary index on success, a negative value on error.
+            U (memoryview): The computed BWT of length n, valid until the next call.
+            A (memoryview): The temporary array of length n + fs, valid until the next call.
+            freq (list, buffer or None): The character frequencies, in the same form as the freq argument.
+        """
+        n = _length(T) if n is None else n
+        width = _index_width("auto", n + fs)
+        U, U_view = self._buffer("U", c_uint8, n)
+        A, A_view = self._buffer("A", _INDEX_CTYPES[width], n + fs)
+        if not self._use_ctx(n + fs):
+            result, _, _, freq = _bwt(T, U, A, n, fs, freq, self.threads, width)
+            return result, U_view[:n], A_view[:n + fs], freq
+
+        T, _ = _as_buffer(T, c_uint8)
+        freq, freq_list = (None, False) if freq is None else _output(freq, c_int32, 256)
+        with _Pins(fast=False) as pin:
+            result = _invoke("libsais_bwt_ctx", self._ctx_threads, libsais.libsais_bwt_ctx, (self._ctx, pin(T, c_uint8, n, "T"), U, A, n, fs, pin(freq, c_int32, 256, "freq", writable=True)), n)
+        return result, U_view[:n], A_view[:n + fs], _result(freq, freq_list)
+
+    @_instrumented
+    def bwt_aux(self, T, r, n=None, fs=0, freq=None):
+        """
+        Description:
+            Computes the Burrows-Wheeler Transform of T with auxiliary indexes sampled every r positions like bwt_aux, into the context's buffers.
+
+        Arguments:
+            T (list of uint8 or buffer): The input string.
+            r (int): The sampling rate for auxiliary indexes (must be a power of 2).
+            n (int, optional, default=None): The length of T. If None, the length of T is used.
+            fs (int, optional, default=0): The extra allocated space for the temporary array.
+            freq (list or buffer, optional, default=None): A list or writable buffer of 256 integers of the index width to store the character frequencies. If None, the function will not compute the frequency.
+
+        Returns:
+            result (int): The return value from the underlying C function. A value of 0 indicates success.
+            U (memoryview): The computed BWT of length n, valid until the next call.
+            A (memoryview): The temporary array of length n + fs, valid until the next call.
+            I (memoryview): The auxiliary indexes, valid until the next call. I[0] is the primary index.
+            freq (list, buffer or None): The character frequencies, in the same form as the freq argument.
+        """
+        n = _length(T) if n is None else n
+        m = (n - 1) // r + 1 if n > 0 else 0
+        width = _index_width("auto", n + fs)
+        U, U_view = self._buffer("U", c_uint8, n)
+        A, A_view = self._buffer("A", _INDEX_CTYPES[width], n + fs)
+        I, I_view = self._buffer("I", _INDEX_CTYPES[width], m)
+        if not self._use_ctx(n + fs):
+            result, _, _, _, freq = _bwt_aux(T, U, A, n, r, I, fs, freq, self.threads, width)
+            return result, U_view[:n], A_view[:n + fs], I_view[:m], freq
+
+        T, _ = _as_buffer(T, c_uint8)
+        freq, freq_list = (None, False) if freq is None else _output(freq, c_int32, 256)
+        with _Pins(fast=False) as pin:
+            result = _invoke("libsais_bwt_aux_ctx", self._ctx_threads, libsais.libsais_bwt_aux_ctx, (self._ctx, pin(T, c_uint8, n, "T"), U, A, n, fs, pin(freq, c_int32, 256, "freq", writable=True), r, I), n)
+        return result, U_view[:n], A_view[:n + fs], I_view[:m], _result(freq, freq_list)
+
+    def _unbwt_handle(self):
+        if self._unbwt_ctx is None and _HAS_CTX:
+            self._unbwt_ctx = libsais.libsais_unbwt_create_ctx_omp(self.threads) if _USE_OMP and self.threads > 1 else libsais.libsais_unbwt_create_ctx()
+            if not self._unbwt_ctx:
+                raise MemoryError("libsais_unbwt_create_ctx failed")
+        return self._unbwt_ctx
+
+    @_instrumented
+    def unbwt(self, T, i, n=None, freq=None):
+        """
+        Description:
+            Reconstructs the original string from its BWT T and primary index i like unbwt, into the context's buffers.
+
+        Arguments:
+            T (list of uint8 or buffer): The BWT string.
+            i (int): The primary index returned by bwt.
+            n (int, optional, default=None): The length of T. If None, the length of T is used.
+            freq (list or buffer, optional, default=None): The 256 character frequencies of T as computed by bwt, or None to have them counted again.
+
+        Returns:
+            result (int): The return value from the underlying C function. A value of 0 indicates success.
+            U (memoryview): The reconstructed string of length n, valid until the next call.
+            freq (list, buffer or None): The freq argument, unchanged.
+        """
+        n = _length(T) if n is None else n
+        width = _index_width("auto", n + 1)
+        U, U_view = self._buffer("U", c_uint8, n)
+        A, _ = self._buffer("A", _INDEX_CTYPES[width], n + 1)
+        if not self._use_ctx(n + 1):
+            result, _, freq = _unbwt(T, U, A, n, i, freq, self.threads, width)
+            return result, U_view[:n], freq
+
+        T, _ = _as_buffer(T, c_uint8)
+        freq, freq_list = _as_buffer(freq, c_int32)
+        with _Pins(fast=False) as pin:
+            result = _invoke("libsais_unbwt_ctx", self._ctx_threads, libsais.libsais_unbwt_ctx, (self._unbwt_handle(), pin(T, c_uint8, n, "T"), U, A, n, pin(freq, c_int32, 256, "freq"), i), n)
+        return result, U_view[:n], _result(freq, freq_list)
+
+    @_instrumented
+    def unbwt_aux(self, T, r, I, n=None, freq=None):
+        """
+        Description:
+            Reconstructs the original string from its BWT T and the auxiliary indexes I sampled every r positions like unbwt_aux, into the context's buffers.
+
+        Arguments:
+            T (list of uint8 or buffer): The BWT string.
+            r (int): The sampling rate for auxiliary indexes (must be a power of 2).
+            I (list or buffer): The auxiliary indexes returned by bwt_aux.
+            n (int, optional, default=None): The length of T. If None, the length of T is used.
+            freq (list or buffer, optional, default=None): The 256 character frequencies of T as computed by bwt_aux, or None to have them counted again.
+
+        Returns:
+            result (int): The return value from the underlying C function. A value of 0 indicates success.
+            U (memoryview): The reconstructed string of length n, valid until the next call.
+            freq (list, buffer or None): The freq argument, unchanged.
+        """
+        n = _length(T) if n is None else n
+        m = (n - 1) // r + 1 if n > 0 else 0
+        width = _index_width("auto", n + 1)
+        U, U_view = self._buffer("U", c_uint8, n)
+        A, _ = self._buffer("A", _INDEX_CTYPES[width], n + 1)
+        if not self._use_ctx(n + 1):
+            result, _, freq = _unbwt_aux(T, U, A, n, r, I, freq, self.threads, width)
+            return result, U_view[:n], freq
+
+        T, _ = _as_buffer(T, c_uint8)
+        I, _ = _as_buffer(I, c_int32)
+        freq, freq_list = _as_buffer(freq, c_int32)
+        with _Pins(fast=False) as pin:
+            result = _invoke("libsais_unbwt_aux_ctx", self._ctx_threads, libsais.libsais_unbwt_aux_ctx, (self._unbwt_handle(), pin(T, c_uint8, n, "T"), U, A, n, pin(freq, c_int32, 256, "freq"), r, pin(I, c_int32, m, "I")), n)
+        return result, U_view[:n], _result(freq, freq_list)
+
+# -----------------------------------------------------------------------------
+# Fused construction
+#
+# build_index converts the text once and computes the suffix array once. The
+# BWT (and its auxiliary indexes) are read off the suffix array with NumPy
+# instead of running a second suffix sort in libsais_bwt; without NumPy the
+# BWT is constructed first, in the buffer that then receives the suffix
+# array. PLCP goes to a scratch buffer unless it is requested, and LCP
+# overwrites the suffix array in place unless the suffix array is requested.
+# -----------------------------------------------------------------------------
+
+_INDEX_ARRAYS = ("sa", "bwt", "plcp", "lcp")
+# Number of suffix array entries converted to BWT symbols at a time, bounding the NumPy temporaries
+_DERIVE_CHUNK = 1 << 22
+
+def _check_aux_rate(r):
+    """Reject the sampling rates that libsais_bwt_aux rejects, before the BWT is derived without it."""
+    if r is not None and (r < 2 or r & (r - 1)):
+        raise ValueError(f"r must be a power of 2 of at least 2, got {r}")
+
+def _derive_bwt(T, SA, U, n, width, r=0, I=None):
+    """
+    Fill U with the BWT of T read off its suffix array SA, exactly as libsais_bwt computes it, and return the primary index.
+    If r is given, I receives the auxiliary indexes sampled every r positions, as computed by libsais_bwt_aux. Requires NumPy.
+    """
+    np = _numpy()
+    dtype = np.int32 if width == 32 else np.int64
+    T = np.frombuffer(T, dtype=np.uint8, count=n)
+    SA = np.frombuffer(SA, dtype=dtype, count=n)
+    U = np.frombuffer(U, dtype=np.uint8, count=n)
+    if I is not None:
+        I = np.frombuffer(I, dtype=dtype, count=(n - 1) // r + 1)
+    # Row p holds suffix 0, whose preceding symbol is the sentinel: it is dropped, and U[0] is the symbol
+    # preceding the sentinel row, T[n - 1]. The other rows move down by one before p and stay in place after it.
+    p = int(SA.argmin())
+    U[0] = T[n - 1]
+    for start in range(0, n, _DERIVE_CHUNK):
+        end = min(start + _DERIVE_CHUNK, n)
+        S = SA[start:end]
+        V = T[S - 1]
+        if end <= p:
+            U[start + 1:end + 1] = V
+        elif start > p:
+            U[start:end] = V
+        else:
+            U[start + 1:p + 1] = V[:p - start]
+            U[p + 1:end] = V[p - start + 1:]
+        if I is not None:
+            rows = np.flatnonzero(S % r == 0)
+            I[S[rows] // r] = rows + (start + 1)
+    return p + 1
+
+@_instrumented
+def build_index(T, want=_INDEX_ARRAYS, n=None, r=None, fs=0, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The build_index function computes any combination of the suffix array, BWT, PLCP and LCP arrays of T in one pass, with a single conversion of T
+        and a single suffix sort. The BWT is derived from the suffix array (with NumPy, otherwise libsais_bwt runs first in the suffix array buffer),
+        PLCP is computed into a scratch buffer unless requested, and LCP is written over the suffix array unless the suffix array is requested.
+        A full enhanced suffix array needs one suffix sort instead of two and no intermediate copies of T or the suffix array.
+
+    Arguments:
+        T (list of uint8 or buffer): The input string, represented as a list or buffer of 8-bit unsigned integers.
+        want (iterable of str, optional, default=("sa", "bwt", "plcp", "lcp")): The arrays to compute.
+        n (int, optional, default=None): The length of the input string T. If None, the length of T is used.
+        r (int, optional, default=None): If given, the auxiliary indexes of the BWT sampled every r positions (a power of 2) are computed as well, see bwt_aux.
+        fs (int, optional, default=0): The extra allocated space for the suffix array during construction.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        index (dict): The requested arrays as array.array, keyed by "sa" (n + fs items, the first n being the suffix array), "bwt", "plcp" and "lcp".
+            If the BWT is requested, "primary" holds its primary index, and "aux" the auxiliary indexes if r was given.
+
+    Raises:
+        ValueError: If want is empty or names an unknown array, or if r is not a power of 2.
+        RuntimeError: If a libsais function returns an error code.
+    """
+    want = set(want)
+    if not want or not want <= set(_INDEX_ARRAYS):
+        raise ValueError(f"want must name some of {', '.join(_INDEX_ARRAYS)}, got {sorted(want)}")
+    _check_aux_rate(r)
+    T, _ = _as_buffer(T, c_uint8)
+    n = _length(T) if n is None else n
+    width = _index_width(index_width, n + fs)
+    idx = _INDEX_CTYPES[width]
+    naux = (n - 1) // r + 1 if r and n > 0 else 0
+    index = {}
+    SA = None
+
+    need_sa = bool(want & {"sa", "plcp", "lcp"})
+    derive = "bwt" in want and need_sa and n > 0 and _numpy() is not None
+    if "bwt" in want and not derive:
+        U = array.array('B', [0]) * n
+        SA = array.array(_TYPECODES[idx], [0]) * (n + fs)
+        if r:
+            I = array.array(_TYPECODES[idx], [0]) * naux
+            _check(_bwt_aux(T, U, SA, n, r, I, fs, None, threads, width)[0], "bwt_aux")
+            index["primary"], index["aux"] = (I[0] if naux else 0), I
+        else:
+            index["primary"] = _bwt(T, U, SA, n, fs, None, threads, width)[0]
+            _check(index["primary"], "bwt")
+        index["bwt"] = U
+
+    if need_sa:
+        result, SA, _ = _sa(T, SA, n, fs, None, threads, width)
+        _check(result, "suffix_array")
+    if derive:
+        U = array.array('B', [0]) * n
+        I = array.array(_TYPECODES[idx], [0]) * naux if r else None
+        index["primary"] = _derive_bwt(T, SA, U, n, width, r, I)
+        index["bwt"] = U
+        if r:
+            index["aux"] = I
+
+    if "plcp" in want or "lcp" in want:
+        result, PLCP = _plcp(T, SA, None, n, threads, width)
+        _check(result, "plcp")
+        if "lcp" in want:
+            # LCP[i] only depends on SA[i], so it can replace a suffix array that is not returned
+            LCP = None if "sa" in want else SA
+            result, LCP = _lcp(PLCP, SA, LCP, n, threads, width)
+            _check(result, "lcp")
+            if LCP is SA:
+                del LCP[n:]
+                SA = None
+            index["lcp"] = LCP
+        if "plcp" in want:
+            index["plcp"] = PLCP
+    if "sa" in want:
+        index["sa"] = SA
+    return index
+
+# -----------------------------------------------------------------------------
+# Memory-mapped file construction
+#
+# build_files maps the input file read-only and constructs the SA, BWT, PLCP
+# and LCP directly into memory-mapped output files. Each output file starts
+# with a fixed 64-byte header, followed by the auxiliary indexes of a BWT (if
+# any) and the data, aligned to 64 bytes, so it can be mapped again with
+# open_index_file or numpy.memmap(path, dtype, offset=header.offset) without
+# parsing.
+# -----------------------------------------------------------------------------
+
+_FILE_MAGIC = b"LIBSAIS\x00"
+# magic, kind, index width, n, fs, primary index (-1 if none), aux sampling rate (0 if none), data offset
+_FILE_HEADER = struct.Struct("<8s4sIqqqqq8x")
+_FILE_ALIGN = 64
+
+IndexFileHeader = collections.namedtuple("IndexFileHeader", ["kind", "n", "index_width", "fs", "primary", "r", "offset"])
+
+def _data_typecode(kind, width):
+    return 'B' if kind == "BWT" else _TYPECODES[_INDEX_CTYPES[width]]
+
+class _OutputFile:
+    """A memory-mapped output file with room for the header, naux auxiliary indexes and count data items."""
+
+    def __init__(self, path, kind, width, n, fs, count, naux=0):
+        self.path, self.kind, self.width, self.n, self.fs = path, kind, width, n, fs
+        isz = width // 8
+        self.offset = -(-(_FILE_HEADER.size + naux * isz) // _FILE_ALIGN) * _FILE_ALIGN
+        self.size = self.offset + count * array.array(_data_typecode(kind, width)).itemsize
+        with open(path, "w+b") as f:
+            f.truncate(self.size)
+            self.mm = mmap.mmap(f.fileno(), self.size)
+        self.view = memoryview(self.mm)
+        # Typed views, as the bindings only accept buffers whose format matches the C element type
+        self.aux = self.view[_FILE_HEADER.size:_FILE_HEADER.size + naux * isz].cast(_TYPECODES[_INDEX_CTYPES[width]])
+        self.data = self.view[self.offset:].cast(_data_typecode(kind, width))
+
+    def _unmap(self):
+        self.aux.release()
+        self.data.release()
+        self.view.release()
+        self.mm.close()
+
+    def close(self, primary=-1, r=0, length=None):
+        """Write the header, unmap the file and truncate the data to length items. Returns the IndexFileHeader."""
+        self.mm[:_FILE_HEADER.size] = _FILE_HEADER.pack(_FILE_MAGIC, self.kind.encode(), self.width, self.n, self.fs, primary, r, self.offset)
+        self._unmap()
+        if length is not None:
+            os.truncate(self.path, self.offset + length * array.array(_data_typecode(self.kind, self.width)).itemsize)
+        return IndexFileHeader(self.kind, self.n, self.width, self.fs, primary, r, self.offset)
+
+    def abort(self):
+        """Unmap and remove an incomplete file."""
+        self._unmap()
+        os.remove(self.path)
+
+def _scratch(count, ctype):
+    """Anonymous memory map for count items of ctype, used for intermediate arrays that are not written to a file."""
+    return memoryview(mmap.mmap(-1, max(count, 1) * ctypes.sizeof(ctype))).cast(_TYPECODES[ctype])
+
+def _check(result, name):
+    if result < 0:
+        raise RuntimeError(f"{name} failed with error code {result}")
+
+def build_files(input_path, sa=None, bwt=None, plcp=None, lcp=None, r=None, fs=0, threads=_DEFAULT_THREADS, index_width=_DEFAULT_INDEX_WIDTH):
+    """
+    Description:
+        The build_files function constructs the suffix array, BWT, PLCP and LCP arrays of a file directly into memory-mapped output files.
+        As in build_index, the suffix array is computed once and the BWT is derived from it if NumPy is installed.
+        The input file is mapped read-only and every array is written by the C library into its mapped output file, so peak memory is roughly what libsais itself needs.
+        Intermediate arrays that are not requested (the suffix array for PLCP/LCP, the PLCP array for LCP) are kept in anonymous memory maps.
+        The outputs can be reopened with open_index_file.
+
+    Arguments:
+        input_path (str): The input file, taken as a string of bytes.
+        sa (str, optional, default=None): The output file for the suffix array.
+        bwt (str, optional, default=None): The output file for the Burrows-Wheeler Transform. Its header records the primary index.
+        plcp (str, optional, default=None): The output file for the permuted LCP array.
+        lcp (str, optional, default=None): The output file for the LCP array.
+        r (int, optional, default=None): If given, the auxiliary indexes of the BWT sampled every r positions (a power of 2) are stored in the BWT file, see bwt_aux.
+        fs (int, optional, default=0): The extra allocated space for the suffix array during construction; recorded in the headers.
+        threads (int, optional, default=_DEFAULT_THREADS): The number of threads to be used for OpenMP parallelization.
+        index_width (str or int, optional, default=_DEFAULT_INDEX_WIDTH): "auto", "32" or "64", see suffix_array.
+
+    Returns:
+        headers (dict): The IndexFileHeader of every written file, keyed by kind ("SA", "BWT", "PLCP", "LCP").
+
+    Raises:
+        ValueError: If no output is given, or if index_width is invalid or too narrow for the input.
+        RuntimeError: If a libsais function returns an error code.
+    """
+    if not (sa or bwt or plcp or lcp):
+        raise ValueError("at least one of sa, bwt, plcp and lcp must be given")
+    _check_aux_rate(r)
+
+    # The index width is resolved before the input is mapped, as it may be rejected
+    n = os.path.getsize(input_path)
+    width = _index_width(index_width, n + fs)
+    with open(input_path, "rb") as f:
+        T = mmap.mmap(f.fileno(), n, access=mmap.ACCESS_READ) if n > 0 else b""
+    idx = _INDEX_CTYPES[width]
+    headers = {}
+    outputs = []
+    try:
+        need_sa = sa or plcp or lcp
+        # With NumPy the BWT is read off the suffix array instead of sorting the suffixes twice, see build_index
+        derive = bwt and need_sa and n > 0 and _numpy() is not None
+        SA = _OutputFile(sa, "SA", width, n, fs, n + fs) if sa else None
+        if SA:
+            outputs.append(SA)
+        if need_sa:
+            SA_buf = SA.data if SA else _scratch(n + fs, idx)
+        if bwt:
+            naux = (n - 1) // r + 1 if r and n > 0 else 0
+            U = _OutputFile(bwt, "BWT", width, n, fs, n, naux)
+            outputs.append(U)
+
+        if bwt and not derive:
+            # The suffix array is built afterwards, so its buffer can serve as the BWT workspace
+            A = SA_buf if need_sa else _scratch(n + fs, idx)
+            if r:
+                _check(_bwt_aux(T, U.data, A, n, r, U.aux, fs, None, threads, width)[0], "bwt_aux")
+                primary = U.aux[0] if naux else 0
+            else:
+                primary = _bwt(T, U.data, A, n, fs, None, threads, width)[0]
+                _check(primary, "bwt")
+            outputs.remove(U)
+            headers["BWT"] = U.close(primary, r or 0)
+
+        if need_sa:
+            _check(_sa(T, SA_buf, n, fs, None, threads, width)[0], "suffix_array")
+        if derive:
+            primary = _derive_bwt(T, SA_buf, U.data, n, width, r, U.aux if r else None)
+            outputs.remove(U)
+            headers["BWT"] = U.close(primary, r or 0)
+        if plcp or lcp:
+            P = _OutputFile(plcp, "PLCP", width, n, fs, n) if plcp else None
+            if P:
+                outputs.append(P)
+            P_buf = P.data if P else _scratch(n, idx)
+            _check(_plcp(T, SA_buf, P_buf, n, threads, width)[0], "plcp")
+            if lcp:
+                L = _OutputFile(lcp, "LCP", width, n, fs, n)
+                outputs.append(L)
+                _check(_lcp(P_buf, SA_buf, L.data, n, threads, width)[0], "lcp")
+                outputs.remove(L)
+                headers["LCP"] = L.close()
+            if P:
+                outputs.remove(P)
+                headers["PLCP"] = P.close()
+        if SA:
+            outputs.remove(SA)
+            headers["SA"] = SA.close(length=n)
+    finally:
+        # Anything still open here is incomplete
+        for out in outputs:
+            out.abort()
+        if n > 0:
+            T.close()
+    return headers
+
+def open_index_file(path):
+    """
+    Description:
+        The open_index_file function maps a file written by build_files read-only, without reading or parsing its contents.
+
+    Arguments:
+        path (str): The file to open.
+
+    Returns:
+        header (IndexFileHeader): The file header: kind ("SA", "BWT", "PLCP" or "LCP"), n, index_width, fs, primary index (-1 if none), aux sampling rate r (0 if none) and data offset.
+        aux (memoryview): The auxiliary indexes of a BWT file (I[0] is the primary index), empty otherwise.
+        data (memoryview): The n items of the array, as uint8 for a BWT and as 32- or 64-bit signed integers otherwise.
+        Both memoryviews reference a read-only memory map and can be wrapped by numpy.frombuffer without copying.
+    """
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, kind, width, n, fs, primary, r, offset = _FILE_HEADER.unpack_from(mm)
+    if magic != _FILE_MAGIC:
+        raise ValueError(f"{path} is not a libsais index file")
+    kind = kind.rstrip(b"\x00").decode()
+    header = IndexFileHeader(kind, n, width, fs, primary, r, offset)
+    view = memoryview(mm)
+    isz = width // 8
+    naux = (n - 1) // r + 1 if r and n > 0 else 0
+    aux = view[_FILE_HEADER.size:_FILE_HEADER.size + naux * isz].cast(_TYPECODES[_INDEX_CTYPES[width]])
+    typecode = _data_typecode(kind, width)
+    data = view[offset:offset + n * array.array(typecode).itemsize].cast(typecode)
+    return header, aux, data
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Construct the suffix array, BWT, PLCP and LCP arrays of a file into memory-mapped output files.")
+    parser.add_argument("input", nargs="?", help="input file")
+    parser.add_argument("--sa", help="suffix array output file")
+    parser.add_argument("--bwt", help="BWT output file")
+    parser.add_argument("--plcp", help="PLCP array output file")
+    parser.add_argument("--lcp", help="LCP array output file")
+    parser.add_argument("--aux-rate", type=int, default=None, help="store BWT auxiliary indexes sampled every AUX_RATE positions (a power of 2)")
+    parser.add_argument("--fs", type=int, default=0, help="extra suffix array space during construction")
+    parser.add_argument("--threads", type=int, default=_DEFAULT_THREADS, help="number of OpenMP threads, 0 to pick them per array from the tuning table")
+    parser.add_argument("--index-width", default=_DEFAULT_INDEX_WIDTH, choices=["auto", "32", "64"], help="index width policy")
+    parser.add_argument("--calibrate", action="store_true", help="time the library on this machine and cache the tuned threads and fs settings")
+    args = parser.parse_args(argv)
+    if args.calibrate:
+        table = calibrate(max_threads=args.threads or None)
+        print(json.dumps({"usable_cpus": usable_cpus(), "omp": omp_available(), "cache": _tuning_path(), "table": table}, indent=1))
+        if not args.input:
+            return 0
+    if not args.input:
+        parser.error("the input file is required")
+    if not (args.sa or args.bwt or args.plcp or args.lcp):
+        parser.error("at least one of --sa, --bwt, --plcp and --lcp is required")
+
+    headers = build_files(args.input, sa=args.sa, bwt=args.bwt, plcp=args.plcp, lcp=args.lcp, r=args.aux_rate,
+                          fs=args.fs, threads=args.threads, index_width=args.index_width)
+    for header in headers.values():
+        print(f"{header.kind}: n={header.n} index_width={header.index_width} primary={header.primary}")
+    return 0
 
 # Check if this module is being run as the main program
 if __name__ == '__main__':
-    print("This is a service module, not a program.")
-
+    sys.exit(main())
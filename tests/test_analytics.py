@@ -0,0 +1,108 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import libsais_analytics as la
+
+def _suffix_array(T):
+    return sorted(range(len(T)), key=lambda i: T[i:])
+
+def _lcp(T, SA):
+    LCP = [0] * len(SA)
+    for r in range(1, len(SA)):
+        a, b = SA[r - 1], SA[r]
+        while a + LCP[r] < len(T) and b + LCP[r] < len(T) and T[a + LCP[r]] == T[b + LCP[r]]:
+            LCP[r] += 1
+    return LCP
+
+def _brute_intervals(LCP, min_lcp):
+    """Every l-[lb..rb] with lb < rb, l the least LCP value in lb+1..rb, and smaller LCP values (or the ends) around it."""
+    n = len(LCP)
+    found = set()
+    for lb in range(n):
+        low = None
+        for rb in range(lb + 1, n):
+            low = LCP[rb] if low is None else min(low, LCP[rb])
+            before = LCP[lb] if lb > 0 else -1
+            after = LCP[rb + 1] if rb + 1 < n else -1
+            if before < low and after < low and low >= min_lcp:
+                found.add((low, lb, rb))
+    if n and min_lcp <= 0:
+        found.add((0, 0, n - 1))
+    return found
+
+def _brute_repeats(T, SA, LCP, min_length):
+    repeats = set()
+    for lcp, lb, rb in _brute_intervals(LCP, max(min_length, 1)):
+        left = {T[SA[r] - 1] if SA[r] > 0 else -1 for r in range(lb, rb + 1)}
+        if len(left) > 1 or -1 in left:
+            repeats.add((lcp, SA[lb], rb - lb + 1))
+    return repeats
+
+def _texts():
+    rng = random.Random(17)
+    yield b""
+    yield b"a"
+    yield b"a" * 300
+    yield b"abcab" * 60
+    yield b"abaababaabaab" * 20
+    yield bytes(rng.choice(b"ac") for _ in range(400))
+    yield bytes(rng.choice(b"acgt") for _ in range(400))
+    yield bytes(rng.randrange(256) for _ in range(200))
+    yield bytes(rng.choice(b"ab") for _ in range(30)) * 10 + bytes(rng.choice(b"abc") for _ in range(100))
+
+@pytest.fixture(params=["numpy", "c"])
+def sweep(request, monkeypatch):
+    """Run the traversal with the NumPy galloping searches or with the compiled loops, over short chunks."""
+    if request.param == "numpy":
+        monkeypatch.setattr(la, "_kernels", None)
+    elif la._kernels is None:
+        pytest.skip("the helper extension _libsais_kernels is not built")
+    monkeypatch.setattr(la, "_SWEEP_CHUNK", 7)
+    return request.param
+
+@pytest.fixture(params=[1, 3])
+def workers(request, monkeypatch):
+    """Use one worker, or fork three over arrays longer than one chunk, checking that the array is split."""
+    splits = []
+    split_rows = la._split_rows
+    def spy(LCP, n, workers):
+        splits.append(n)
+        return split_rows(LCP, n, workers)
+    monkeypatch.setattr(la, "_CHUNK", 16)
+    monkeypatch.setattr(la, "_SPLITS_PER_WORKER", 2)
+    monkeypatch.setattr(la, "_split_rows", spy)
+    yield request.param
+    if request.param > 1 and "fork" in la.multiprocessing.get_all_start_methods():
+        assert splits
+
+def _collect(batches):
+    out = []
+    for columns in batches:
+        assert len({len(c) for c in columns}) == 1
+        out.extend(zip(*(c.tolist() for c in columns)))
+    return out
+
+@pytest.mark.parametrize("min_lcp", [0, 1, 3])
+def test_lcp_intervals(sweep, workers, min_lcp):
+    for T in _texts():
+        SA = _suffix_array(T)
+        LCP = np.array(_lcp(T, SA), dtype=np.int32)
+        out = _collect(la.lcp_intervals(LCP, min_lcp=min_lcp, workers=workers))
+        assert len(out) == len(set(out))
+        assert set(out) == _brute_intervals(LCP.tolist(), min_lcp)
+        if workers == 1:
+            # Bottom-up: no interval comes after one it contains
+            for k, (l, lb, rb) in enumerate(out):
+                assert not any(lb <= b and e <= rb for _, b, e in out[k + 1:] if (b, e) != (lb, rb))
+
+@pytest.mark.parametrize("min_length", [1, 4])
+def test_maximal_repeats(sweep, workers, min_length):
+    for T in _texts():
+        SA = _suffix_array(T)
+        LCP = np.array(_lcp(T, SA), dtype=np.int32)
+        out = _collect(la.maximal_repeats(T, np.array(SA, dtype=np.int32), LCP, min_length=min_length, workers=workers))
+        assert len(out) == len(set(out))
+        assert set(out) == _brute_repeats(T, SA, LCP.tolist(), min_length)
@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import libsais_external as ex
+import libsais_wrapper as lw
+
+try:
+    lw.library_info()
+except OSError:
+    pytest.skip("libsais is not found", allow_module_level=True)
+
+def _texts():
+    rng = random.Random(19)
+    yield bytes(rng.choice(b"\x00ab") for _ in range(300))
+    yield bytes(rng.randrange(256) for _ in range(250))
+    yield b"a" * 300
+    yield b"abcab" * 60
+    yield bytes(rng.choice(b"ab") for _ in range(23)) * 13
+    yield (b"abaab" * 20 + b"\x00") * 3
+
+@pytest.fixture(params=["python", "c"])
+def scan(request, monkeypatch):
+    """Run the scan with the Python loop or with the compiled loop."""
+    if request.param == "python":
+        monkeypatch.setattr(ex, "_gap_scan", ex._py_gap_scan)
+    elif ex._kernels is None:
+        pytest.skip("the helper extension _libsais_kernels is not built")
+    return request.param
+
+@pytest.mark.parametrize("block", [2, 5, 24, 128])
+def test_build_sa_external(tmp_path, scan, block):
+    for k, T in enumerate(_texts()):
+        source, target = tmp_path / f"{k}.txt", tmp_path / f"{k}.sa"
+        source.write_bytes(T)
+        header = ex.build_sa_external(str(source), str(target), ram_budget=block * ex._BLOCK_BYTES, index_width=32 + 32 * (k % 2))
+        assert header.n == len(T)
+        _, _, SA = lw.open_index_file(str(target))
+        assert np.asarray(SA).tolist() == sorted(range(len(T)), key=lambda i: T[i:])
+        del SA